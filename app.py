@@ -2,16 +2,37 @@
 BTC Lottery Flask API Server
 Fair lottery system based on Bitcoin block hashes
 """
+import atexit
+import functools
 import hashlib
 import json
 import logging
 import os
+import re
+import threading
 import time
-from typing import List, Dict, Any, Optional
-from flask import Flask, render_template, request, jsonify
+import uuid
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
 from flask_cors import CORS
-from bitcoin_api import get_block_hashes_for_draw, get_latest_block_height
-from lottery_core import get_lottery_result, pick_winner
+from batch_verify import BatchVerification
+from bitcoin_api import (get_block_hashes_for_draw, get_latest_block_height, get_cache_stats, get_header_store_status,
+                         get_tip_status, start_tip_poller)
+from config import Config
+from draw_history import DrawHistory
+from draw_jobs import JobQueue
+from json_stream import Deferred, StreamedMapping, iter_encoded, iter_gzip, iter_json
+import metrics
+from metrics import operation, stage
+from models import db
+from lottery_core import (ScoreStream, generate_seed, get_lottery_result, get_lottery_result_compact,
+                          get_lottery_result_ranges, get_lottery_result_top, normalize_ticket_number, pick_winner,
+                          pick_winner_ranges, pick_winners, ticket_inclusion_proof)
+from rate_limit import RateLimiter, parse_rate, parse_rates
+from result_cache import ResultCache
+from ticket_ranges import TicketRanges, parse_ticket_ranges
+from ticket_set import TicketSet
+from ticket_store import TicketSnapshot, TicketStore, import_json
 
 # Configure logging
 logging.basicConfig(
@@ -24,53 +45,524 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = Config.DATABASE_URL
 CORS(app)
+# Registers the session teardown only; the engine and tables are created on first use
+db.init_app(app)
 
-# Lottery history for checking block uniqueness
-lottery_history: List[Dict[str, Any]] = []
-MAX_HISTORY = 100
-TICKETS_FILE = 'tickets.json'
+# Cold-start mode (serverless): resources below are built when first used instead of at import
+LAZY_INIT = Config.LAZY_INIT
+
+class LazyInit:
+    """
+    Resource built by ``factory`` on first attribute access (once, thread-safe)
+
+    Attributes are forwarded to the built object, so callers use it as if
+    it were the object itself. The proxy's own names are prefixed so they
+    cannot hide the object's (e.g. ``draw_history.get(draw_id)``).
+    """
+
+    def __init__(self, factory):
+        self._lazy_factory = factory
+        self._lazy_value = None
+        self._lazy_lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._lazy_value is not None
+
+    def _resolve(self):
+        if self._lazy_value is None:
+            with self._lazy_lock:
+                if self._lazy_value is None:
+                    self._lazy_value = self._lazy_factory()
+        return self._lazy_value
+
+    def __getattr__(self, name: str):
+        return getattr(self._resolve(), name)
+
+def lazy(factory) -> LazyInit:
+    """A LazyInit, built right away unless LAZY_INIT is on"""
+    resource = LazyInit(factory)
+    if not LAZY_INIT:
+        resource._resolve()
+    return resource
+
+def open_draw_history():
+    """Create the database tables and set up the draw history"""
+    with app.app_context():
+        db.create_all()
+    history = DrawHistory(app, batch_size=Config.HISTORY_BATCH_SIZE, flush_interval=Config.HISTORY_FLUSH_INTERVAL)
+    atexit.register(history.flush)
+    return history
+
+# Keep the tip height warm so requests don't wait on the upstream API
+# (not in lazy mode: a serverless instance is frozen between requests)
+if not LAZY_INIT:
+    start_tip_poller(Config.TIP_POLL_INTERVAL)
+
+# Persistent draw history (also used for checking block uniqueness)
+draw_history = lazy(open_draw_history)
+MAX_HISTORY = Config.MAX_HISTORY  # maximum history page size
+
+# Request metrics (Prometheus text format at /metrics)
+HTTP_REQUESTS = metrics.registry.counter(
+    'lottery_http_requests_total', 'HTTP requests by endpoint and status', ('endpoint', 'method', 'status')
+)
+HTTP_SECONDS = metrics.registry.histogram(
+    'lottery_http_request_duration_seconds',
+    'Request latency until the response is returned (streamed bodies are not included)', ('endpoint',)
+)
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response: Response) -> Response:
+    start = g.pop('request_start', None)
+    if start is not None and Config.METRICS_ENABLED:
+        endpoint = request.endpoint or 'unmatched'
+        HTTP_SECONDS.observe(time.perf_counter() - start, endpoint)
+        HTTP_REQUESTS.inc(1, endpoint, request.method, str(response.status_code))
+    return response
+
+# Per-client, per-endpoint token buckets shared by all workers on the host
+RATE_LIMITED = metrics.registry.counter(
+    'lottery_rate_limited_total', 'Requests rejected by the rate limiter', ('endpoint',)
+)
+DEFAULT_RATE = parse_rate(Config.RATELIMIT_DEFAULT)
+# Clients poll their own jobs until they finish; that must not eat the default budget
+JOB_RATE = parse_rate(Config.RATELIMIT_JOBS)
+ENDPOINT_RATES = dict({'draw_job_status': JOB_RATE, 'draw_job_result': JOB_RATE,
+                       'start_simulation': parse_rate(Config.RATELIMIT_SIMULATIONS)},
+                      **parse_rates(Config.RATELIMIT_LIMITS))
+rate_limiter = (lazy(lambda: RateLimiter(Config.RATELIMIT_STORAGE or None, Config.RATELIMIT_SLOTS))
+                if Config.RATELIMIT_ENABLED else None)
+
+def ticket_count(data: Any) -> int:
+    """Tickets a request body asks to score (listed, range-encoded or in batch records)"""
+    if not isinstance(data, dict):
+        return 0
+    count = 0
+    if isinstance(data.get('tickets'), list):
+        count += len(data['tickets'])
+    ranges = data.get('ticket_ranges')
+    if isinstance(ranges, dict):
+        count += len(ranges.get('tickets') or [])
+        ranges = ranges.get('ranges')
+    if isinstance(ranges, list):
+        for pair in ranges:
+            try:
+                count += max(int(pair[1]) - int(pair[0]) + 1, 0)
+            except (TypeError, ValueError, IndexError):
+                pass
+    for key in ('records', 'ticket_sets'):
+        items = data.get(key)
+        if isinstance(items, dict):
+            items = list(items.values())
+        if isinstance(items, list):
+            count += sum(ticket_count(item) if isinstance(item, dict) else len(item) if isinstance(item, list) else 0
+                         for item in items)
+    return count
+
+def simulation_scores(data: Any) -> int:
+    """Tickets a simulation request scores in total: draws x tickets (0 if malformed)"""
+    if not isinstance(data, dict) or not isinstance(data.get('draws'), int) or isinstance(data['draws'], bool):
+        return 0
+    tickets = data.get('tickets')
+    if tickets is None:
+        count = len(get_ticket_store())
+    else:
+        count = len(tickets) if isinstance(tickets, list) else 0
+    return max(data['draws'], 0) * count
+
+def request_cost() -> float:
+    """
+    Tokens a request takes: 1, plus 1 per RATELIMIT_TICKETS_PER_TOKEN
+    tickets in its body (tickets scored over all draws, for a simulation),
+    plus 1 per extra record of a batch verification
+    """
+    data = request.get_json(silent=True) if request.method == 'POST' else None
+    tickets = simulation_scores(data) if request.endpoint == 'start_simulation' else ticket_count(data)
+    cost = 1 + tickets / Config.RATELIMIT_TICKETS_PER_TOKEN
+    if isinstance(data, dict):
+        for key in ('records', 'draw_ids'):
+            if isinstance(data.get(key), list):
+                cost += max(len(data[key]) - 1, 0)
+    return cost
+
+@app.before_request
+def enforce_rate_limit():
+    """
+    Reject API requests over the client's budget for the endpoint (429 with
+    Retry-After), or costing more than the whole budget (413)
+    """
+    if rate_limiter is None or not request.path.startswith('/api/'):
+        return None
+    endpoint = request.endpoint or 'unmatched'
+    rate = ENDPOINT_RATES.get(endpoint, DEFAULT_RATE)
+    cost = request_cost()
+    decision = rate_limiter.hit(f'{request.remote_addr}|{endpoint}', rate, cost)
+    if decision.allowed:
+        return None
+    RATE_LIMITED.inc(1, endpoint)
+    if decision.too_large:
+        return jsonify({
+            'success': False,
+            'error': f'Request costs {cost:.0f} tokens, more than the limit of {int(rate.limit)} per '
+                     f'{int(rate.period)} s; send fewer tickets or records'
+        }), 413
+    retry_after = max(1, int(decision.retry_after + 0.999))
+    response = jsonify({
+        'success': False,
+        'error': f'Rate limit exceeded ({int(rate.limit)} per {int(rate.period)} s); retry in {retry_after} s'
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+def instrumented(name: str):
+    """Record per-stage timings (metrics.stage) of a view as operation `name`"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not Config.METRICS_ENABLED:
+                return view(*args, **kwargs)
+            with operation(name):
+                return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# Results of repeated draws and verifications (same seed and tickets)
+result_cache = ResultCache(
+    Config.RESULT_CACHE_FILE or None,
+    capacity=Config.RESULT_CACHE_SIZE,
+    max_tickets=Config.RESULT_CACHE_MAX_TICKETS
+)
+TICKETS_FILE = Config.TICKETS_FILE
+TICKETS_STORE = Config.TICKETS_STORE
+TICKETS_SNAPSHOT = Config.TICKETS_SNAPSHOT
+
+_ticket_store: Optional[TicketStore] = None
+_ticket_store_lock = threading.Lock()
+
+def get_ticket_store() -> TicketStore:
+    """
+    Open the ticket store on first use.
+    A legacy tickets.json is imported once if the store does not exist yet.
+    With TICKETS_SNAPSHOT set, the prebuilt snapshot is mapped read-only instead
+    (nothing is parsed or written; adding and removing tickets is refused).
+    """
+    global _ticket_store
+    with _ticket_store_lock:
+        if _ticket_store is None and TICKETS_SNAPSHOT:
+            _ticket_store = TicketSnapshot(TICKETS_SNAPSHOT)
+        elif _ticket_store is None:
+            if not os.path.exists(TICKETS_STORE) and os.path.exists(TICKETS_FILE):
+                count = import_json(TICKETS_FILE, TICKETS_STORE)
+                logger.info(f"Imported {count} tickets from {TICKETS_FILE} into {TICKETS_STORE}")
+            _ticket_store = TicketStore(
+                TICKETS_STORE,
+                compact_threshold=Config.TICKETS_COMPACT_THRESHOLD,
+                commit_delay=Config.TICKETS_COMMIT_DELAY_MS / 1000
+            )
+        return _ticket_store
 
 def load_tickets() -> List[int]:
     """
-    Load tickets from file.
-    Returns empty list if file doesn't exist or is empty.
+    Load tickets from the ticket store.
+    Returns empty list if the store doesn't exist or is empty.
     NO HARDCODED TICKETS!
     """
     try:
-        if os.path.exists(TICKETS_FILE):
-            with open(TICKETS_FILE, 'r') as f:
-                data = json.load(f)
-                tickets = data.get('tickets', [])
-                if tickets:
-                    logger.info(f"Loaded {len(tickets)} tickets from file")
-                    return tickets
-                else:
-                    logger.info("Tickets file is empty")
+        tickets = get_ticket_store().to_list()
+        if tickets:
+            logger.info(f"Loaded {len(tickets)} tickets from store")
+            return tickets
         else:
-            logger.info("Tickets file does not exist")
+            logger.info("Ticket store is empty")
     except Exception as e:
         logger.error(f"Error loading tickets: {e}")
     
     # Return empty list - NO HARDCODED TICKETS!
     return []
 
-def save_tickets(tickets: List[int]) -> bool:
-    """Save tickets to file"""
+def load_ticket_ranges() -> TicketRanges:
+    """
+    Load tickets from the ticket store, range-encoded.
+    Consecutive tickets become intervals, so a store of bulk-sold blocks
+    takes a few kilobytes in memory instead of a list of ints.
+    """
+    try:
+        tickets = TicketRanges.from_sorted(get_ticket_store())
+        if tickets:
+            logger.info(f"Loaded {len(tickets)} tickets from store ({tickets.range_count} ranges, "
+                        f"{tickets.sparse_count} sparse)")
+        else:
+            logger.info("Ticket store is empty")
+        return tickets
+    except Exception as e:
+        logger.error(f"Error loading tickets: {e}")
+    
+    return TicketRanges()
+
+def save_tickets(tickets) -> bool:
+    """Replace all tickets in the store (a list or TicketRanges)"""
     try:
-        with open(TICKETS_FILE, 'w') as f:
-            json.dump({'tickets': tickets}, f, indent=2)
+        if isinstance(tickets, TicketRanges):
+            get_ticket_store().replace_sorted(tickets)
+        else:
+            get_ticket_store().replace(tickets)
         return True
     except Exception as e:
         logger.error(f"Error saving tickets: {e}")
         return False
 
+def streamed_response(body: Dict[str, Any]) -> Response:
+    """
+    Chunked JSON response, gzipped on the fly if the client accepts it.
+    Fields are written in order; StreamedMapping/Deferred values are computed as they are reached.
+    """
+    return chunked_response(iter_json(body), 'application/json')
+
+def chunked_response(chunks: Iterator[str], mimetype: str, gzip: bool = True) -> Response:
+    """
+    Chunked response of text chunks, gzipped on the fly if allowed and the client accepts it.
+    (The compressor holds small chunks back, so responses whose lines must arrive promptly pass gzip=False.)
+    """
+    headers = {'Cache-Control': 'no-store'}
+    if gzip and 'gzip' in request.headers.get('Accept-Encoding', ''):
+        payload = iter_gzip(chunks)
+        headers['Content-Encoding'] = 'gzip'
+        headers['Vary'] = 'Accept-Encoding'
+    else:
+        payload = iter_encoded(chunks)
+    return Response(stream_with_context(payload), mimetype=mimetype, headers=headers)
+
+def stream_draw(block_hashes: List[str], block_heights: List[int], tickets: List[Any],
+                warnings: List[Dict[str, str]]) -> Response:
+    """
+    Streamed /api/lottery/draw response: block data first, then scores as
+    they are computed, then the winner and proof. "success" comes last and
+    is false (with "error") if scoring failed midway.
+    """
+    seed_hex = generate_seed(block_hashes).hex()
+    scores = ScoreStream(seed_hex, tickets)
+    mapping = StreamedMapping(scores)
+    header = {
+        'block_hashes': block_hashes,
+        'block_heights': block_heights,
+        'seed_hex': seed_hex,
+        'draw_id': uuid.uuid4().hex,
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+    
+    def finish() -> Optional[Dict[str, Any]]:
+        if mapping.error is not None:
+            return None
+        proof = scores.proof()
+        draw_history.record(dict(header, winner=scores.winner, proof=proof), tickets)
+        return proof
+    
+    return streamed_response({
+        'result': dict(
+            header,
+            scores=mapping,
+            winner=Deferred(lambda: None if mapping.error else scores.winner),
+            proof=Deferred(finish)
+        ),
+        'warnings': warnings,
+        'error': Deferred(lambda: str(mapping.error) if mapping.error else None),
+        'success': Deferred(lambda: mapping.error is None)
+    })
+
 @app.route('/')
 def index():
     """Main page"""
     return render_template('index.html')
 
+def expanding_options(data: Dict[str, Any]) -> List[str]:
+    """Options of a draw request that need every ticket of a range-encoded set (scores, leaves, heaps)"""
+    options = []
+    if data.get('include_scores', False):
+        options.append('include_scores')
+    if data.get('stream'):
+        options.append('stream')
+    if data.get('proof', 'full') == 'compact':
+        options.append('compact proofs')
+    if data.get('winners') is not None or data.get('claimed_winners') is not None:
+        options.append('prize places')
+    return options
+
+def ticket_ranges_error(tickets: TicketRanges, options: List[str], from_request: bool = True) -> Optional[str]:
+    """
+    Size error of range-encoded tickets, or None: a request may cover at most
+    TICKET_RANGES_MAX_TICKETS tickets, and options listed by expanding_options
+    are refused above TICKET_RANGES_MAX_EXPANDED (the store is not capped)
+    """
+    if from_request and tickets.count > Config.TICKET_RANGES_MAX_TICKETS:
+        return f'ticket_ranges cover {tickets.count} tickets, at most {Config.TICKET_RANGES_MAX_TICKETS} are accepted'
+    if options and tickets.count > Config.TICKET_RANGES_MAX_EXPANDED:
+        return (f'{", ".join(options)} need at most {Config.TICKET_RANGES_MAX_EXPANDED} range-encoded tickets '
+                f'({tickets.count} given); draw them with "include_scores": false')
+    return None
+
+def draw_request_error(data: Dict[str, Any]) -> Optional[str]:
+    """Validation error of a draw request body, or None"""
+    if data.get('proof', 'full') not in ('full', 'compact'):
+        return 'proof must be "full" or "compact"'
+    winners_count = data.get('winners')
+    if winners_count is not None and (not isinstance(winners_count, int) or winners_count < 1):
+        return 'winners must be a positive integer'
+    if data.get('duplicates', 'merge') not in ('merge', 'reject'):
+        return 'duplicates must be "merge" or "reject"'
+    if data.get('ticket_ranges') is not None:
+        # Checked here too so that async draws are refused before they are queued
+        try:
+            return ticket_ranges_error(parse_ticket_ranges(data['ticket_ranges']), expanding_options(data))
+        except ValueError as e:
+            return str(e)
+    return None
+
+def prepare_draw(data: Dict[str, Any]) -> Tuple[List[Any], List[str], List[int], List[Dict[str, str]]]:
+    """
+    Tickets, block hashes, block heights and warnings of a draw request.
+    Listed tickets become a TicketSet (validated once, duplicates merged
+    or rejected); tickets from ticket_ranges or the store are a TicketRanges.
+    A range-encoded set above TICKET_RANGES_MAX_EXPANDED is drawn winner-only
+    unless scores were asked for explicitly (sets ``data['include_scores']``).
+    Raises ValueError if there are no tickets, they are invalid or too many.
+    """
+    tickets = data.get('tickets')
+    warnings = []
+    from_request = data.get('ticket_ranges') is not None
+    if from_request:
+        tickets = parse_ticket_ranges(data['ticket_ranges'])
+    elif tickets is not None:
+        with stage('normalize'):
+            tickets = TicketSet(tickets, duplicates=data.get('duplicates', 'merge'))
+        if tickets.duplicates:
+            warnings.append({
+                'type': 'duplicate_tickets',
+                'message': f'{tickets.duplicates} duplicate tickets were merged (each ticket counts once)'
+            })
+    
+    # Load tickets from the store if not provided
+    if tickets is None:
+        with stage('load_tickets'):
+            tickets = load_ticket_ranges()
+    
+    if isinstance(tickets, TicketRanges):
+        if 'include_scores' not in data and tickets.count > Config.TICKET_RANGES_MAX_EXPANDED:
+            data['include_scores'] = False
+            warnings.append({
+                'type': 'scores_omitted',
+                'message': f'{tickets.count} tickets are drawn winner-only (scores are returned for at most '
+                           f'{Config.TICKET_RANGES_MAX_EXPANDED} range-encoded tickets)'
+            })
+        error = ticket_ranges_error(tickets, expanding_options(data), from_request)
+        if error is not None:
+            raise ValueError(error)
+    
+    count = tickets.count if isinstance(tickets, TicketRanges) else len(tickets)
+    if not count:
+        raise ValueError('No tickets available')
+    
+    # Get block hashes
+    with stage('fetch_blocks'):
+        block_hashes, block_heights = get_block_hashes_for_draw(
+            draw_block_height=data.get('block_height'),
+            count=data.get('block_count', 3)
+        )
+    
+    # Check if these blocks were used before
+    with stage('duplicate_check'):
+        prev_draw = draw_history.find_by_blocks(block_heights)
+    if prev_draw is not None:
+        warnings.append({
+            'type': 'duplicate_blocks',
+            'message': f'Using same blocks as draw from {prev_draw.created_at:%Y-%m-%d %H:%M:%S}. Result will be identical!'
+        })
+    
+    return tickets, block_hashes, block_heights, warnings
+
+def compute_draw(data: Dict[str, Any], tickets: List[Any], block_hashes: List[str],
+                 block_heights: List[int]) -> Dict[str, Any]:
+    """Run the draw and save it to history"""
+    winners_count = data.get('winners')
+    
+    if winners_count is not None:
+        result = get_lottery_result_top(block_hashes, tickets, winners_count, block_heights)
+    elif data.get('proof', 'full') == 'compact':
+        result = get_lottery_result_compact(block_hashes, tickets, block_heights)
+    elif isinstance(tickets, TicketRanges) and not data.get('include_scores', True):
+        # Range-encoded tickets are scored lazily, never expanded into a list
+        result = get_lottery_result_ranges(
+            block_hashes, tickets, block_heights,
+            workers=Config.DRAW_WORKERS,
+            chunk_size=Config.DRAW_CHUNK_SIZE,
+            min_parallel=Config.DRAW_PARALLEL_MIN_TICKETS,
+            cache=result_cache
+        )
+    else:
+        result = get_lottery_result(
+            block_hashes, tickets, block_heights,
+            include_scores=bool(data.get('include_scores', True)),
+            workers=Config.DRAW_WORKERS,
+            chunk_size=Config.DRAW_CHUNK_SIZE,
+            min_parallel=Config.DRAW_PARALLEL_MIN_TICKETS,
+            cache=result_cache
+        )
+    result['draw_id'] = uuid.uuid4().hex
+    result['timestamp'] = time.strftime('%Y-%m-%d %H:%M:%S')
+    
+    # Save to history (compact draws keep their tickets server-side for inclusion proofs)
+    with stage('history'):
+        draw_history.record(result, result.get('tickets', tickets))
+    return result
+
+def run_draw_job(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Draw job body (see /api/lottery/draw with "async": true)"""
+    with operation('draw_job'):
+        tickets, block_hashes, block_heights, warnings = prepare_draw(data)
+        result = compute_draw(data, tickets, block_hashes, block_heights)
+    return {'result': result, 'warnings': warnings}
+
+def run_simulation_job(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fairness simulation job body (see /api/lottery/simulations).
+    The checkpoint is named after the label, ticket set and bins, so a job
+    re-queued after a restart, or a longer run of the same simulation,
+    continues from the draws already done.
+    """
+    from fairness_sim import FairnessSimulation  # imports NumPy (via score_analytics)
+    tickets = TicketSet(data['tickets'] if data.get('tickets') is not None else get_ticket_store())
+    label = data.get('label', 'fairness')
+    bins = data.get('bins', 16)
+    checkpoint = os.path.join(Config.SIMULATION_DIR, f"{label}-{tickets.fingerprint()['digest'][:16]}-{bins}.json")
+    simulation = FairnessSimulation(tickets, label, bins, checkpoint)
+    simulation.run(data['draws'], Config.SIMULATION_WORKERS or None,
+                   checkpoint_every=Config.SIMULATION_CHECKPOINT_EVERY)
+    return {'simulation': simulation.report(data.get('confidence', 0.95))}
+
+def run_job(data: Dict[str, Any]) -> Dict[str, Any]:
+    if data.get('kind') == 'simulation':
+        return run_simulation_job(data)
+    return run_draw_job(data)
+
+# Asynchronous draws and simulations, persisted so results survive restarts
+def open_draw_jobs() -> JobQueue:
+    jobs = JobQueue(Config.JOBS_FILE, run_job, workers=Config.JOB_WORKERS, poll_interval=Config.JOB_POLL_INTERVAL,
+                    lease=Config.JOB_LEASE_SECONDS, max_attempts=Config.JOB_MAX_ATTEMPTS)
+    if Config.JOB_WORKERS > 0:
+        jobs.start()
+    return jobs
+
+draw_jobs = lazy(open_draw_jobs)
+
 @app.route('/api/lottery/draw', methods=['POST'])
+@instrumented('draw')
 def lottery_draw():
     """
     Conduct lottery draw
@@ -78,57 +570,293 @@ def lottery_draw():
     Request body:
         "block_height": int (optional, defaults to latest block)
         "block_count": int (optional, defaults to 3)
-        "tickets": [int] (optional, defaults to file)
+        "tickets": [int] (optional, defaults to the ticket store)
+        "duplicates": "merge" | "reject" (optional, defaults to "merge";
+            repeated tickets count once, or fail the request with 400)
+        "ticket_ranges": {"ranges": [[first, last]], "tickets": [int]}
+            (optional, instead of tickets; inclusive ranges plus sparse
+            tickets, at most TICKET_RANGES_MAX_TICKETS in total)
+        "include_scores": bool (optional, defaults to true; false returns
+            only the winner proof and enables the multi-core engine; with
+            ticket_ranges or store tickets the draw then runs on the ranges
+            without expanding them, and the proof carries ticket_ranges;
+            range-encoded sets above TICKET_RANGES_MAX_EXPANDED default to
+            false, and scores, stream, compact proofs and winners are refused
+            for them with 400)
+        "proof": "full" | "compact" (optional, defaults to "full"; compact
+            commits to all (ticket, score) pairs with a Merkle root, see
+            /api/lottery/draws/<draw_id>/proof/<ticket>)
+        "stream": bool (optional; streams scores in a chunked response,
+            gzipped if the client accepts it; ignored for compact proofs)
+        "winners": int (optional; k prize places - the k lowest
+            (score, tie_breaker) pairs in order; proof, stream and
+            include_scores are ignored)
+        "async": bool (optional; queue the draw and return 202 with a
+            job_id at once, see /api/lottery/jobs/<job_id>; tickets from
+            the store are read when the job runs; stream is ignored)
     """
     try:
         data = request.json or {}
-        block_count = data.get('block_count', 3)
-        block_height = data.get('block_height')
-        tickets = data.get('tickets')
-        
-        # Load tickets from file if not provided
-        if tickets is None:
-            tickets = load_tickets()
         
-        if not tickets:
+        error = draw_request_error(data)
+        if error is not None:
             return jsonify({
                 'success': False,
-                'error': 'No tickets available'
+                'error': error
             }), 400
         
-        # Get block hashes
-        block_hashes, block_heights = get_block_hashes_for_draw(
-            draw_block_height=block_height,
-            count=block_count
-        )
+        if data.get('async'):
+            params = {k: v for k, v in data.items() if k not in ('async', 'stream')}
+            params['kind'] = 'draw'
+            job_id = draw_jobs.submit(params)
+            return jsonify({
+                'success': True,
+                'job_id': job_id,
+                'status_url': f'/api/lottery/jobs/{job_id}',
+                'result_url': f'/api/lottery/jobs/{job_id}/result'
+            }), 202
         
-        # Check if these blocks were used recently
-        warnings = []
-        for prev_draw in lottery_history[-10:]:
-            if prev_draw.get('block_heights') == block_heights:
-                warnings.append({
-                    'type': 'duplicate_blocks',
-                    'message': f'Using same blocks as draw from {prev_draw["timestamp"]}. Result will be identical!'
-                })
-                break
+        try:
+            tickets, block_hashes, block_heights, warnings = prepare_draw(data)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
         
         # Run lottery
-        result = get_lottery_result(block_hashes, tickets, block_heights)
-        result['timestamp'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        if data.get('winners') is None and data.get('stream') and data.get('proof', 'full') == 'full':
+            return stream_draw(block_hashes, block_heights, tickets, warnings)
+        
+        result = compute_draw(data, tickets, block_hashes, block_heights)
+        
+        with stage('serialize'):
+            return jsonify({
+                'success': True,
+                'result': result,
+                'warnings': warnings
+            })
+        
+    except Exception as e:
+        logger.error(f"Draw error: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/lottery/jobs/<job_id>', methods=['GET'])
+def draw_job_status(job_id):
+    """Status of an asynchronous draw (queued, running, done or failed)"""
+    job = draw_jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': f'Job {job_id} not found'
+        }), 404
+    return jsonify({
+        'success': True,
+        'job': job
+    })
+
+@app.route('/api/lottery/jobs/<job_id>/result', methods=['GET'])
+def draw_job_result(job_id):
+    """
+    Result of an asynchronous draw: the same body as a synchronous draw once
+    the job is done, 202 with the job status while it is queued or running
+    """
+    job = draw_jobs.get(job_id, with_result=True)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': f'Job {job_id} not found'
+        }), 404
+    if job['status'] == 'done':
+        return jsonify(dict(job.pop('result'), success=True, job=job))
+    if job['status'] == 'failed':
+        return jsonify({
+            'success': False,
+            'error': job.get('error'),
+            'job': job
+        }), 500
+    return jsonify({
+        'success': True,
+        'job': job
+    }), 202
+
+SIMULATION_LABEL = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+def simulation_request_error(data: Dict[str, Any]) -> Optional[str]:
+    """Validation error of a simulation request body, or None"""
+    draws = data.get('draws')
+    if not isinstance(draws, int) or isinstance(draws, bool) or not 0 < draws <= Config.SIMULATION_MAX_DRAWS:
+        return f'draws must be an integer from 1 to {Config.SIMULATION_MAX_DRAWS}'
+    if not SIMULATION_LABEL.match(str(data.get('label', 'fairness'))):
+        return 'label must be 1-64 letters, digits, "-" or "_"'
+    bins = data.get('bins', 16)
+    if not isinstance(bins, int) or not 2 <= bins <= 1000:
+        return 'bins must be an integer from 2 to 1000'
+    confidence = data.get('confidence', 0.95)
+    if not isinstance(confidence, (int, float)) or not 0 < confidence < 1:
+        return 'confidence must be between 0 and 1'
+    return None
+
+@app.route('/api/lottery/simulations', methods=['POST'])
+def start_simulation():
+    """
+    Queue a Monte Carlo fairness simulation of the draw engine
+    
+    Request body:
+        "draws": int (number of simulated draws, synthetic seeds; draws x
+            tickets is capped by SIMULATION_MAX_SCORES)
+        "tickets": [int] (optional, defaults to the ticket store)
+        "label": str (optional, defaults to "fairness"; seed label - the
+            same label and tickets continue an earlier run)
+        "bins": int (optional, defaults to 16; winning-score histogram)
+        "confidence": float (optional, defaults to 0.95; per-ticket intervals)
+    
+    Returns 202 with a job_id; the report (win-count and winning-score
+    chi-squared tests, per-ticket frequencies with confidence intervals)
+    is the job result, see /api/lottery/jobs/<job_id>/result.
+    """
+    if not Config.ENABLE_SIMULATION:
+        return jsonify({
+            'success': False,
+            'error': 'Simulations are disabled'
+        }), 404
+    data = request.json or {}
+    error = simulation_request_error(data)
+    if error is None and data.get('tickets') is not None:
+        try:
+            tickets = TicketSet(data['tickets'])
+            error = None if len(tickets) else 'No tickets available'
+        except (TypeError, ValueError) as e:
+            error = str(e)
+    if error is None and simulation_scores(data) > Config.SIMULATION_MAX_SCORES:
+        error = f'draws x tickets must be at most {Config.SIMULATION_MAX_SCORES}'
+    if error is not None:
+        return jsonify({
+            'success': False,
+            'error': error
+        }), 400
+    
+    params = {k: data[k] for k in ('draws', 'tickets', 'label', 'bins', 'confidence') if k in data}
+    params['kind'] = 'simulation'
+    job_id = draw_jobs.submit(params)
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': f'/api/lottery/jobs/{job_id}',
+        'result_url': f'/api/lottery/jobs/{job_id}/result'
+    }), 202
+
+@app.route('/api/lottery/draws/<draw_id>/proof/<int:ticket>', methods=['GET'])
+def ticket_proof(draw_id, ticket):
+    """
+    Merkle inclusion proof of one ticket's score in a draw
+    
+    The path folds the ticket's leaf up to the draw's merkle_root, see
+    lottery_core.verify_ticket_inclusion.
+    """
+    try:
+        draw = draw_history.get(draw_id)
+        if draw is None:
+            return jsonify({
+                'success': False,
+                'error': f'Draw {draw_id} not found'
+            }), 404
+        
+        proof = ticket_inclusion_proof(draw.seed_hex, draw.ticket_set(), ticket)
+        if proof is None:
+            return jsonify({
+                'success': False,
+                'error': f'Ticket #{ticket} not found in draw {draw_id}'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'draw_id': draw_id,
+            'seed_hex': draw.seed_hex,
+            'proof': proof
+        })
+        
+    except Exception as e:
+        logger.error(f"Proof error: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/lottery/draws/<draw_id>/analytics', methods=['GET'])
+def draw_analytics(draw_id):
+    """
+    Score distribution of a draw (requires NumPy)
+    
+    Query parameters:
+        "ticket": int (optional, adds the ticket's place and percentile)
+        "bins": int (optional, histogram bins, defaults to 16)
+    """
+    import score_analytics  # NumPy is imported by the first analytics request
+    try:
+        if not score_analytics.is_available():
+            return jsonify({
+                'success': False,
+                'error': 'Analytics require NumPy'
+            }), 501
+        
+        draw = draw_history.get(draw_id)
+        if draw is None:
+            return jsonify({
+                'success': False,
+                'error': f'Draw {draw_id} not found'
+            }), 404
+        
+        bins = max(1, min(request.args.get('bins', 16, type=int), 1024))
+        matrix = score_analytics.ScoreMatrix(draw.seed_hex, draw.ticket_set())
+        response = {
+            'success': True,
+            'draw_id': draw_id,
+            'analytics': matrix.summary(bins)
+        }
         
-        # Save to history
-        lottery_history.append(result)
-        if len(lottery_history) > MAX_HISTORY:
-            lottery_history.pop(0)
+        ticket = request.args.get('ticket', type=int)
+        if ticket is not None:
+            response['ticket'] = {
+                'ticket': ticket,
+                'place': matrix.rank_of(ticket),
+                'percentile': matrix.percentile(ticket)
+            }
+        return jsonify(response)
+        
+    except Exception as e:
+        logger.error(f"Analytics error: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/lottery/history', methods=['GET'])
+def get_history():
+    """
+    Draw history, newest first
+    
+    Query parameters:
+        "cursor": int (optional, next_cursor from the previous page)
+        "limit": int (optional, defaults to 20, at most MAX_HISTORY)
+    """
+    try:
+        cursor = request.args.get('cursor', type=int)
+        limit = request.args.get('limit', 20, type=int)
+        limit = max(1, min(limit, MAX_HISTORY))
         
+        draws, next_cursor = draw_history.page(cursor, limit)
         return jsonify({
             'success': True,
-            'result': result,
-            'warnings': warnings
+            'draws': [draw.to_summary() for draw in draws],
+            'next_cursor': next_cursor
         })
         
     except Exception as e:
-        logger.error(f"Draw error: {e}")
+        logger.error(f"History error: {e}")
         return jsonify({
             'success': False,
             'error': str(e)
@@ -136,8 +864,22 @@ def lottery_draw():
 
 @app.route('/api/lottery/tickets', methods=['GET'])
 def get_tickets():
-    """Return list of all tickets"""
+    """
+    Return list of all tickets
+    
+    Query parameters:
+        "format": "list" | "ranges" (optional, defaults to "list"; ranges
+            returns {"ranges": [[first, last]], "tickets": [int]})
+    """
     try:
+        if request.args.get('format') == 'ranges':
+            tickets = load_ticket_ranges()
+            return jsonify({
+                'success': True,
+                'ticket_ranges': tickets.to_dict(),
+                'count': len(tickets)
+            })
+        
         tickets = load_tickets()
         return jsonify({
             'success': True,
@@ -172,30 +914,33 @@ def add_ticket():
                 'error': 'Ticket number must be an integer'
             }), 400
         
-        tickets = load_tickets()
+        store = get_ticket_store()
         
-        if ticket_number in tickets:
+        try:
+            added = store.add(ticket_number)
+        except ValueError as e:
             return jsonify({
                 'success': False,
-                'error': f'Ticket #{ticket_number} already exists'
+                'error': str(e)
             }), 400
         
-        tickets.append(ticket_number)
-        tickets.sort()
-        
-        if save_tickets(tickets):
-            return jsonify({
-                'success': True,
-                'message': f'Ticket #{ticket_number} added successfully',
-                'tickets': tickets,
-                'count': len(tickets)
-            })
-        else:
+        if not added:
             return jsonify({
                 'success': False,
-                'error': 'Error saving tickets'
-            }), 500
-            
+                'error': f'Ticket #{ticket_number} already exists'
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'message': f'Ticket #{ticket_number} added successfully',
+            'count': len(store)
+        })
+    
+    except PermissionError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 403
     except Exception as e:
         logger.error(f"Error adding ticket: {e}")
         return jsonify({
@@ -207,30 +952,25 @@ def add_ticket():
 def remove_ticket(ticket_number):
     """Remove a ticket"""
     try:
-        tickets = load_tickets()
+        store = get_ticket_store()
         
-        if ticket_number not in tickets:
+        if not store.remove(ticket_number):
             return jsonify({
                 'success': False,
                 'error': f'Ticket #{ticket_number} not found'
             }), 404
         
-        tickets.remove(ticket_number)
-        tickets.sort()
-        
-        if save_tickets(tickets):
-            return jsonify({
-                'success': True,
-                'message': f'Ticket #{ticket_number} removed successfully',
-                'tickets': tickets,
-                'count': len(tickets)
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'error': 'Error saving tickets'
-            }), 500
-            
+        return jsonify({
+            'success': True,
+            'message': f'Ticket #{ticket_number} removed successfully',
+            'count': len(store)
+        })
+    
+    except PermissionError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 403
     except Exception as e:
         logger.error(f"Error removing ticket: {e}")
         return jsonify({
@@ -239,6 +979,7 @@ def remove_ticket(ticket_number):
         }), 500
 
 @app.route('/api/lottery/verify', methods=['POST'])
+@instrumented('verify')
 def verify_result():
     """
     Verify lottery result
@@ -246,13 +987,38 @@ def verify_result():
     Request body:
         "seed_hex": str
         "tickets": [int]
+        "ticket_ranges": {"ranges": [[first, last]], "tickets": [int]}
+            (optional, instead of tickets; checked without expanding them,
+            include_scores is ignored)
+        "duplicates": "merge" | "reject" (optional, see /api/lottery/draw)
         "claimed_winner": int
+        "claimed_winners": [int] (optional; verifies a multi-prize draw,
+            place by place, instead of claimed_winner)
+        "include_scores": bool (optional, defaults to true)
+        "stream": bool (optional; streams scores in a chunked response)
     """
     try:
         data = request.json
         seed_hex = data.get('seed_hex')
         tickets = data.get('tickets')
         claimed_winner = data.get('claimed_winner')
+        include_scores = bool(data.get('include_scores', True))
+        
+        try:
+            if data.get('ticket_ranges') is not None:
+                tickets = parse_ticket_ranges(data['ticket_ranges'])
+                # include_scores is ignored for ranges; streams and prize places still expand them
+                options = [o for o in expanding_options(data) if o in ('stream', 'prize places')]
+                error = ticket_ranges_error(tickets, options)
+                if error is not None:
+                    raise ValueError(error)
+            elif tickets:
+                tickets = TicketSet(tickets, duplicates=data.get('duplicates', 'merge'))
+        except (TypeError, ValueError) as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
         
         if not seed_hex or not tickets:
             return jsonify({
@@ -260,18 +1026,82 @@ def verify_result():
                 'error': 'Insufficient data for verification'
             }), 400
         
-        # Recalculate winner
-        winner, scores, proof = pick_winner(seed_hex, tickets)
+        claimed_winners = data.get('claimed_winners')
+        if claimed_winners is not None:
+            try:
+                if not isinstance(claimed_winners, list) or not claimed_winners:
+                    raise ValueError('claimed_winners must be a non-empty list')
+                # Normalised like batch verification, so "007" claims ticket 7
+                claimed = [normalize_ticket_number(w) for w in claimed_winners]
+                if len(claimed) > len(tickets):
+                    raise ValueError(f'claimed_winners lists {len(claimed)} places for {len(tickets)} tickets')
+            except (TypeError, ValueError) as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
+            winners, proof = pick_winners(seed_hex, tickets, len(claimed))
+            return jsonify({
+                'success': True,
+                'valid': claimed == winners,
+                'calculated_winners': [int(w) for w in winners],
+                'claimed_winners': [int(w) for w in claimed_winners],
+                'proof': proof
+            })
+        
+        if data.get('stream'):
+            scores = ScoreStream(seed_hex, tickets)
+            mapping = StreamedMapping(scores)
+            ok = lambda: mapping.error is None
+            return streamed_response({
+                'claimed_winner': int(claimed_winner),
+                'scores': mapping,
+                'proof': Deferred(lambda: scores.proof() if ok() else None),
+                'calculated_winner': Deferred(lambda: int(scores.winner) if ok() else None),
+                'valid': Deferred(lambda: ok() and str(scores.winner) == str(claimed_winner)),
+                'error': Deferred(lambda: None if ok() else str(mapping.error)),
+                'success': Deferred(ok)
+            })
+        
+        if isinstance(tickets, TicketRanges):
+            winner, proof = pick_winner_ranges(
+                seed_hex, tickets,
+                workers=Config.DRAW_WORKERS,
+                chunk_size=Config.DRAW_CHUNK_SIZE,
+                min_parallel=Config.DRAW_PARALLEL_MIN_TICKETS,
+                cache=result_cache
+            )
+            with stage('serialize'):
+                return jsonify({
+                    'success': True,
+                    'valid': str(winner) == str(claimed_winner),
+                    'calculated_winner': int(winner),
+                    'claimed_winner': int(claimed_winner),
+                    'proof': proof
+                })
+        
+        # Recalculate winner (a lookup in the result cache for repeated inputs)
+        winner, scores, proof = pick_winner(
+            seed_hex, tickets,
+            include_scores=include_scores,
+            workers=Config.DRAW_WORKERS,
+            chunk_size=Config.DRAW_CHUNK_SIZE,
+            min_parallel=Config.DRAW_PARALLEL_MIN_TICKETS,
+            cache=result_cache
+        )
         is_valid = str(winner) == str(claimed_winner)
         
-        return jsonify({
+        response = {
             'success': True,
             'valid': is_valid,
             'calculated_winner': int(winner),
             'claimed_winner': int(claimed_winner),
-            'scores': {k: str(v) for k, v in scores.items()},
             'proof': proof
-        })
+        }
+        if include_scores:
+            response['scores'] = proof['scores']
+        with stage('serialize'):
+            return jsonify(response)
         
     except Exception as e:
         logger.error(f"Verification error: {e}")
@@ -280,6 +1110,115 @@ def verify_result():
             'error': str(e)
         }), 500
 
+def stored_draw_record(draw_id: str, draw) -> Dict[str, Any]:
+    """
+    Batch verification record re-checking a stored draw against its recorded
+    winner(s); range-encoded draws stay TicketRanges, within the range limits
+    """
+    if draw is None:
+        return {'draw_id': draw_id, 'error': f'Draw {draw_id} not found'}
+    record = {'draw_id': draw_id, 'seed_hex': draw.seed_hex, 'tickets': draw.ticket_set()}
+    proof = draw.proof or {}
+    if 'k' in proof and 'winners' in proof:
+        record['claimed_winners'] = [w['ticket'] for w in proof['winners']]
+    else:
+        record['claimed_winner'] = draw.winner_ticket
+    if isinstance(record['tickets'], TicketRanges):
+        options = ['prize places'] if 'claimed_winners' in record else []
+        error = ticket_ranges_error(record['tickets'], options, from_request=False)
+        if error is not None:
+            record['error'] = error
+    return record
+
+@app.route('/api/lottery/verify/batch', methods=['POST'])
+def verify_batch():
+    """
+    Verify many draws in one request
+    
+    Request body:
+        "records": [{"seed_hex": str, "tickets": [int] | "ticket_set": str,
+            "claimed_winner": int | "claimed_winners": [int], "id": any}]
+            (optional)
+        "ticket_sets": {name: [int]} (optional; ticket lists shared by
+            several records, sent once and referenced by "ticket_set")
+        "draw_ids": [str] (optional; stored draws, re-verified against
+            their recorded winners)
+        "verified_by": str (optional, defaults to the client address)
+    
+    Response: NDJSON, one verdict per line in completion order ("index" is
+    the record's position - records first, then draw_ids), then a
+    {"summary": {...}} line. Verdicts are logged to the verifications table.
+    """
+    try:
+        data = request.json or {}
+        records = data.get('records') or []
+        ticket_sets = data.get('ticket_sets') or {}
+        draw_ids = data.get('draw_ids') or []
+        
+        if not isinstance(records, list) or not isinstance(ticket_sets, dict) or not isinstance(draw_ids, list):
+            return jsonify({
+                'success': False,
+                'error': 'records and draw_ids must be lists, ticket_sets an object'
+            }), 400
+        if not records and not draw_ids:
+            return jsonify({
+                'success': False,
+                'error': 'Nothing to verify'
+            }), 400
+        if len(records) + len(draw_ids) > Config.BATCH_VERIFY_MAX_RECORDS:
+            return jsonify({
+                'success': False,
+                'error': f'At most {Config.BATCH_VERIFY_MAX_RECORDS} records per batch'
+            }), 400
+        
+        resolved = []
+        for record in records:
+            if not isinstance(record, dict):
+                record = {'error': 'record must be an object'}
+            elif 'ticket_set' in record and 'tickets' not in record:
+                name = record['ticket_set']
+                if name in ticket_sets:
+                    # The shared list object is normalised once for all its records
+                    record = dict(record, tickets=ticket_sets[name])
+                else:
+                    record = dict(record, error=f'Unknown ticket_set {name}')
+            resolved.append(record)
+        
+        stored = draw_history.get_many([str(d) for d in draw_ids])
+        resolved.extend(stored_draw_record(str(d), stored.get(str(d))) for d in draw_ids)
+        
+        batch = BatchVerification(
+            resolved,
+            workers=Config.DRAW_WORKERS,
+            min_parallel=Config.DRAW_PARALLEL_MIN_TICKETS,
+            cache=result_cache
+        )
+        verified_by = data.get('verified_by') or request.remote_addr
+        
+        def lines() -> Iterator[str]:
+            logged = []
+            try:
+                for verdict in batch:
+                    logged.append(verdict)
+                    yield json.dumps(verdict) + '\n'
+            except Exception as e:
+                logger.error(f"Batch verification error: {e}")
+                yield json.dumps({'error': str(e)}) + '\n'
+            try:
+                draw_history.log_verifications(logged, verified_by)
+            except Exception as e:
+                logger.error(f"Error logging verifications: {e}")
+            yield json.dumps({'summary': batch.stats}) + '\n'
+        
+        return chunked_response(lines(), 'application/x-ndjson', gzip=False)
+        
+    except Exception as e:
+        logger.error(f"Batch verification error: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @app.route('/api/bitcoin/latest', methods=['GET'])
 def get_latest_block():
     """Get latest Bitcoin block information"""
@@ -288,7 +1227,8 @@ def get_latest_block():
         if height:
             return jsonify({
                 'success': True,
-                'latest_block_height': height
+                'latest_block_height': height,
+                'age_seconds': get_tip_status()['age_seconds']
             })
         else:
             raise Exception("Could not get block height")
@@ -299,23 +1239,101 @@ def get_latest_block():
             'error': str(e)
         }), 500
 
+def if_loaded(loaded: bool, value: Callable[[], Any], default: Any = None) -> Any:
+    """
+    value(), unless LAZY_INIT is on and the resource it reads is not built yet
+    (health checks and metric scrapes must not undo the cold-start mode)
+    """
+    return value() if loaded or not LAZY_INIT else default
+
+def ticket_store_loaded() -> bool:
+    return _ticket_store is not None
+
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (in lazy mode, resources not used yet are reported as null)"""
     return jsonify({
         'status': 'ok',
         'service': 'BTC Lottery',
         'version': '2.0.0',
-        'tickets_count': len(load_tickets()),
-        'history_count': len(lottery_history)
+        'tickets_count': if_loaded(ticket_store_loaded(), lambda: len(get_ticket_store())),
+        'history_count': if_loaded(draw_history.loaded, lambda: draw_history.count()),
+        'block_cache': get_cache_stats(),
+        'header_store': get_header_store_status(),
+        'result_cache': result_cache.get_stats(),
+        'jobs': if_loaded(draw_jobs.loaded, lambda: draw_jobs.counts()),
+        'tip': get_tip_status()
     })
 
+def _cache_counts(stats: Dict[str, int], keys: List[str]) -> Dict[tuple, int]:
+    return {(key,): stats[key] for key in keys if key in stats}
+
+def _ticket_store_counts() -> Dict[tuple, int]:
+    if LAZY_INIT and not ticket_store_loaded():
+        return {}
+    store = get_ticket_store()
+    if isinstance(store, TicketSnapshot):
+        return {}
+    return _cache_counts(store.log.stats, ['appends', 'fsyncs'])
+
+metrics.registry.callback(
+    'lottery_tickets', 'Tickets in the store',
+    lambda: if_loaded(ticket_store_loaded(), lambda: {(): len(get_ticket_store())}, {})
+)
+metrics.registry.callback(
+    'lottery_ticket_log_operations_total', 'Ticket log appends and fsyncs in this process',
+    _ticket_store_counts, ('operation',), 'counter'
+)
+metrics.registry.callback(
+    'lottery_block_cache_lookups_total', 'Block hash cache lookups by result',
+    lambda: _cache_counts(get_cache_stats(), ['memory_hits', 'snapshot_hits', 'disk_hits', 'misses']),
+    ('result',), 'counter'
+)
+metrics.registry.callback(
+    'lottery_result_cache_lookups_total', 'Draw result cache lookups by result',
+    lambda: _cache_counts(result_cache.get_stats(), ['memory_hits', 'disk_hits', 'misses']), ('result',), 'counter'
+)
+metrics.registry.callback(
+    'lottery_result_cache_evictions_total', 'Draw result cache evictions',
+    lambda: {(): result_cache.get_stats()['evictions']}, kind='counter'
+)
+metrics.registry.callback(
+    'lottery_tip_requests_total', 'Tip height reads by outcome',
+    lambda: _cache_counts(get_tip_status(), ['hits', 'fetches', 'coalesced', 'errors']), ('result',), 'counter'
+)
+metrics.registry.callback(
+    'lottery_tip_age_seconds', 'Age of the cached tip height', lambda: {(): get_tip_status()['age_seconds']}
+)
+metrics.registry.callback(
+    'lottery_jobs', 'Draw jobs by status',
+    lambda: if_loaded(draw_jobs.loaded, lambda: {(status,): n for status, n in draw_jobs.counts().items()}, {}),
+    ('status',)
+)
+metrics.registry.callback(
+    'lottery_draw_history_pending', 'Draws buffered for the next history insert',
+    lambda: {(): if_loaded(draw_history.loaded, lambda: draw_history.get_stats()['pending'], 0)}
+)
+metrics.registry.callback(
+    'lottery_draw_history_dropped_total', 'Draws dropped after their history insert failed twice',
+    lambda: {(): if_loaded(draw_history.loaded, lambda: draw_history.get_stats()['dropped'], 0)}, (), 'counter'
+)
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Metrics in the Prometheus text format"""
+    if not Config.METRICS_ENABLED:
+        return jsonify({
+            'success': False,
+            'error': 'Metrics are disabled'
+        }), 404
+    return Response(metrics.registry.render(), mimetype=None, content_type=metrics.CONTENT_TYPE)
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 10000))
     debug = os.environ.get('DEBUG', 'False').lower() == 'true'
     
     logger.info(f"Starting BTC Lottery server on port {port}")
     logger.info(f"Debug mode: {debug}")
-    logger.info(f"Tickets loaded: {len(load_tickets())}")
+    logger.info(f"Tickets loaded: {len(get_ticket_store())}")
     
     app.run(debug=debug, host='0.0.0.0', port=port)
\ No newline at end of file
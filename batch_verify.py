@@ -0,0 +1,252 @@
+"""
+Batch Verify - Verification of many draws in one pass
+Shared ticket sets are normalised and hashed once; draws run on a process pool
+"""
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from lottery_core import (PARALLEL_MIN_TICKETS, _scan_winner, _score_base, _tie_breaker_digest,
+                          normalize_ticket_number, pick_winners)
+from result_cache import ResultCache
+from ticket_ranges import TicketRanges
+from ticket_set import TicketSet
+
+# (seed_hex, number of places) - one draw to recompute over a ticket set
+Job = Tuple[str, int]
+
+def _verify_jobs(tickets: Union[List[str], TicketRanges], jobs: List[Job]) -> List[Tuple[Job, List[str], Dict[str, Any]]]:
+    """
+    Winners of one ticket set under several seeds (runs in a worker process)
+
+    Args:
+        tickets: Normalised tickets, or TicketRanges (iterated lazily, never expanded)
+        jobs: (seed_hex, places) to compute
+
+    Returns:
+        List: (job, winners by place, proof fields) per job
+    """
+    results = []
+    for seed_hex, k in jobs:
+        normalized = tickets.iter_normalized() if isinstance(tickets, TicketRanges) else tickets
+        if k == 1:
+            base = _score_base(bytes.fromhex(seed_hex))
+            winner, min_digest, min_tb = _scan_winner(base, normalized)
+            if min_tb is None:
+                min_tb = _tie_breaker_digest(base, winner.encode())
+            results.append(((seed_hex, k), [winner], {
+                'winner_score': str(int.from_bytes(min_digest, 'big')),
+                'winner_tie_breaker': str(int.from_bytes(min_tb, 'big'))
+            }))
+        else:
+            winners, proof = pick_winners(seed_hex, normalized, k)
+            results.append(((seed_hex, k), winners, {'winners': proof['winners']}))
+    return results
+
+class BatchVerification:
+    """
+    One batch of verifications; iterate it to get verdicts as they finish
+
+    Each record is a dict with ``seed_hex``, ``tickets`` and either
+    ``claimed_winner`` or ``claimed_winners`` (optional ``id`` and
+    ``draw_id`` are echoed back; a record with an ``error`` - e.g. a draw
+    reference that could not be resolved - is reported as is). Before
+    anything is scored:
+
+    - ticket lists are canonicalised once per list object (TicketSet:
+      validated, duplicates merged) and grouped by their fingerprint, so
+      draws over the same tickets share one copy; TicketRanges (stored
+      range-encoded draws) are kept as ranges, grouped by their digest
+    - records with the same seed, ticket set and number of places share
+      one computation
+    - single-winner draws already in the result cache are answered from it
+
+    The remaining draws are sent to a process pool as one task per ticket
+    set (split into at most ``workers`` tasks if it has many seeds), so a
+    ticket list is pickled a few times rather than once per draw. Batches
+    scoring fewer than ``min_parallel`` tickets in total run inline.
+    Verdicts come out in completion order; ``index`` is the record's
+    position in the request.
+    """
+
+    def __init__(self, records: List[Dict[str, Any]], workers: Optional[int] = None,
+                 min_parallel: int = PARALLEL_MIN_TICKETS, cache: Optional[ResultCache] = None):
+        self.records = records
+        self.workers = workers or os.cpu_count() or 1
+        self.min_parallel = min_parallel
+        self.cache = cache
+        self._sets: Dict[str, Union[List[str], TicketRanges]] = {}
+        self._groups: Dict[str, Dict[Job, List[int]]] = {}
+        self._set_info: Dict[int, Dict[str, Any]] = {}
+        self.stats: Dict[str, Any] = {
+            'records': len(records),
+            'valid': 0,
+            'invalid': 0,
+            'errors': 0,
+            'ticket_sets': 0,
+            'draws_computed': 0,
+            'cache_hits': 0,
+            'seconds': 0.0,
+        }
+
+    def _prepare(self) -> Tuple[List[Dict[str, Any]], Dict[str, Union[List[str], TicketRanges]],
+                                Dict[str, Dict[Job, List[int]]], Dict[int, Dict[str, Any]]]:
+        """Error verdicts, ticket sets by digest, record indices by (set, job), set digests by record"""
+        errors = []
+        sets: Dict[str, Union[List[str], TicketRanges]] = {}
+        groups: Dict[str, Dict[Job, List[int]]] = {}
+        set_info: Dict[int, Dict[str, Any]] = {}
+        by_list: Dict[int, Tuple[str, Dict[str, Any]]] = {}
+
+        for index, record in enumerate(self.records):
+            try:
+                if record.get('error'):
+                    raise ValueError(record['error'])
+                seed_hex = str(record['seed_hex']).lower()
+                bytes.fromhex(seed_hex)
+                tickets = record['tickets']
+                if not tickets:
+                    raise ValueError('no tickets')
+                claimed = record.get('claimed_winners')
+                if claimed is None:
+                    if record.get('claimed_winner') is None:
+                        raise ValueError('claimed_winner or claimed_winners is required')
+                    normalize_ticket_number(record['claimed_winner'])
+                    k = 1
+                elif not isinstance(claimed, list) or not claimed:
+                    raise ValueError('claimed_winners must be a non-empty list')
+                else:
+                    for winner in claimed:
+                        normalize_ticket_number(winner)
+                    k = len(claimed)
+
+                # The same list object (a shared ticket set) is canonicalised once
+                known = by_list.get(id(tickets))
+                if known is None:
+                    if isinstance(tickets, TicketRanges):
+                        # Same digest as the expanded list, so ranges and lists of one set still merge
+                        info = tickets.digest()
+                        sets.setdefault(info['digest'], tickets)
+                    else:
+                        ticket_set = TicketSet.of(tickets)
+                        info = ticket_set.fingerprint()
+                        sets.setdefault(info['digest'], ticket_set.normalized)
+                    known = by_list[id(tickets)] = (info['digest'], info)
+                digest, info = known
+            except (KeyError, TypeError, ValueError) as e:
+                error = e.args[0] if isinstance(e, KeyError) else e
+                message = f'missing {error}' if isinstance(e, KeyError) else str(error)
+                errors.append(self._verdict(index, record, error=message))
+                continue
+
+            set_info[index] = info
+            groups.setdefault(digest, {}).setdefault((seed_hex, k), []).append(index)
+
+        return errors, sets, groups, set_info
+
+    def _verdict(self, index: int, record: Dict[str, Any], ticket_set: Optional[Dict[str, Any]] = None,
+                 winners: Optional[List[str]] = None, proof: Optional[Dict[str, Any]] = None,
+                 error: Optional[str] = None) -> Dict[str, Any]:
+        verdict: Dict[str, Any] = {'index': index}
+        for field in ('id', 'draw_id'):
+            if record.get(field) is not None:
+                verdict[field] = record[field]
+        if error is not None:
+            self.stats['errors'] += 1
+            verdict.update(valid=False, error=error)
+            return verdict
+
+        verdict['seed_hex'] = str(record['seed_hex']).lower()
+        verdict['ticket_set'] = ticket_set
+        claimed = record.get('claimed_winners')
+        if claimed is not None:
+            valid = [normalize_ticket_number(w) for w in claimed] == winners
+            verdict['calculated_winners'] = [int(w) for w in winners]
+            verdict['claimed_winners'] = [int(w) for w in claimed]
+        else:
+            valid = normalize_ticket_number(record['claimed_winner']) == winners[0]
+            verdict['calculated_winner'] = int(winners[0])
+            verdict['claimed_winner'] = int(record['claimed_winner'])
+        verdict['valid'] = valid
+        verdict['proof'] = proof
+        self.stats['valid' if valid else 'invalid'] += 1
+        return verdict
+
+    def _cached(self, digest: str, set_size: int, job: Job) -> Optional[Tuple[List[str], Dict[str, Any]]]:
+        seed_hex, k = job
+        if self.cache is None or k != 1:
+            return None
+        entry = self.cache.get(self.cache.key(seed_hex, {'count': set_size, 'digest': digest}))
+        if entry is None:
+            return None
+        winner, _, stored = entry
+        return [winner], {'winner_score': stored['winner_score'], 'winner_tie_breaker': stored['winner_tie_breaker']}
+
+    def _store(self, digest: str, set_size: int, job: Job, winners: List[str], proof: Dict[str, Any]) -> None:
+        seed_hex, k = job
+        if self.cache is None or k != 1:
+            return
+        stored = dict(proof, seed_hex=seed_hex, winner=winners[0])
+        self.cache.put(self.cache.key(seed_hex, {'count': set_size, 'digest': digest}), (winners[0], None, stored), set_size)
+
+    def _tasks(self, pending: Dict[str, List[Job]]) -> List[Tuple[str, List[Job]]]:
+        tasks = []
+        for digest, jobs in pending.items():
+            size = math.ceil(len(jobs) / self.workers)
+            tasks.extend((digest, jobs[i:i + size]) for i in range(0, len(jobs), size))
+        return tasks
+
+    def _verdicts(self, digest: str, job: Job, winners: List[str], proof: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        # Every record that asked for this draw
+        for index in self._groups[digest][job]:
+            yield self._verdict(index, self.records[index], self._set_info[index], winners, proof)
+
+    def _finish(self, digest: str, jobs: List[Job], compute) -> Iterator[Dict[str, Any]]:
+        try:
+            results = compute()
+        except Exception as e:
+            for job in jobs:
+                for index in self._groups[digest][job]:
+                    yield self._verdict(index, self.records[index], error=str(e))
+            return
+        for job, winners, proof in results:
+            self.stats['draws_computed'] += 1
+            self._store(digest, len(self._sets[digest]), job, winners, proof)
+            yield from self._verdicts(digest, job, winners, proof)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        start = time.perf_counter()
+        errors, self._sets, self._groups, self._set_info = self._prepare()
+        sets = self._sets
+        self.stats['ticket_sets'] = len(sets)
+        yield from errors
+
+        # Draws answered by the cache go first
+        pending: Dict[str, List[Job]] = {}
+        work = 0
+        for digest, jobs in self._groups.items():
+            for job in jobs:
+                cached = self._cached(digest, len(sets[digest]), job)
+                if cached is not None:
+                    self.stats['cache_hits'] += 1
+                    yield from self._verdicts(digest, job, *cached)
+                else:
+                    pending.setdefault(digest, []).append(job)
+                    work += len(sets[digest])
+
+        tasks = self._tasks(pending)
+        if self.workers <= 1 or work < self.min_parallel or len(tasks) < 2:
+            # Inline, one draw at a time so verdicts still stream
+            for digest, jobs in pending.items():
+                for job in jobs:
+                    yield from self._finish(digest, [job], lambda: _verify_jobs(sets[digest], [job]))
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(tasks))) as executor:
+                futures = {executor.submit(_verify_jobs, sets[digest], jobs): (digest, jobs) for digest, jobs in tasks}
+                for future in as_completed(futures):
+                    digest, jobs = futures[future]
+                    yield from self._finish(digest, jobs, future.result)
+
+        self.stats['seconds'] = round(time.perf_counter() - start, 6)
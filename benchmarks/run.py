@@ -0,0 +1,348 @@
+"""
+Benchmarks - Core engine, ticket store, HTTP endpoints and cold start
+Throughput, latency percentiles and peak memory; JSON results compared against a saved baseline
+
+Usage:
+    python benchmarks/run.py                                  # 1e3..1e6 tickets
+    python benchmarks/run.py --sizes 1000,10000000            # any sizes (1e7 needs several GB)
+    python benchmarks/run.py --output results.json --baseline benchmarks/baseline.json
+    python benchmarks/run.py --output benchmarks/baseline.json   # save a new baseline
+    python benchmarks/run.py --only startup                   # import and first-request latency, eager vs lazy
+
+Exit code is 1 if any benchmark is slower than the baseline by more than --threshold.
+"""
+import argparse
+import gc
+import json
+import logging
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def summarize(timings: List[float], items: int = 1, peak_bytes: Optional[int] = None) -> Dict[str, Any]:
+    """Latency percentiles (seconds) and throughput (items per second at the median)"""
+    ordered = sorted(timings)
+    p50 = percentile(ordered, 50)
+    stats = {
+        'samples': len(ordered),
+        'items': items,
+        'min_s': ordered[0],
+        'p50_s': p50,
+        'p95_s': percentile(ordered, 95),
+        'p99_s': percentile(ordered, 99),
+        'max_s': ordered[-1],
+        'throughput': items / p50 if p50 > 0 else None,
+    }
+    if peak_bytes is not None:
+        stats['peak_bytes'] = peak_bytes
+    return stats
+
+def measure(fn: Callable[[], Any], repeat: int, items: int = 1, memory: bool = True) -> Dict[str, Any]:
+    """
+    Time fn() repeat times; peak memory is traced in one extra run
+
+    tracemalloc slows Python allocations down, so it is never active
+    while timings are taken.
+    """
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return summarize(timings, items, peak)
+
+def measure_calls(fn: Callable[[Any], Any], args: List[Any]) -> Dict[str, Any]:
+    """Per-call latency percentiles of fn(arg) for every arg"""
+    timings = []
+    perf_counter = time.perf_counter
+    for arg in args:
+        start = perf_counter()
+        fn(arg)
+        timings.append(perf_counter() - start)
+    return summarize(timings)
+
+def bench_core(sizes: List[int], repeat: int, max_scored: int, memory: bool) -> Dict[str, Any]:
+    from lottery_core import compute_score, generate_seed, get_lottery_result, pick_winner
+
+    results: Dict[str, Any] = {}
+    rng = random.Random(1)
+    block_hashes = [f'{rng.getrandbits(256):064x}' for _ in range(3)]
+    seed = generate_seed(block_hashes)
+    seed_hex = seed.hex()
+
+    hash_sets = [[f'{rng.getrandbits(256):064x}' for _ in range(3)] for _ in range(10_000)]
+    results['generate_seed'] = measure_calls(generate_seed, hash_sets)
+    results['compute_score/call'] = measure_calls(lambda t: compute_score(seed, t), [str(i) for i in range(10_000)])
+
+    for n in sizes:
+        tickets = rng.sample(range(2 ** 40), n)
+        normalized = [str(t) for t in tickets]
+        runs = repeat if n < 1_000_000 else 1
+        results[f'compute_score/{n}'] = measure(lambda: [compute_score(seed, t) for t in normalized], runs, n, memory)
+        results[f'pick_winner/winner_only/{n}'] = measure(
+            lambda: pick_winner(seed_hex, tickets, include_scores=False), runs, n, memory
+        )
+        results[f'get_lottery_result/winner_only/{n}'] = measure(
+            lambda: get_lottery_result(block_hashes, tickets, include_scores=False), runs, n, memory
+        )
+        if n <= max_scored:
+            results[f'pick_winner/scores/{n}'] = measure(lambda: pick_winner(seed_hex, tickets), runs, n, memory)
+            results[f'get_lottery_result/scores/{n}'] = measure(
+                lambda: get_lottery_result(block_hashes, tickets), runs, n, memory
+            )
+        print(f"  core: {n} tickets done", file=sys.stderr)
+    return results
+
+def bench_store(sizes: List[int], memory: bool) -> Dict[str, Any]:
+    from ticket_log import benchmark as log_benchmark
+    from ticket_store import TicketStore
+
+    results: Dict[str, Any] = {}
+    rng = random.Random(2)
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = TicketStore(os.path.join(tmp, 'tickets.u64'), compact_threshold=10 ** 9)
+            tickets = rng.sample(range(2 ** 40), n)
+            results[f'store/replace/{n}'] = measure(lambda: store.replace(tickets), 1, n, memory)
+            probes = rng.sample(tickets, min(n, 10_000))
+            results[f'store/contains/{n}'] = measure_calls(store.__contains__, probes)
+            new = [2 ** 41 + i for i in range(200)]
+            results[f'store/add/{n}'] = measure_calls(store.add, new)
+            results[f'store/to_list/{n}'] = measure(store.to_list, 3, n, memory)
+            results[f'store/compact/{n}'] = measure(store.compact, 1, n, False)
+            store.close()
+    with tempfile.TemporaryDirectory() as tmp:
+        results['store/concurrent_add'] = log_benchmark(os.path.join(tmp, 'tickets.u64'), writers=8, ops=200)
+    return results
+
+def bench_http(ticket_count: int, requests_per_endpoint: int) -> Dict[str, Any]:
+    """Flask endpoints through the test client, with the Bitcoin API replaced by a stub"""
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update({
+            'TIP_POLL_INTERVAL': '0',
+            'DATABASE_URL': 'sqlite:///' + os.path.join(tmp, 'lottery.db'),
+            'TICKETS_STORE': os.path.join(tmp, 'tickets.u64'),
+            'TICKETS_FILE': os.path.join(tmp, 'tickets.json'),
+            'BLOCK_CACHE_FILE': '',
+            'RATELIMIT_ENABLED': 'False',
+        })
+        # Config reads the environment when it is first imported
+        import app as app_module
+        logging.getLogger(app_module.__name__).setLevel(logging.WARNING)
+
+        heights = iter(range(800_000, 10 ** 9))
+
+        def stub_block_hashes(draw_block_height=None, count=3):
+            top = next(heights) if draw_block_height is None else draw_block_height
+            chain = [top - i for i in range(count)]
+            return [f'{h:064x}' for h in chain], chain
+
+        app_module.get_block_hashes_for_draw = stub_block_hashes
+        client = app_module.app.test_client()
+        tickets = list(range(1, ticket_count + 1))
+        app_module.save_tickets(tickets)
+
+        def timed(method: str, url: str, **kwargs) -> float:
+            start = time.perf_counter()
+            response = client.open(url, method=method, **kwargs)
+            elapsed = time.perf_counter() - start
+            if response.status_code >= 400:
+                raise RuntimeError(f"{method} {url} -> {response.status_code}: {response.get_data(as_text=True)[:200]}")
+            return elapsed
+
+        def run(name: str, make_request: Callable[[int], float]) -> None:
+            make_request(-1)  # warm-up
+            results[name] = summarize([make_request(i) for i in range(requests_per_endpoint)])
+
+        run(f'http/draw/{ticket_count}', lambda i: timed('POST', '/api/lottery/draw', json={}))
+        run(f'http/draw/winner_only/{ticket_count}',
+            lambda i: timed('POST', '/api/lottery/draw', json={'include_scores': False}))
+
+        seed_hex = client.post('/api/lottery/draw', json={}).get_json()['result']['seed_hex']
+        run(f'http/verify/cached/{ticket_count}', lambda i: timed('POST', '/api/lottery/verify', json={
+            'seed_hex': seed_hex, 'tickets': tickets, 'claimed_winner': 1, 'include_scores': False
+        }))
+        run(f'http/verify/{ticket_count}', lambda i: timed('POST', '/api/lottery/verify', json={
+            'seed_hex': f'{i + 2:064x}', 'tickets': tickets, 'claimed_winner': 1, 'include_scores': False
+        }))
+        run(f'http/tickets/get/{ticket_count}', lambda i: timed('GET', '/api/lottery/tickets'))
+        run('http/tickets/add', lambda i: timed('POST', '/api/lottery/tickets', json={'ticket': 10 ** 12 + i + 1}))
+        app_module.draw_history.flush()
+        app_module.get_ticket_store().close()
+    return results
+
+# Run in a fresh interpreter per sample: import of the app, then its first request
+STARTUP_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get('/api/lottery/tickets')
+done = time.perf_counter()
+if response.status_code != 200:
+    raise SystemExit(f'first request failed: {response.status_code}')
+print(json.dumps({'import': imported - start, 'first_request': done - imported}))
+"""
+
+def bench_startup(ticket_count: int, runs: int) -> Dict[str, Any]:
+    """
+    Cold start of the app in fresh processes: ``eager`` builds everything
+    at import (the default), ``lazy`` is the serverless setup (LAZY_INIT,
+    tickets from a prebuilt snapshot). Interpreter start-up is not included.
+    """
+    from ticket_store import write_snapshot
+
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        store = os.path.join(tmp, 'tickets.u64')
+        snapshot = os.path.join(tmp, 'tickets.snap')
+        write_snapshot(store, range(1, ticket_count + 1))
+        write_snapshot(snapshot, range(1, ticket_count + 1))
+        modes = {
+            'eager': {'LAZY_INIT': 'False', 'TICKETS_SNAPSHOT': ''},
+            'lazy': {'LAZY_INIT': 'True', 'TICKETS_SNAPSHOT': snapshot},
+        }
+        for mode, settings in modes.items():
+            env = dict(os.environ, PYTHONPATH=ROOT, TIP_POLL_INTERVAL='0', BLOCK_CACHE_FILE='', RATELIMIT_ENABLED='True',
+                       TICKETS_STORE=store, TICKETS_FILE=os.path.join(tmp, 'tickets.json'),
+                       DATABASE_URL='sqlite:///' + os.path.join(tmp, f'{mode}.db'), **settings)
+            samples: Dict[str, List[float]] = {'import': [], 'first_request': [], 'total': []}
+            for _ in range(runs):
+                output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], cwd=tmp, env=env,
+                                        capture_output=True, text=True, check=True).stdout
+                timings = json.loads(output.strip().splitlines()[-1])
+                samples['import'].append(timings['import'])
+                samples['first_request'].append(timings['first_request'])
+                samples['total'].append(timings['import'] + timings['first_request'])
+            for name, values in samples.items():
+                results[f'startup/{mode}/{name}'] = summarize(values)
+        print(f"  startup: {runs} runs per mode done", file=sys.stderr)
+    return results
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """
+    Compare median latencies with a baseline
+
+    Returns:
+        List: one row per benchmark present in both runs, with ratio
+        (current / baseline p50) and regression = ratio > 1 + threshold
+    """
+    rows = []
+    for name, stats in current.items():
+        base = baseline.get(name)
+        if not isinstance(stats, dict) or not isinstance(base, dict):
+            continue
+        if 'p50_s' not in stats or not base.get('p50_s'):
+            continue
+        ratio = stats['p50_s'] / base['p50_s']
+        rows.append({
+            'name': name,
+            'baseline_p50_s': base['p50_s'],
+            'p50_s': stats['p50_s'],
+            'ratio': round(ratio, 3),
+            'regression': ratio > 1 + threshold,
+        })
+    return rows
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='comma-separated ticket counts for the core benchmarks')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per benchmark (1 for >= 1e6 tickets)')
+    parser.add_argument('--max-scored', type=int, default=1_000_000,
+                        help='largest size for benchmarks that build per-ticket score dicts')
+    parser.add_argument('--store-sizes', default='10000,1000000', help='ticket counts for the ticket store benchmarks')
+    parser.add_argument('--http-tickets', type=int, default=10_000, help='tickets in the store for HTTP benchmarks')
+    parser.add_argument('--http-requests', type=int, default=20, help='requests per endpoint')
+    parser.add_argument('--startup-tickets', type=int, default=100_000, help='tickets in the store for startup benchmarks')
+    parser.add_argument('--startup-runs', type=int, default=5, help='fresh processes per startup mode')
+    parser.add_argument('--only', choices=['core', 'store', 'http', 'startup'], action='append',
+                        help='run only these groups')
+    parser.add_argument('--no-memory', action='store_true', help='skip the peak memory runs')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='compare with a results file from an earlier run')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown before flagging (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    groups = args.only or ['core', 'store', 'http', 'startup']
+    memory = not args.no_memory
+    results: Dict[str, Any] = {}
+    if 'core' in groups:
+        results.update(bench_core([int(float(s)) for s in args.sizes.split(',')], args.repeat, args.max_scored, memory))
+    if 'store' in groups:
+        results.update(bench_store([int(float(s)) for s in args.store_sizes.split(',')], memory))
+    if 'http' in groups:
+        results.update(bench_http(args.http_tickets, args.http_requests))
+    if 'startup' in groups:
+        results.update(bench_startup(args.startup_tickets, args.startup_runs))
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': results,
+    }
+
+    for name, stats in results.items():
+        if 'p50_s' in stats:
+            peak = f"  peak {stats['peak_bytes'] / 2 ** 20:8.1f} MiB" if 'peak_bytes' in stats else ''
+            rate = f"  {stats['throughput']:12.0f}/s" if stats.get('throughput') else ''
+            print(f"{name:45s} p50 {stats['p50_s'] * 1000:10.3f} ms  p99 {stats['p99_s'] * 1000:10.3f} ms{rate}{peak}")
+        else:
+            print(f"{name:45s} {stats}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    regressions = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        print(f"\nCompared with {args.baseline} (threshold +{args.threshold:.0%}):")
+        for row in compare(results, baseline, args.threshold):
+            flag = 'REGRESSION' if row['regression'] else ''
+            print(f"{row['name']:45s} x{row['ratio']:6.2f}  {flag}")
+            regressions += row['regression']
+        report['comparison'] = {'baseline': args.baseline, 'threshold': args.threshold, 'regressions': regressions}
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,14 +2,202 @@
 Bitcoin API - Integration with Bitcoin blockchain
 Gets real Bitcoin block hashes using public API
 """
-import requests
-from typing import List, Optional, Tuple
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, List, Optional, Tuple
+from block_cache import BlockHashCache, BlockHashSnapshot
+from config import Config
+from header_store import HeaderError, HeaderStore, block_hash_hex, check_header, parse_header
+from tip_tracker import TipTracker
 
-API_BASE = "https://blockstream.info/api"
+if TYPE_CHECKING:
+    import requests
+
+API_BASE = Config.BITCOIN_API_URL
+API_TIMEOUT = Config.BITCOIN_API_TIMEOUT
+
+# Retries and per-request deadline (seconds, including retries)
+API_RETRIES = Config.BITCOIN_API_RETRIES
+API_BACKOFF = Config.BITCOIN_API_BACKOFF
+API_DEADLINE = Config.BITCOIN_API_DEADLINE
+
+# Maximum number of concurrent block fetches per draw
+FETCH_FANOUT = Config.BITCOIN_API_FANOUT
+
+# Only blocks with at least this many confirmations are cached
+CONFIRMATION_DEPTH = Config.BLOCK_CACHE_CONFIRMATIONS
+
+# Check proof of work and prev-hash links of headers before using their hashes
+HEADER_VERIFY = Config.HEADER_STORE_VERIFY
+
+# Headers fetched per append when syncing the header store
+SYNC_BATCH = 100
+
+_session: Optional['requests.Session'] = None
+_block_cache: Optional[BlockHashCache] = None
+_header_store: Optional[HeaderStore] = None
+_init_lock = threading.Lock()
+
+def get_session() -> 'requests.Session':
+    """
+    Shared HTTP session with a keep-alive connection pool
+    (requests is imported here, on the first API call, to keep it off cold starts)
+    
+    Returns:
+        requests.Session: Session used for all API calls
+    """
+    global _session
+    with _init_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=Config.BITCOIN_API_POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+def get_block_cache() -> BlockHashCache:
+    """
+    Block hash cache (in-memory LRU + prebuilt snapshot + persistent SQLite file)
+    
+    Returns:
+        BlockHashCache: Cache shared by all draws in this process
+    """
+    global _block_cache
+    with _init_lock:
+        if _block_cache is None:
+            snapshot = BlockHashSnapshot(Config.BLOCK_CACHE_SNAPSHOT) if Config.BLOCK_CACHE_SNAPSHOT else None
+            _block_cache = BlockHashCache(Config.BLOCK_CACHE_FILE or None, Config.BLOCK_CACHE_SIZE, snapshot)
+        return _block_cache
+
+def set_block_cache(cache: Optional[BlockHashCache]) -> None:
+    """Replace the block hash cache (None - create the default one on next use)"""
+    global _block_cache
+    with _init_lock:
+        _block_cache = cache
+
+def get_header_store() -> Optional[HeaderStore]:
+    """
+    Local block-header store, opened on first use if Config.HEADER_STORE_FILE exists
+    
+    Returns:
+        HeaderStore: Store shared by all draws, or None (hashes come from the API)
+    """
+    global _header_store
+    with _init_lock:
+        if _header_store is None and Config.HEADER_STORE_FILE and os.path.exists(Config.HEADER_STORE_FILE):
+            _header_store = HeaderStore(Config.HEADER_STORE_FILE)
+        return _header_store
+
+def set_header_store(store: Optional[HeaderStore]) -> None:
+    """Replace the header store (None - open the configured file on next use, if any)"""
+    global _header_store
+    with _init_lock:
+        _header_store = store
+
+def get_header_store_status() -> Optional[dict]:
+    """Stored height range of the header store, or None if there is none"""
+    store = get_header_store()
+    if store is None:
+        return None
+    return {'first_height': store.first_height, 'tip_height': store.tip_height, 'verify': HEADER_VERIFY}
+
+def get_cache_stats() -> dict:
+    """Hit/miss counters of the block hash cache"""
+    return get_block_cache().get_stats()
+
+def _is_confirmed(height: int) -> bool:
+    """Check that a block is buried deep enough to be cached"""
+    # A stale tip is lower than the real one, so this check only gets stricter
+    tip = get_latest_block_height()
+    return tip is not None and height <= tip - CONFIRMATION_DEPTH
+
+def _is_retryable(error: Exception) -> bool:
+    """Network errors, timeouts, 429 and 5xx are retried; other 4xx are final"""
+    import requests
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, requests.RequestException)
+
+def _fetch_text(path: str, what: str) -> Optional[str]:
+    """
+    GET an API path with retries and jittered exponential backoff
+    
+    Every attempt's timeout is capped by the per-request deadline
+    (API_DEADLINE seconds from the first attempt).
+    """
+    url = f"{API_BASE}{path}"
+    deadline = time.monotonic() + API_DEADLINE
+    
+    for attempt in range(API_RETRIES + 1):
+        remaining = deadline - time.monotonic()
+        try:
+            if remaining <= 0:
+                raise TimeoutError("deadline exceeded")
+            response = get_session().get(url, timeout=min(API_TIMEOUT, remaining))
+            response.raise_for_status()
+            return response.text.strip()
+        except Exception as e:
+            if attempt == API_RETRIES or not _is_retryable(e):
+                print(f"Error getting {what}: {e}")
+                return None
+            # Full jitter: spread retries of concurrent fetches apart
+            backoff = random.uniform(0, API_BACKOFF * (2 ** attempt))
+            time.sleep(min(backoff, max(deadline - time.monotonic(), 0)))
+    return None
+
+def _fetch_block_hash(height: int) -> Optional[str]:
+    return _fetch_text(f"/block-height/{height}", f"block {height}")
+
+def _fetch_block_header(height: int) -> Optional[bytes]:
+    """
+    Fetch the header of the block at a height
+    
+    Raises:
+        HeaderError: If the header does not hash to the block hash the API gave
+    """
+    block_hash = _fetch_block_hash(height)
+    if block_hash is None:
+        return None
+    text = _fetch_text(f"/block/{block_hash}/header", f"header {height}")
+    if text is None:
+        return None
+    header = parse_header(text)
+    if block_hash_hex(header) != block_hash:
+        raise HeaderError(f"Header of block {height} does not match its hash {block_hash}")
+    return header
+
+def _fetch_verified_hash(store: HeaderStore, height: int) -> Optional[str]:
+    """
+    Fetch a block hash together with its header and check the header's
+    proof of work, and its link to the stored parent if there is one.
+    The next confirmed header after the tip is appended to the store.
+    """
+    header = _fetch_block_header(height)
+    if header is None:
+        return None
+    parent = store.header(height - 1)
+    if parent is not None and _is_confirmed(height):
+        store.append([header])  # checks PoW and the link
+    else:
+        check_header(header, parent, store.pow_limit)
+    return block_hash_hex(header)
 
 def get_block_hash_by_height(height: int) -> Optional[str]:
     """
-    Get block hash by height using public API
+    Get block hash by height
+    
+    Heights in the local header store are answered from it, with no
+    network I/O (headers are checked first if HEADER_VERIFY is set).
+    Other confirmed blocks are served from the block hash cache, the rest
+    from the public API; with a header store and HEADER_VERIFY the API's
+    header is fetched and checked as well.
     
     Args:
         height: Block height
@@ -17,14 +205,32 @@ def get_block_hash_by_height(height: int) -> Optional[str]:
     Returns:
         str: Block hash or None on error
     """
-    try:
-        url = f"{API_BASE}/block-height/{height}"
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        return response.text.strip()
-    except Exception as e:
-        print(f"Error getting block {height}: {e}")
-        return None
+    store = get_header_store()
+    if store is not None:
+        try:
+            block_hash = store.block_hash(height, verify=HEADER_VERIFY)
+            if block_hash is not None:
+                return block_hash
+        except HeaderError as e:
+            print(f"Header check failed for block {height}: {e}")
+            return None
+    
+    cache = get_block_cache()
+    block_hash = cache.get(height)
+    if block_hash is not None:
+        return block_hash
+    
+    if store is not None and HEADER_VERIFY:
+        try:
+            block_hash = _fetch_verified_hash(store, height)
+        except HeaderError as e:
+            print(f"Header check failed for block {height}: {e}")
+            return None
+    else:
+        block_hash = _fetch_block_hash(height)
+    if block_hash is not None and _is_confirmed(height):
+        cache.put(height, block_hash)
+    return block_hash
 
 def get_latest_block_hash() -> Optional[str]:
     """
@@ -42,26 +248,87 @@ def get_latest_block_hash() -> Optional[str]:
         print(f"Error getting latest block: {e}")
         return None
 
-def get_latest_block_height() -> Optional[int]:
-    """
-    Get latest Bitcoin block height
-    
-    Returns:
-        int: Block height or None on error
-    """
+def _fetch_latest_block_height() -> Optional[int]:
     try:
         url = f"{API_BASE}/blocks/tip/height"
-        response = requests.get(url, timeout=10)
+        response = get_session().get(url, timeout=API_TIMEOUT)
         response.raise_for_status()
         return int(response.text.strip())
     except Exception as e:
         print(f"Error getting block height: {e}")
         return None
 
+_tip_tracker = TipTracker(_fetch_latest_block_height, Config.TIP_MAX_AGE)
+
+def get_latest_block_height(max_age: Optional[float] = None) -> Optional[int]:
+    """
+    Get latest Bitcoin block height
+    
+    Served from memory while the cached value is younger than max_age;
+    concurrent cache misses share a single upstream call.
+    
+    Args:
+        max_age: Staleness bound in seconds (default Config.TIP_MAX_AGE, 0 - always refresh)
+    
+    Returns:
+        int: Block height (the last known one if the refresh failed) or None on error
+    """
+    return _tip_tracker.get(max_age)
+
+def start_tip_poller(interval: float = Config.TIP_POLL_INTERVAL) -> None:
+    """Refresh the tip height in a background thread every interval seconds"""
+    if interval > 0:
+        _tip_tracker.start(interval)
+
+def get_tip_status() -> dict:
+    """Cached tip height, its age in seconds and tracker counters"""
+    return _tip_tracker.status()
+
+def sync_header_store(store: Optional[HeaderStore] = None, limit: Optional[int] = None) -> int:
+    """
+    Extend the header store from the API up to the last confirmed block
+    
+    Args:
+        store: Header store (default get_header_store())
+        limit: Append at most this many headers
+    
+    Returns:
+        int: Number of headers appended
+    
+    Raises:
+        HeaderError: If a fetched header fails its checks (nothing from
+            that batch is stored)
+    """
+    store = store or get_header_store()
+    if store is None:
+        raise Exception("No header store configured")
+    tip = get_latest_block_height(0)
+    if tip is None:
+        raise Exception("Could not get latest block height")
+    start = store.first_height if store.tip_height is None else store.tip_height + 1
+    last = tip - CONFIRMATION_DEPTH
+    if limit is not None:
+        last = min(last, start + limit - 1)
+    
+    appended = 0
+    with ThreadPoolExecutor(max_workers=max(FETCH_FANOUT, 1)) as executor:
+        for first in range(start, last + 1, SYNC_BATCH):
+            heights = range(first, min(first + SYNC_BATCH, last + 1))
+            headers = list(executor.map(_fetch_block_header, heights))
+            for height, header in zip(heights, headers):
+                if header is None:
+                    raise Exception(f"Could not get header {height}")
+            appended += store.append(headers)
+    return appended
+
 def get_block_hashes_for_draw(draw_block_height: Optional[int] = None, count: int = 3) -> Tuple[List[str], List[int]]:
     """
     Get block hashes for lottery draw
     
+    Blocks are fetched concurrently (up to FETCH_FANOUT at a time), so the
+    latency is bounded by the slowest single fetch. The order of the result
+    is always draw_block_height, draw_block_height - 1, ...
+    
     Args:
         draw_block_height: Block height for draw (if None - latest block)
         count: Number of blocks to use (default 3)
@@ -75,16 +342,17 @@ def get_block_hashes_for_draw(draw_block_height: Optional[int] = None, count: in
             raise Exception("Could not get latest block height")
         draw_block_height = latest_height
     
-    hashes = []
-    heights = []
+    heights = [draw_block_height - i for i in range(count)]
+    
+    if len(heights) <= 1 or FETCH_FANOUT <= 1:
+        hashes = [get_block_hash_by_height(height) for height in heights]
+    else:
+        with ThreadPoolExecutor(max_workers=min(FETCH_FANOUT, len(heights))) as executor:
+            hashes = list(executor.map(get_block_hash_by_height, heights))
     
-    for i in range(count):
-        height = draw_block_height - i
-        block_hash = get_block_hash_by_height(height)
+    for height, block_hash in zip(heights, hashes):
         if block_hash is None:
             raise Exception(f"Could not get block {height}")
-        hashes.append(block_hash)
-        heights.append(height)
     
     return hashes, heights
 
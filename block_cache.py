@@ -0,0 +1,193 @@
+"""
+Block Cache - Two-level height -> block hash cache
+In-process LRU in front of a persistent SQLite map, optionally backed by a read-only snapshot file
+"""
+import bisect
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+# Snapshot header: magic, version, number of blocks
+SNAPSHOT_HEADER = struct.Struct('<4sHxxQ')
+SNAPSHOT_MAGIC = b'BHSN'
+SNAPSHOT_VERSION = 1
+HASH_SIZE = 32
+
+class BlockHashSnapshot:
+    """
+    Read-only height -> hash map in a memory-mapped file
+
+    Layout: 16-byte header, then the heights as a sorted little-endian
+    uint64 array, then the 32-byte hashes in the same order. Opening maps
+    the file and nothing else; a lookup is a binary search over the
+    heights. Built by write_block_snapshot() (python snapshot.py blocks)
+    from confirmed blocks, so it can ship with a read-only deployment.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(SNAPSHOT_HEADER.size)
+            if len(header) < SNAPSHOT_HEADER.size:
+                raise ValueError(f"Not a block hash snapshot: {path}")
+            magic, version, count = SNAPSHOT_HEADER.unpack(header)
+            if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                raise ValueError(f"Not a block hash snapshot: {path}")
+            if os.fstat(f.fileno()).st_size != SNAPSHOT_HEADER.size + count * (8 + HASH_SIZE):
+                raise ValueError(f"Corrupted block hash snapshot (bad size): {path}")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if count else None
+        self.count = count
+        self._hashes_at = SNAPSHOT_HEADER.size + count * 8
+        if self._mmap is None:
+            self._heights = array('Q')
+        elif sys.byteorder == 'big':
+            self._heights = array('Q', self._mmap[SNAPSHOT_HEADER.size:self._hashes_at])
+            self._heights.byteswap()
+        else:
+            self._heights = memoryview(self._mmap)[SNAPSHOT_HEADER.size:self._hashes_at].cast('Q')
+
+    def __len__(self) -> int:
+        return self.count
+
+    def get(self, height: int) -> Optional[str]:
+        heights = self._heights
+        i = bisect.bisect_left(heights, height)
+        if i == len(heights) or heights[i] != height:
+            return None
+        offset = self._hashes_at + i * HASH_SIZE
+        return self._mmap[offset:offset + HASH_SIZE].hex()
+
+    def close(self) -> None:
+        if isinstance(self._heights, memoryview):
+            self._heights.release()
+        self._heights = array('Q')
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+def write_block_snapshot(path: str, blocks: Iterable[Tuple[int, str]]) -> int:
+    """
+    Write a block hash snapshot (see BlockHashSnapshot) atomically
+
+    Args:
+        path: Snapshot file
+        blocks: (height, hash hex) pairs in any order; a repeated height keeps its last hash
+
+    Returns:
+        int: Number of blocks written
+    """
+    by_height = {int(height): bytes.fromhex(block_hash) for height, block_hash in blocks}
+    for height, raw in by_height.items():
+        if len(raw) != HASH_SIZE:
+            raise ValueError(f"Block hash at height {height} is not {HASH_SIZE} bytes")
+    heights = array('Q', sorted(by_height))
+    hashes = b''.join(by_height[height] for height in heights)
+    if sys.byteorder == 'big':
+        heights.byteswap()
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(heights)))
+        heights.tofile(f)
+        f.write(hashes)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return len(heights)
+
+class BlockHashCache:
+    """
+    Cache of block hashes by height
+
+    Only blocks buried deep enough never change, so callers should put()
+    only heights with enough confirmations (see bitcoin_api). Lookups check
+    the in-memory LRU first, then the snapshot (if one is given), then the
+    SQLite file (if a path is given).
+    """
+
+    def __init__(self, path: Optional[str] = None, capacity: int = 4096,
+                 snapshot: Optional[BlockHashSnapshot] = None):
+        self.path = path
+        self.capacity = capacity
+        self.snapshot = snapshot
+        self._memory: 'OrderedDict[int, str]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.stats: Dict[str, int] = {
+            'memory_hits': 0,
+            'snapshot_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'stores': 0,
+        }
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS block_hashes (height INTEGER PRIMARY KEY, hash TEXT NOT NULL)'
+            )
+            self._db.commit()
+
+    def _remember(self, height: int, block_hash: str) -> None:
+        self._memory[height] = block_hash
+        self._memory.move_to_end(height)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    def get(self, height: int) -> Optional[str]:
+        """Return the cached hash for a height, or None"""
+        with self._lock:
+            block_hash = self._memory.get(height)
+            if block_hash is not None:
+                self._memory.move_to_end(height)
+                self.stats['memory_hits'] += 1
+                return block_hash
+
+            if self.snapshot is not None:
+                block_hash = self.snapshot.get(height)
+                if block_hash is not None:
+                    self._remember(height, block_hash)
+                    self.stats['snapshot_hits'] += 1
+                    return block_hash
+
+            if self._db is not None:
+                row = self._db.execute(
+                    'SELECT hash FROM block_hashes WHERE height = ?', (height,)
+                ).fetchone()
+                if row is not None:
+                    self._remember(height, row[0])
+                    self.stats['disk_hits'] += 1
+                    return row[0]
+
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, height: int, block_hash: str) -> None:
+        """Store a hash for a confirmed height"""
+        with self._lock:
+            self._remember(height, block_hash)
+            if self._db is not None:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO block_hashes (height, hash) VALUES (?, ?)',
+                    (height, block_hash)
+                )
+                self._db.commit()
+            self.stats['stores'] += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats['memory_entries'] = len(self._memory)
+            return stats
+
+    def close(self) -> None:
+        with self._lock:
+            if self.snapshot is not None:
+                self.snapshot.close()
+            if self._db is not None:
+                self._db.close()
+                self._db = None
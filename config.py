@@ -4,6 +4,13 @@ Configuration for BTC Lottery
 import os
 from typing import Optional
 
+# Serverless deployments (Vercel) can only write under /tmp, and only for the instance's lifetime
+SERVERLESS = bool(os.environ.get('VERCEL'))
+
+def _state_file(name: str) -> str:
+    """Default path of a file the app writes: the working directory, or /tmp when serverless"""
+    return os.path.join('/tmp', name) if SERVERLESS else name
+
 class Config:
     # Flask
     SECRET_KEY: str = os.environ.get('SECRET_KEY', 'dev-secret-key-change-me')
@@ -11,24 +18,88 @@ class Config:
     PORT: int = int(os.environ.get('PORT', 8080))
     
     # Database (SQLite for production)
-    DATABASE_URL: str = os.environ.get('DATABASE_URL', 'sqlite:///lottery.db')
+    DATABASE_URL: str = os.environ.get('DATABASE_URL', 'sqlite:///' + _state_file('lottery.db'))
+    
+    # Cold start: build the database, job queue and rate limiter on first use, no background threads at import
+    LAZY_INIT: bool = os.environ.get('LAZY_INIT', 'True' if SERVERLESS else 'False').lower() == 'true'
     
     # Bitcoin API
     BITCOIN_API_URL: str = os.environ.get('BITCOIN_API_URL', 'https://blockstream.info/api')
     BITCOIN_API_TIMEOUT: int = int(os.environ.get('BITCOIN_API_TIMEOUT', 10))
     BLOCK_COUNT_DEFAULT: int = int(os.environ.get('BLOCK_COUNT_DEFAULT', 3))
+    BITCOIN_API_POOL_SIZE: int = int(os.environ.get('BITCOIN_API_POOL_SIZE', 10))
+    BITCOIN_API_RETRIES: int = int(os.environ.get('BITCOIN_API_RETRIES', 2))
+    BITCOIN_API_BACKOFF: float = float(os.environ.get('BITCOIN_API_BACKOFF', 0.25))  # seconds, doubled per retry
+    BITCOIN_API_DEADLINE: float = float(os.environ.get('BITCOIN_API_DEADLINE', 15))  # per block, including retries
+    BITCOIN_API_FANOUT: int = int(os.environ.get('BITCOIN_API_FANOUT', 6))
+    
+    # Tip height tracker (0 interval = no background polling, refresh on demand)
+    TIP_MAX_AGE: float = float(os.environ.get('TIP_MAX_AGE', 30))
+    TIP_POLL_INTERVAL: float = float(os.environ.get('TIP_POLL_INTERVAL', 20))
+    
+    # Block hash cache (only blocks with enough confirmations are cached)
+    BLOCK_CACHE_FILE: str = os.environ.get('BLOCK_CACHE_FILE', 'block_cache.db')  # empty = memory only
+    BLOCK_CACHE_SIZE: int = int(os.environ.get('BLOCK_CACHE_SIZE', 4096))
+    BLOCK_CACHE_CONFIRMATIONS: int = int(os.environ.get('BLOCK_CACHE_CONFIRMATIONS', 6))
+    BLOCK_CACHE_SNAPSHOT: str = os.environ.get('BLOCK_CACHE_SNAPSHOT', '')  # read-only prebuilt hashes (python snapshot.py blocks)
+    
+    # Local block-header store (filled with python header_store.py import/sync; used if the file exists)
+    HEADER_STORE_FILE: str = os.environ.get('HEADER_STORE_FILE', 'headers.dat')  # empty = disabled
+    HEADER_STORE_VERIFY: bool = os.environ.get('HEADER_STORE_VERIFY', 'True').lower() == 'true'  # PoW + prev-hash
+    
+    # Draw result cache, keyed by seed + ticket-set digest
+    RESULT_CACHE_FILE: str = os.environ.get('RESULT_CACHE_FILE', '')  # empty = memory only
+    RESULT_CACHE_SIZE: int = int(os.environ.get('RESULT_CACHE_SIZE', 256))  # entries
+    RESULT_CACHE_MAX_TICKETS: int = int(os.environ.get('RESULT_CACHE_MAX_TICKETS', 2000000))  # scored tickets held in memory
     
     # Lottery
     TICKETS_FILE: str = os.environ.get('TICKETS_FILE', 'tickets.json')
-    MAX_HISTORY: int = int(os.environ.get('MAX_HISTORY', 100))
+    TICKETS_STORE: str = os.environ.get('TICKETS_STORE', 'tickets.u64')
+    TICKETS_COMPACT_THRESHOLD: int = int(os.environ.get('TICKETS_COMPACT_THRESHOLD', 4096))
+    TICKETS_SNAPSHOT: str = os.environ.get('TICKETS_SNAPSHOT', '')  # read-only prebuilt set (python snapshot.py tickets)
+    TICKETS_COMMIT_DELAY_MS: float = float(os.environ.get('TICKETS_COMMIT_DELAY_MS', 0))  # group commit window
+    MAX_HISTORY: int = int(os.environ.get('MAX_HISTORY', 100))  # maximum history page size
+    HISTORY_BATCH_SIZE: int = int(os.environ.get('HISTORY_BATCH_SIZE', 32))  # draws per insert transaction
+    HISTORY_FLUSH_INTERVAL: float = float(os.environ.get('HISTORY_FLUSH_INTERVAL', 1.0))  # seconds a draw may stay buffered
+    
+    # Draw engine (parallel mode is used for draws without per-ticket scores)
+    DRAW_WORKERS: int = int(os.environ.get('DRAW_WORKERS', 0))  # 0 = os.cpu_count()
+    DRAW_CHUNK_SIZE: int = int(os.environ.get('DRAW_CHUNK_SIZE', 250000))
+    DRAW_PARALLEL_MIN_TICKETS: int = int(os.environ.get('DRAW_PARALLEL_MIN_TICKETS', 500000))
+    TICKET_RANGES_MAX_TICKETS: int = int(os.environ.get('TICKET_RANGES_MAX_TICKETS', 10000000))  # tickets one request's ticket_ranges may cover
+    TICKET_RANGES_MAX_EXPANDED: int = int(os.environ.get('TICKET_RANGES_MAX_EXPANDED', 1000000))  # larger range sets are drawn winner-only
+    BATCH_VERIFY_MAX_RECORDS: int = int(os.environ.get('BATCH_VERIFY_MAX_RECORDS', 1000))  # draws per /verify/batch request
+    
+    # Asynchronous draw jobs (0 workers = this process only queues jobs)
+    JOBS_FILE: str = os.environ.get('JOBS_FILE', _state_file('jobs.db'))
+    JOB_WORKERS: int = int(os.environ.get('JOB_WORKERS', 2))
+    JOB_POLL_INTERVAL: float = float(os.environ.get('JOB_POLL_INTERVAL', 1.0))  # seconds, for jobs queued by other processes
+    JOB_LEASE_SECONDS: float = float(os.environ.get('JOB_LEASE_SECONDS', 30))  # running jobs without a heartbeat this long are re-queued
+    JOB_MAX_ATTEMPTS: int = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))  # claims before a job that keeps losing its worker fails
+    
+    # Fairness simulations (run as jobs; checkpoints let interrupted runs resume)
+    SIMULATION_DIR: str = os.environ.get('SIMULATION_DIR', 'simulations')
+    SIMULATION_MAX_DRAWS: int = int(os.environ.get('SIMULATION_MAX_DRAWS', 10000000))
+    SIMULATION_MAX_SCORES: int = int(os.environ.get('SIMULATION_MAX_SCORES', 1000000000))  # draws x tickets per simulation
+    SIMULATION_WORKERS: int = int(os.environ.get('SIMULATION_WORKERS', 0))  # 0 = os.cpu_count()
+    SIMULATION_CHECKPOINT_EVERY: int = int(os.environ.get('SIMULATION_CHECKPOINT_EVERY', 100000))  # draws
     
     # Rate Limiting
     RATELIMIT_ENABLED: bool = os.environ.get('RATELIMIT_ENABLED', 'True').lower() == 'true'
     RATELIMIT_DEFAULT: str = os.environ.get('RATELIMIT_DEFAULT', '100/hour')
+    RATELIMIT_JOBS: str = os.environ.get('RATELIMIT_JOBS', '60/minute')  # job status/result polling (own buckets)
+    RATELIMIT_SIMULATIONS: str = os.environ.get('RATELIMIT_SIMULATIONS', '100000/day')  # simulation tokens (draws x tickets)
+    RATELIMIT_LIMITS: str = os.environ.get('RATELIMIT_LIMITS', '')  # per endpoint: "verify_result=30/minute;lottery_draw=10/minute"
+    RATELIMIT_STORAGE: str = os.environ.get('RATELIMIT_STORAGE', '' if SERVERLESS else 'ratelimit.bin')  # shared by workers; empty = this process only
+    RATELIMIT_SLOTS: int = int(os.environ.get('RATELIMIT_SLOTS', 65536))  # client/endpoint buckets, 24 bytes each
+    RATELIMIT_TICKETS_PER_TOKEN: int = int(os.environ.get('RATELIMIT_TICKETS_PER_TOKEN', 10000))  # cost of large ticket lists
     
     # CORS
     CORS_ORIGINS: list = os.environ.get('CORS_ORIGINS', '*').split(',')
     
+    # Metrics (/metrics, Prometheus text format)
+    METRICS_ENABLED: bool = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+    
     # Logging
     LOG_LEVEL: str = os.environ.get('LOG_LEVEL', 'INFO')
     LOG_FILE: str = os.environ.get('LOG_FILE', 'lottery.log')
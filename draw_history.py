@@ -0,0 +1,251 @@
+"""
+Draw History - Persistent lottery draw history
+Batched inserts into models.LotteryDraw, indexed duplicate-block lookups, cursor pagination
+"""
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from models import LotteryDraw, VerificationRequest, block_key, db
+from ticket_ranges import TicketRanges
+
+# Proof fields that are per-ticket data (tickets are kept in tickets_used, scores are recomputable)
+_PROOF_BULK_FIELDS = ('scores', 'tie_breakers', 'tickets')
+
+# Draw fields identifying the scored set, kept with the proof so stored draws can be checked without scores
+_PROOF_SET_FIELDS = ('ticket_set', 'merkle_root')
+
+class DrawHistory:
+    """
+    History of draws stored through models.LotteryDraw
+
+    - ``record()`` buffers draws and writes them in one transaction once
+      ``batch_size`` draws are pending or the oldest one is older than
+      ``flush_interval`` seconds (a timer flushes idle buffers)
+    - Per-ticket scores are not stored: the seed and tickets_used recompute
+      them, the proof keeps the ticket-set digest and Merkle root
+    - A batch that fails to insert is retried draw by draw; draws that
+      still fail are dropped (``stats['dropped']``) instead of blocking
+      every later flush
+    - Lookups (``find_by_blocks``, ``get``) see pending draws too, so a
+      draw is visible to this process as soon as it is recorded
+    - ``find_by_blocks`` is a single lookup on the indexed block_key column
+    - ``page()`` pages newest first with an id cursor, O(limit) per page
+    """
+
+    def __init__(self, app=None, batch_size: int = 32, flush_interval: float = 1.0):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: List[LotteryDraw] = []
+        self._pending_since: Optional[float] = None
+        self._lock = threading.RLock()
+        self.stats: Dict[str, int] = {
+            'recorded': 0,
+            'flushes': 0,
+            'dropped': 0,
+        }
+
+    def _context(self):
+        # Flask-SQLAlchemy needs an app context; reuse the current one if there is one
+        from flask import has_app_context
+        if self.app is None or has_app_context():
+            return nullcontext()
+        return self.app.app_context()
+
+    def record(self, result: Dict[str, Any], tickets: List[Any]) -> LotteryDraw:
+        """
+        Add a draw to the history
+
+        Args:
+            result: Draw result (draw_id, winner, seed_hex, block_hashes, block_heights, proof);
+                scores are not stored
+            tickets: Tickets used in the draw (TicketRanges are stored range-encoded)
+
+        Returns:
+            LotteryDraw: The (possibly not yet flushed) row
+        """
+        proof = result.get('proof')
+        if proof is not None:
+            proof = {k: v for k, v in proof.items() if k not in _PROOF_BULK_FIELDS}
+            proof.update((k, result[k]) for k in _PROOF_SET_FIELDS if k not in proof and result.get(k) is not None)
+        draw = LotteryDraw(
+            draw_id=result['draw_id'],
+            winner_ticket=str(result['winner']),
+            seed_hex=result['seed_hex'],
+            block_hashes=list(result['block_hashes']),
+            block_heights=list(result['block_heights']),
+            block_key=block_key(result['block_heights']),
+            scores={},  # recomputable from seed_hex and tickets_used
+            tickets_used=tickets.to_dict() if isinstance(tickets, TicketRanges) else list(tickets),
+            ticket_count=len(tickets),
+            proof=proof,
+            created_at=datetime.utcnow()
+        )
+        with self._lock:
+            if not self._pending:
+                self._pending_since = time.monotonic()
+                self._schedule_flush()
+            self._pending.append(draw)
+            self.stats['recorded'] += 1
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+            else:
+                self._flush_if_due()
+        return draw
+
+    def _schedule_flush(self) -> None:
+        # Buffered draws reach the database (and other workers) even if no more requests come
+        if self.app is None or self.flush_interval <= 0:
+            return
+        timer = threading.Timer(self.flush_interval, self._flush_quietly)
+        timer.daemon = True
+        timer.start()
+
+    def _flush_quietly(self) -> None:
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Draw history flush failed: {e}")
+
+    def _flush_if_due(self) -> None:
+        if self._pending and time.monotonic() - self._pending_since >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Write all pending draws in one transaction; returns how many were written.
+        If the transaction fails, each draw is retried in its own and those
+        that fail again are dropped.
+        """
+        with self._lock:
+            if not self._pending:
+                return 0
+            batch = self._pending
+            self._pending = []
+            self._pending_since = None
+            with self._context():
+                written = len(batch)
+                if self._insert(batch) is not None:
+                    for draw in batch:
+                        error = self._insert([draw])
+                        if error is not None:
+                            written -= 1
+                            self.stats['dropped'] += 1
+                            print(f"Draw history dropped draw {draw.draw_id}: {error}")
+            self.stats['flushes'] += 1
+            return written
+
+    def _insert(self, draws: List[LotteryDraw]) -> Optional[Exception]:
+        # One transaction; returns the error if it was rolled back
+        try:
+            db.session.add_all(draws)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            return e
+        # Keep the rows readable after the session is gone (expire_on_commit is off)
+        for draw in draws:
+            db.session.expunge(draw)
+        return None
+
+    def find_by_blocks(self, block_heights: List[int]) -> Optional[LotteryDraw]:
+        """Earliest draw that used exactly these blocks, or None"""
+        key = block_key(block_heights)
+        with self._lock:
+            self._flush_if_due()
+            stored = self._query(lambda: LotteryDraw.query.filter_by(block_key=key).order_by(LotteryDraw.id).first())
+            if stored is not None:
+                return stored
+            return next((d for d in self._pending if d.block_key == key), None)
+
+    def get(self, draw_id: str) -> Optional[LotteryDraw]:
+        """Draw by its draw_id, or None"""
+        with self._lock:
+            pending = next((d for d in self._pending if d.draw_id == draw_id), None)
+            if pending is not None:
+                return pending
+            return self._query(lambda: LotteryDraw.query.filter_by(draw_id=draw_id).first())
+
+    def get_many(self, draw_ids: List[str]) -> Dict[str, LotteryDraw]:
+        """Draws by draw_id (one query); unknown ids are left out"""
+        wanted = set(draw_ids)
+        with self._lock:
+            found = {d.draw_id: d for d in self._pending if d.draw_id in wanted}
+            missing = list(wanted - found.keys())
+            if missing:
+                rows = self._query(lambda: LotteryDraw.query.filter(LotteryDraw.draw_id.in_(missing)).all())
+                found.update((d.draw_id, d) for d in rows)
+            return found
+
+    def log_verifications(self, verdicts: List[Dict[str, Any]], verified_by: Optional[str] = None) -> int:
+        """
+        Log verification verdicts to models.VerificationRequest in one transaction
+
+        Args:
+            verdicts: Dicts with "valid" and optionally "draw_id" or "id"
+            verified_by: Who asked for the verification (e.g. client address)
+
+        Returns:
+            int: Number of rows written
+        """
+        now = datetime.utcnow()
+        rows = [{
+            'draw_id': str(v.get('draw_id') or v.get('id') or '')[:64] or None,
+            'verified_at': now,
+            'verified_by': (verified_by or '')[:128] or None,
+            'result_valid': 1 if v.get('valid') else 0
+        } for v in verdicts]
+        if not rows:
+            return 0
+        with self._context():
+            try:
+                db.session.execute(db.insert(VerificationRequest), rows)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+        return len(rows)
+
+    def page(self, cursor: Optional[int] = None, limit: int = 20) -> Tuple[List[LotteryDraw], Optional[int]]:
+        """
+        One page of history, newest first
+
+        Args:
+            cursor: next_cursor of the previous page (None - first page)
+            limit: Page size
+
+        Returns:
+            Tuple: (draws, next_cursor or None on the last page)
+        """
+        self.flush()
+
+        def fetch():
+            query = LotteryDraw.query
+            if cursor is not None:
+                query = query.filter(LotteryDraw.id < cursor)
+            return query.order_by(LotteryDraw.id.desc()).limit(limit + 1).all()
+
+        draws = self._query(fetch)
+        next_cursor = draws[limit - 1].id if len(draws) > limit else None
+        return draws[:limit], next_cursor
+
+    def count(self) -> int:
+        with self._lock:
+            return self._query(lambda: LotteryDraw.query.count()) + len(self._pending)
+
+    def _query(self, fn):
+        # Rows are detached so callers can use them outside the app context
+        with self._context():
+            result = fn()
+            if isinstance(result, list):
+                for row in result:
+                    db.session.expunge(row)
+            elif isinstance(result, LotteryDraw):
+                db.session.expunge(result)
+            return result
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats, pending=len(self._pending))
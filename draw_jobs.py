@@ -0,0 +1,251 @@
+"""
+Draw Jobs - Persistent queue of asynchronous draws
+Jobs live in a SQLite file; a local worker pool claims and runs them
+"""
+import json
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from typing import Any, Callable, Dict, List, Optional
+
+import metrics
+
+JOB_WAIT_SECONDS = metrics.registry.histogram(
+    'lottery_job_wait_seconds', 'Time draw jobs spend queued before a worker picks them up'
+)
+JOB_RUN_SECONDS = metrics.registry.histogram(
+    'lottery_job_run_seconds', 'Time workers spend running draw jobs', ('status',)
+)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+class JobQueue:
+    """
+    Queue of draw jobs persisted in SQLite
+
+    - ``submit()`` stores the job and wakes a worker; the caller gets the
+      job id back immediately
+    - Workers claim queued jobs with a conditional UPDATE, so several
+      processes can share one file without running a job twice
+    - Results (zlib-compressed JSON) and errors stay in the file and
+      survive restarts
+    - A running job is leased: its worker stamps ``heartbeat_at`` every
+      lease/3 seconds. A job whose lease has expired (its process died or
+      hung) is re-queued when the queue is opened and before each claim,
+      by any process. Owners are random per-queue tokens, not PIDs, which
+      a restarted container may reuse
+    - Each claim counts as an attempt; a job whose lease expires after
+      ``max_attempts`` claims is marked failed instead of re-queued, so a
+      job that crashes its worker cannot take down every worker in turn
+    """
+
+    def __init__(self, path: str, run: Callable[[Dict[str, Any]], Dict[str, Any]],
+                 workers: int = 2, poll_interval: float = 1.0, lease: float = 30.0, max_attempts: int = 3):
+        self.path = path
+        self.run = run
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.owner = uuid.uuid4().hex
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        with self._lock:
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS draw_jobs ('
+                'id TEXT PRIMARY KEY, status TEXT NOT NULL, params TEXT NOT NULL, '
+                'result BLOB, error TEXT, owner TEXT, '
+                'created_at REAL NOT NULL, started_at REAL, finished_at REAL, heartbeat_at REAL, '
+                'attempts INTEGER NOT NULL DEFAULT 0)'
+            )
+            columns = {row[1] for row in self._db.execute('PRAGMA table_info(draw_jobs)')}
+            if 'heartbeat_at' not in columns:
+                # Files from before leases: their running jobs count as expired
+                self._db.execute('ALTER TABLE draw_jobs ADD COLUMN heartbeat_at REAL')
+            if 'attempts' not in columns:
+                self._db.execute('ALTER TABLE draw_jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0')
+            self._db.execute('CREATE INDEX IF NOT EXISTS draw_jobs_status ON draw_jobs (status, created_at)')
+            self._db.commit()
+        self._recover()
+
+    def _recover(self) -> int:
+        """
+        Re-queue running jobs whose lease has expired, or fail those out of
+        attempts; returns how many were re-queued
+        """
+        now = time.time()
+        expired = 'status = ? AND COALESCE(heartbeat_at, started_at, 0) < ?'
+        with self._lock:
+            self._db.execute(
+                f'UPDATE draw_jobs SET status = ?, error = ?, finished_at = ? WHERE {expired} AND attempts >= ?',
+                (FAILED, f'Job lost its worker {self.max_attempts} times (the worker crashed or was killed)',
+                 now, RUNNING, now - self.lease, self.max_attempts)
+            )
+            requeued = self._db.execute(
+                f'UPDATE draw_jobs SET status = ?, owner = NULL, started_at = NULL, heartbeat_at = NULL WHERE {expired}',
+                (QUEUED, RUNNING, now - self.lease)
+            ).rowcount
+            self._db.commit()
+        return requeued
+
+    def _heartbeat(self, job_id: str, done: threading.Event) -> None:
+        """Renew the lease of a running job until ``done`` is set"""
+        while not done.wait(self.lease / 3):
+            try:
+                with self._lock:
+                    self._db.execute('UPDATE draw_jobs SET heartbeat_at = ? WHERE id = ? AND owner = ?',
+                                     (time.time(), job_id, self.owner))
+                    self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Draw job heartbeat failed: {e}")
+
+    def submit(self, params: Dict[str, Any]) -> str:
+        """Queue a draw; returns the job id"""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute(
+                'INSERT INTO draw_jobs (id, status, params, created_at) VALUES (?, ?, ?, ?)',
+                (job_id, QUEUED, json.dumps(params), time.time())
+            )
+            self._db.commit()
+        self._wake.set()
+        return job_id
+
+    def get(self, job_id: str, with_result: bool = False) -> Optional[Dict[str, Any]]:
+        """Job status (and result, if asked and finished), or None if unknown"""
+        columns = 'status, error, created_at, started_at, finished_at, attempts' + (', result' if with_result else '')
+        with self._lock:
+            row = self._db.execute(f'SELECT {columns} FROM draw_jobs WHERE id = ?', (job_id,)).fetchone()
+            position = None
+            if row is not None and row[0] == QUEUED:
+                position = self._db.execute(
+                    'SELECT COUNT(*) FROM draw_jobs WHERE status = ? AND created_at <= ?', (QUEUED, row[2])
+                ).fetchone()[0]
+        if row is None:
+            return None
+
+        status, error, created_at, started_at, finished_at, attempts = row[:6]
+        job = {
+            'job_id': job_id,
+            'status': status,
+            'created_at': created_at,
+            'started_at': started_at,
+            'finished_at': finished_at,
+            'attempts': attempts,
+        }
+        if position is not None:
+            job['queue_position'] = position
+        if error is not None:
+            job['error'] = error
+        if with_result and row[6] is not None:
+            job['result'] = json.loads(zlib.decompress(row[6]))
+        return job
+
+    def _claim(self) -> Optional[tuple]:
+        with self._lock:
+            while True:
+                row = self._db.execute(
+                    'SELECT id, params, created_at FROM draw_jobs WHERE status = ? ORDER BY created_at LIMIT 1',
+                    (QUEUED,)
+                ).fetchone()
+                if row is None:
+                    return None
+                now = time.time()
+                claimed = self._db.execute(
+                    'UPDATE draw_jobs SET status = ?, owner = ?, started_at = ?, heartbeat_at = ?, '
+                    'attempts = attempts + 1 WHERE id = ? AND status = ?',
+                    (RUNNING, self.owner, now, now, row[0], QUEUED)
+                ).rowcount
+                self._db.commit()
+                if claimed:
+                    return row
+                # Another process took it first
+
+    def _finish(self, job_id: str, status: str, result: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+        blob = zlib.compress(json.dumps(result).encode()) if result is not None else None
+        with self._lock:
+            # A job whose lease expired belongs to whoever re-claimed it
+            self._db.execute(
+                'UPDATE draw_jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ? AND owner = ?',
+                (status, blob, error, time.time(), job_id, self.owner)
+            )
+            self._db.commit()
+
+    def run_pending(self) -> int:
+        """Run queued jobs in the calling thread until none are left; returns how many ran"""
+        count = 0
+        self._recover()
+        while not self._stop.is_set():
+            row = self._claim()
+            if row is None:
+                return count
+            job_id, params, created_at = row
+            JOB_WAIT_SECONDS.observe(max(time.time() - created_at, 0))
+            start = time.perf_counter()
+            done = threading.Event()
+            heartbeat = threading.Thread(target=self._heartbeat, args=(job_id, done),
+                                         name=f'draw-job-lease-{job_id[:8]}', daemon=True)
+            heartbeat.start()
+            try:
+                result = self.run(json.loads(params))
+                self._finish(job_id, DONE, result, None)
+                status = DONE
+            except Exception as e:
+                self._finish(job_id, FAILED, None, str(e))
+                status = FAILED
+            finally:
+                done.set()
+                heartbeat.join()
+            JOB_RUN_SECONDS.observe(time.perf_counter() - start, status)
+            count += 1
+        return count
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_pending()
+            except Exception as e:
+                print(f"Draw job worker failed: {e}")
+            # Jobs queued by other processes are found on the next poll
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def start(self) -> None:
+        """Start the worker threads (no-op if already running)"""
+        if any(t.is_alive() for t in self._threads):
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._work, name=f'draw-job-{i}', daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status"""
+        with self._lock:
+            rows = self._db.execute('SELECT status, COUNT(*) FROM draw_jobs GROUP BY status').fetchall()
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def close(self) -> None:
+        self.stop()
+        with self._lock:
+            self._db.close()
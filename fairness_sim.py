@@ -0,0 +1,311 @@
+"""
+Fairness Simulation - Monte Carlo check that the draw engine picks winners uniformly
+Millions of draws over synthetic seeds on a process pool, with checkpoints for long runs
+
+Usage:
+    python fairness_sim.py --tickets 100 --draws 1000000
+    python fairness_sim.py --store tickets.u64 --draws 100000 --checkpoint sim.json   # resumable
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple, Union
+
+from lottery_core import _scan_encoded, _score_base
+from score_analytics import _chi2_sf
+from ticket_set import TicketSet
+
+CHECKPOINT_VERSION = 1
+
+# Draws per task sent to a worker
+BATCH_SIZE = 2000
+
+def simulation_seed(label: str, index: int) -> bytes:
+    """Synthetic seed of draw ``index``: SHA256("<label>:<index>"), the size of a real seed"""
+    return hashlib.sha256(f'{label}:{index}'.encode()).digest()
+
+def _winner_bin(digest: bytes, n: int, bins: int) -> int:
+    """
+    Histogram bin of a winning score
+
+    The winning score is the minimum of n uniform scores, so with u its
+    top 64 bits scaled to [0, 1), 1 - (1 - u)^n is uniform on [0, 1).
+    """
+    u = int.from_bytes(digest[:8], 'big') / 2.0 ** 64
+    v = -math.expm1(n * math.log1p(-u))
+    return min(int(v * bins), bins - 1)
+
+def _simulate_batch(encoded: List[bytes], index: Dict[bytes, int], label: str,
+                    start: int, stop: int, bins: int) -> Tuple[array, List[int]]:
+    """
+    Draws start..stop-1 over the encoded tickets
+
+    Each draw runs the engine's own scan (_scan_encoded, the core of
+    find_winner) on the SHA256 midstate of its seed.
+
+    Returns:
+        Tuple: (winner index per draw, winning-score histogram)
+    """
+    n = len(encoded)
+    winners = array('Q')
+    histogram = [0] * bins
+    for i in range(start, stop):
+        winner, digest, _ = _scan_encoded(_score_base(simulation_seed(label, i)), encoded)
+        winners.append(index[winner])
+        histogram[_winner_bin(digest, n, bins)] += 1
+    return winners, histogram
+
+# Ticket list of a pool worker, sent once by the initializer instead of with every task
+_worker_tickets: Optional[Tuple[List[bytes], Dict[bytes, int]]] = None
+
+def _init_worker(encoded: List[bytes]) -> None:
+    global _worker_tickets
+    _worker_tickets = (encoded, {t: i for i, t in enumerate(encoded)})
+
+def _worker_batch(label: str, start: int, stop: int, bins: int) -> Tuple[array, List[int]]:
+    encoded, index = _worker_tickets
+    return _simulate_batch(encoded, index, label, start, stop, bins)
+
+class FairnessSimulation:
+    """
+    Win counts of every ticket over many simulated draws
+
+    Draw i uses the seed simulation_seed(label, i), so a run is fully
+    determined by the ticket set and the label: it can be stopped,
+    resumed from its checkpoint and extended to more draws, and the same
+    draws give the same counts on any machine.
+
+    Accumulated state is one counter per ticket plus a histogram of the
+    winning scores; ``report()`` turns it into uniformity statistics.
+    """
+
+    def __init__(self, tickets: Union[TicketSet, Iterable[Union[str, int]]], label: str = 'fairness',
+                 bins: int = 16, checkpoint: Optional[str] = None):
+        """
+        Args:
+            tickets: Ticket set (validated and deduplicated, see TicketSet)
+            label: Seed label; different labels give independent runs
+            bins: Bins of the winning-score histogram
+            checkpoint: JSON file the state is saved to and resumed from
+
+        Raises:
+            ValueError: If there are no tickets, or the checkpoint belongs
+                to another ticket set, label or bin count
+        """
+        self.tickets = TicketSet.of(tickets)
+        if not len(self.tickets):
+            raise ValueError("No tickets to simulate")
+        if bins < 2:
+            raise ValueError("bins must be at least 2")
+        self.label = label
+        self.bins = bins
+        self.checkpoint = checkpoint
+        self.draws = 0
+        self.counts = array('Q', bytes(8 * len(self.tickets)))
+        self.score_histogram = [0] * bins
+        if checkpoint and os.path.exists(checkpoint):
+            self._load(checkpoint)
+
+    def _identity(self) -> Dict[str, Any]:
+        return {'label': self.label, 'bins': self.bins, 'ticket_set': self.tickets.fingerprint()}
+
+    def _load(self, path: str) -> None:
+        with open(path) as f:
+            state = json.load(f)
+        if state.get('version') != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version in {path}")
+        if {k: state.get(k) for k in ('label', 'bins', 'ticket_set')} != self._identity():
+            raise ValueError(f"Checkpoint {path} belongs to another ticket set, label or bin count")
+        self.draws = state['draws']
+        self.counts = array('Q', state['counts'])
+        self.score_histogram = state['score_histogram']
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Write the state to the checkpoint file (atomically, via a temporary file)"""
+        path = path or self.checkpoint
+        if not path:
+            return
+        state = dict(self._identity(), version=CHECKPOINT_VERSION, draws=self.draws,
+                     counts=self.counts.tolist(), score_histogram=self.score_histogram)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(state, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def _merge(self, winners: array, histogram: List[int]) -> None:
+        counts = self.counts
+        for i in winners:
+            counts[i] += 1
+        for b, count in enumerate(histogram):
+            self.score_histogram[b] += count
+        self.draws += len(winners)
+
+    def run(self, draws: int, workers: Optional[int] = None, batch_size: int = BATCH_SIZE,
+            checkpoint_every: int = 100_000,
+            progress: Optional[Callable[['FairnessSimulation'], None]] = None) -> 'FairnessSimulation':
+        """
+        Simulate until ``draws`` draws are done in total (resumed draws count)
+
+        Args:
+            draws: Total number of draws
+            workers: Processes (None - os.cpu_count(), 1 - inline)
+            batch_size: Draws per worker task
+            checkpoint_every: Draws between checkpoint writes
+            progress: Called with the simulation after each merged batch
+        """
+        workers = workers or os.cpu_count() or 1
+        batch_size = max(1, batch_size)
+        batches = [(start, min(start + batch_size, draws)) for start in range(self.draws, draws, batch_size)]
+        saved = self.draws
+
+        def merged(result: Tuple[array, List[int]]) -> None:
+            nonlocal saved
+            self._merge(*result)
+            if self.draws - saved >= checkpoint_every:
+                self.save()
+                saved = self.draws
+            if progress is not None:
+                progress(self)
+
+        if workers <= 1 or len(batches) < 2:
+            encoded = self.tickets.encoded
+            index = {t: i for i, t in enumerate(encoded)}
+            for start, stop in batches:
+                merged(_simulate_batch(encoded, index, self.label, start, stop, self.bins))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(self.tickets.encoded,)) as executor:
+                # Results are merged in draw order, so a checkpoint always covers draws 0..n-1
+                pending: Deque[Any] = deque()
+                for start, stop in batches:
+                    pending.append(executor.submit(_worker_batch, self.label, start, stop, self.bins))
+                    if len(pending) >= 2 * workers:
+                        merged(pending.popleft().result())
+                while pending:
+                    merged(pending.popleft().result())
+
+        if self.draws != saved:
+            self.save()
+        return self
+
+    def report(self, confidence: float = 0.95, max_listed: int = 1000) -> Dict[str, Any]:
+        """
+        Uniformity of the winners
+
+        - ``winners``: chi-squared of the win counts against 1/n per
+          ticket, with its p-value
+        - ``frequencies``: win frequency of each ticket with its Wilson
+          confidence interval (every ticket if there are at most
+          ``max_listed``, otherwise the tickets whose interval misses 1/n);
+          ``outside_interval`` is how many intervals miss 1/n, which should
+          be close to ``expected_outside`` for a fair engine
+        - ``winning_scores``: chi-squared of the winning scores, mapped to
+          [0, 1) by the distribution of the minimum of n uniform scores
+
+        Small p-values (e.g. < 0.001) mean the winners are not uniform;
+        the chi-squared tests need about 5 expected wins per ticket/bin.
+        """
+        n = len(self.tickets)
+        draws = self.draws
+        result: Dict[str, Any] = {
+            'label': self.label,
+            'ticket_set': self.tickets.fingerprint(),
+            'draws': draws,
+            'confidence': confidence
+        }
+        if draws == 0:
+            return result
+
+        p = 1 / n
+        expected = draws * p
+        chi2 = sum((c - expected) ** 2 for c in self.counts) / expected
+        result['winners'] = {
+            'chi2': chi2,
+            'df': n - 1,
+            'p_value': _chi2_sf(chi2, n - 1),
+            'expected_wins': expected,
+            'min_wins': min(self.counts),
+            'max_wins': max(self.counts)
+        }
+
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        listed = []
+        outside = 0
+        for ticket, count in zip(self.tickets.normalized, self.counts):
+            low, high = wilson_interval(count, draws, z)
+            miss = not low <= p <= high
+            outside += miss
+            if n <= max_listed or miss:
+                listed.append({'ticket': ticket, 'wins': count, 'frequency': count / draws,
+                               'low': low, 'high': high})
+        result['frequencies'] = {
+            'expected': p,
+            'outside_interval': outside,
+            'expected_outside': round(n * (1 - confidence), 2),
+            'tickets': listed[:max_listed]
+        }
+
+        expected_bin = draws / self.bins
+        chi2 = sum((c - expected_bin) ** 2 for c in self.score_histogram) / expected_bin
+        result['winning_scores'] = {
+            'bins': self.bins,
+            'counts': list(self.score_histogram),
+            'chi2': chi2,
+            'df': self.bins - 1,
+            'p_value': _chi2_sf(chi2, self.bins - 1)
+        }
+        return result
+
+def wilson_interval(successes: int, trials: int, z: float = 1.96) -> Tuple[float, float]:
+    """Wilson score interval of a binomial proportion"""
+    if trials == 0:
+        return 0.0, 1.0
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--tickets', type=int, default=100, help='simulate tickets 1..N')
+    source.add_argument('--store', help='simulate the tickets of a ticket store file (e.g. tickets.u64)')
+    parser.add_argument('--draws', type=int, default=100_000, help='total number of draws')
+    parser.add_argument('--label', default='fairness', help='seed label (different labels give independent runs)')
+    parser.add_argument('--bins', type=int, default=16, help='bins of the winning-score histogram')
+    parser.add_argument('--workers', type=int, default=0, help='processes (0 = all cores, 1 = inline)')
+    parser.add_argument('--checkpoint', help='JSON file to save progress to and resume from')
+    parser.add_argument('--checkpoint-every', type=int, default=100_000, help='draws between checkpoints')
+    parser.add_argument('--confidence', type=float, default=0.95, help='level of the per-ticket intervals')
+    args = parser.parse_args(argv)
+
+    if args.store:
+        from ticket_store import TicketStore
+        store = TicketStore(args.store)
+        tickets = TicketSet(store)
+        store.close()
+    else:
+        tickets = TicketSet(range(1, args.tickets + 1))
+
+    def progress(sim: FairnessSimulation) -> None:
+        print(f'\r{sim.draws}/{args.draws} draws', end='', file=sys.stderr, flush=True)
+
+    sim = FairnessSimulation(tickets, args.label, args.bins, args.checkpoint)
+    sim.run(args.draws, args.workers or None, checkpoint_every=args.checkpoint_every, progress=progress)
+    print(file=sys.stderr)
+    print(json.dumps(sim.report(args.confidence), indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
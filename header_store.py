@@ -0,0 +1,347 @@
+"""
+Header Store - Local chain of Bitcoin block headers
+Fixed-width 80-byte headers in a memory-mapped file indexed by height, with PoW and link checks
+
+Usage:
+    python header_store.py import headers.bin [--first-height 0]   # raw 80-byte headers or hex lines
+    python header_store.py sync                                     # extend from the Bitcoin API
+    python header_store.py info
+"""
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: locking is per process only
+    fcntl = None
+
+HEADER_SIZE = 80
+
+# File header: magic, version, height of the first stored header
+FILE_HEADER = struct.Struct('<4sHxxQ')
+FILE_MAGIC = b'BHDR'
+FILE_VERSION = 1
+
+# Highest target mainnet allows (difficulty 1, nBits 0x1d00ffff)
+MAINNET_POW_LIMIT = 0xffff << 208
+
+# Headers appended per write when importing a dump
+IMPORT_BATCH = 10000
+
+class HeaderError(ValueError):
+    """A header is malformed, fails its proof of work or does not link to its parent"""
+
+def header_hash(header: bytes) -> bytes:
+    """Double SHA256 of a header, in internal (little-endian) byte order"""
+    return hashlib.sha256(hashlib.sha256(header).digest()).digest()
+
+def block_hash_hex(header: bytes) -> str:
+    """Block hash as shown by explorers and the Bitcoin API (byte-reversed hex)"""
+    return header_hash(header)[::-1].hex()
+
+def bits_to_target(bits: int) -> int:
+    """Target encoded by a header's compact nBits field"""
+    exponent, mantissa = bits >> 24, bits & 0x007fffff
+    if bits & 0x00800000:
+        raise HeaderError(f"Negative target in nBits {bits:#010x}")
+    if exponent <= 3:
+        return mantissa >> (8 * (3 - exponent))
+    return mantissa << (8 * (exponent - 3))
+
+def check_pow(header: bytes, pow_limit: int = MAINNET_POW_LIMIT) -> None:
+    """
+    Check that the header hash meets the target in its nBits
+
+    Difficulty retargeting is not checked (that needs the timestamps of
+    the whole period); a forged header still has to carry real work at
+    the difficulty it claims, and the claim is capped by ``pow_limit``.
+
+    Raises:
+        HeaderError: If the header is not 80 bytes or its hash is above target
+    """
+    if len(header) != HEADER_SIZE:
+        raise HeaderError(f"Header must be {HEADER_SIZE} bytes, got {len(header)}")
+    target = bits_to_target(struct.unpack_from('<I', header, 72)[0])
+    if target <= 0 or target > pow_limit:
+        raise HeaderError(f"Target out of range in header {block_hash_hex(header)}")
+    if int.from_bytes(header_hash(header), 'little') > target:
+        raise HeaderError(f"Insufficient proof of work in header {block_hash_hex(header)}")
+
+def prev_hash(header: bytes) -> bytes:
+    """Parent block hash field of a header (internal byte order)"""
+    return header[4:36]
+
+def check_header(header: bytes, parent: Optional[bytes] = None, pow_limit: int = MAINNET_POW_LIMIT) -> None:
+    """
+    Check a header's proof of work and, if its parent header is given,
+    that its prev-hash field points to it
+
+    Raises:
+        HeaderError: If either check fails
+    """
+    check_pow(header, pow_limit)
+    if parent is not None and prev_hash(header) != header_hash(parent):
+        raise HeaderError(f"Header {block_hash_hex(header)} does not link to its parent")
+
+def parse_header(value: Union[bytes, str]) -> bytes:
+    """Header from raw bytes or hex (as returned by /block/<hash>/header)"""
+    if isinstance(value, str):
+        try:
+            value = bytes.fromhex(value.strip())
+        except ValueError:
+            raise HeaderError("Header is not valid hex")
+    if len(value) != HEADER_SIZE:
+        raise HeaderError(f"Header must be {HEADER_SIZE} bytes, got {len(value)}")
+    return bytes(value)
+
+class HeaderStore:
+    """
+    Append-only chain of block headers, one 80-byte slot per height
+
+    The file is a 16-byte header (magic, version, first height) followed by
+    the headers of consecutive heights, so the header at height h sits at
+    a fixed offset: lookups read the memory mapping directly, O(1), with
+    no lock and no I/O beyond the page cache. Stored bytes never change,
+    which makes lock-free readers safe while another thread or process
+    appends.
+
+    Appends run under an exclusive file lock. Every new header must carry
+    valid proof of work and link to the previous one by its prev-hash
+    field, so the file holds one connected chain; only headers with enough
+    confirmations should be added, reorganisations are not handled. A
+    write torn by a crash leaves a partial slot at the end, which readers
+    ignore and the next append overwrites.
+    """
+
+    def __init__(self, path: str, first_height: int = 0, pow_limit: int = MAINNET_POW_LIMIT):
+        """
+        Args:
+            path: Store file (created if missing)
+            first_height: Height of the first header, for a new file
+            pow_limit: Highest target accepted by the proof-of-work check
+        """
+        self.path = path
+        self.pow_limit = pow_limit
+        self._lock = threading.Lock()
+        if not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, first_height))
+                f.flush()
+                os.fsync(f.fileno())
+        self._fd = os.open(path, os.O_RDWR)
+        magic, version, self.first_height = FILE_HEADER.unpack(os.pread(self._fd, FILE_HEADER.size, 0))
+        if magic != FILE_MAGIC or version != FILE_VERSION:
+            os.close(self._fd)
+            raise ValueError(f"Not a header store file: {path}")
+        self._view: Tuple[Optional[mmap.mmap], int] = (None, 0)
+        self._map()
+
+    def _map(self) -> None:
+        """
+        Map the file as it is now
+
+        The previous mapping is not closed: a reader may still be slicing
+        it; it is freed once unreferenced.
+        """
+        size = os.fstat(self._fd).st_size
+        count = (size - FILE_HEADER.size) // HEADER_SIZE
+        if count == self._view[1]:
+            return
+        mapping = mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ) if count else None
+        self._view = (mapping, count)
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        with self._lock:
+            self._view = (None, 0)
+            if self._fd >= 0:
+                os.close(self._fd)
+                self._fd = -1
+
+    def __enter__(self) -> 'HeaderStore':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return self._view[1]
+
+    @property
+    def tip_height(self) -> Optional[int]:
+        """Height of the last stored header, or None if the store is empty"""
+        count = self._view[1]
+        return self.first_height + count - 1 if count else None
+
+    def header(self, height: int) -> Optional[bytes]:
+        """Header at a height, or None if it is not stored"""
+        mapping, count = self._view
+        i = height - self.first_height
+        if i >= count and i >= 0:
+            # Appended by another process since the file was mapped
+            self._map()
+            mapping, count = self._view
+        if not 0 <= i < count:
+            return None
+        offset = FILE_HEADER.size + i * HEADER_SIZE
+        return mapping[offset:offset + HEADER_SIZE]
+
+    def check(self, height: int) -> None:
+        """
+        Verify the stored header at a height: its proof of work, and that
+        it links to the stored header below it
+
+        Raises:
+            HeaderError: If the check fails or the header is not stored
+        """
+        header = self.header(height)
+        if header is None:
+            raise HeaderError(f"No header stored at height {height}")
+        parent = self.header(height - 1) if height > self.first_height else None
+        check_header(header, parent, self.pow_limit)
+
+    def block_hash(self, height: int, verify: bool = False) -> Optional[str]:
+        """
+        Block hash at a height (byte-reversed hex), or None if not stored
+
+        Raises:
+            HeaderError: If ``verify`` is set and the header fails check()
+        """
+        header = self.header(height)
+        if header is None:
+            return None
+        if verify:
+            self.check(height)
+        return block_hash_hex(header)
+
+    def block_hashes(self, heights: Iterable[int], verify: bool = False) -> List[Optional[str]]:
+        return [self.block_hash(height, verify) for height in heights]
+
+    # ------------------------------------------------------------------
+    # Appending
+    # ------------------------------------------------------------------
+
+    def append(self, headers: Iterable[Union[bytes, str]]) -> int:
+        """
+        Append headers for the heights right after the tip
+
+        The batch is verified as a whole before anything is written, so a
+        bad header leaves the store unchanged.
+
+        Returns:
+            int: Number of headers appended
+
+        Raises:
+            HeaderError: If a header is malformed, fails its proof of work
+                or does not link to the one before it
+        """
+        headers = [parse_header(h) for h in headers]
+        if not headers:
+            return 0
+        with self._exclusive():
+            self._map()
+            mapping, count = self._view
+            end = FILE_HEADER.size + count * HEADER_SIZE
+            parent = mapping[end - HEADER_SIZE:end] if count else None
+            for header in headers:
+                check_header(header, parent, self.pow_limit)
+                parent = header
+
+            os.ftruncate(self._fd, end)  # drop a torn slot, if any
+            os.pwrite(self._fd, b''.join(headers), end)
+            os.fsync(self._fd)
+            self._map()
+        return len(headers)
+
+    def import_dump(self, path: str) -> int:
+        """
+        Append a bulk header dump: concatenated raw 80-byte headers, or
+        one hex header per line; the first one must follow the current tip
+
+        Returns:
+            int: Number of headers appended
+        """
+        total = 0
+        for batch in _read_dump(path, IMPORT_BATCH):
+            total += self.append(batch)
+        return total
+
+def _read_dump(path: str, batch: int) -> Iterator[List[bytes]]:
+    with open(path, 'rb') as f:
+        head = f.read(2 * HEADER_SIZE)
+        f.seek(0)
+        is_hex = len(head) > 0 and all(c in b'0123456789abcdefABCDEF\r\n' for c in head)
+        if is_hex:
+            lines = (line.strip() for line in f)
+            chunk = []
+            for line in lines:
+                if line:
+                    chunk.append(parse_header(line.decode()))
+                if len(chunk) == batch:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+            return
+        while True:
+            data = f.read(batch * HEADER_SIZE)
+            if not data:
+                return
+            if len(data) % HEADER_SIZE:
+                raise HeaderError(f"Truncated header dump: {path}")
+            yield [data[i:i + HEADER_SIZE] for i in range(0, len(data), HEADER_SIZE)]
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    import json
+
+    from config import Config
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--store', default=Config.HEADER_STORE_FILE or 'headers.dat', help='header store file')
+    commands = parser.add_subparsers(dest='command', required=True)
+    dump = commands.add_parser('import', help='append a bulk header dump')
+    dump.add_argument('dump', help='raw 80-byte headers or one hex header per line')
+    dump.add_argument('--first-height', type=int, default=0, help='height of the first header (new store)')
+    sync = commands.add_parser('sync', help='append confirmed headers from the Bitcoin API')
+    sync.add_argument('--limit', type=int, default=None, help='at most this many headers')
+    commands.add_parser('info', help='show the stored range')
+    args = parser.parse_args(argv)
+
+    with HeaderStore(args.store, getattr(args, 'first_height', 0)) as store:
+        if args.command == 'import':
+            print(f"Imported {store.import_dump(args.dump)} headers")
+        elif args.command == 'sync':
+            import bitcoin_api
+            print(f"Appended {bitcoin_api.sync_header_store(store, args.limit)} headers")
+        tip = store.tip_height
+        print(json.dumps({
+            'first_height': store.first_height,
+            'tip_height': tip,
+            'headers': len(store),
+            'tip_hash': store.block_hash(tip) if tip is not None else None
+        }))
+    return 0
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(main())
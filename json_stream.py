@@ -0,0 +1,93 @@
+"""
+JSON Stream - Incremental JSON encoding for large API responses
+Writes header fields first, streams big mappings, optional on-the-fly gzip
+"""
+import json
+import zlib
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+
+# Entries per chunk when streaming a mapping
+STREAM_BATCH = 1024
+
+class StreamedMapping:
+    """
+    JSON object whose entries come from an iterator of (key, value)
+
+    If the iterator raises, the object is closed early and the exception
+    is kept in ``error`` so later (Deferred) fields can report it.
+    """
+
+    def __init__(self, items: Iterable[Tuple[str, Any]], batch: int = STREAM_BATCH):
+        self.items = items
+        self.batch = batch
+        self.error: Optional[Exception] = None
+
+    def iter_chunks(self) -> Iterator[str]:
+        dumps = json.dumps
+        yield '{'
+        buffer = []
+        first = True
+        try:
+            for key, value in self.items:
+                buffer.append(f"{dumps(key)}: {dumps(value)}")
+                if len(buffer) >= self.batch:
+                    yield ('' if first else ', ') + ', '.join(buffer)
+                    first = False
+                    buffer = []
+        except Exception as e:
+            self.error = e
+        if buffer:
+            yield ('' if first else ', ') + ', '.join(buffer)
+        yield '}'
+
+class Deferred:
+    """Field value computed only when the encoder reaches it"""
+
+    def __init__(self, fn: Callable[[], Any]):
+        self.fn = fn
+
+def iter_json(value: Any) -> Iterator[str]:
+    """
+    Encode a value as JSON chunks
+
+    Dicts are written key by key in insertion order, so fields placed
+    before a StreamedMapping reach the client before it is computed.
+    """
+    if isinstance(value, Deferred):
+        yield from iter_json(value.fn())
+    elif isinstance(value, StreamedMapping):
+        yield from value.iter_chunks()
+    elif isinstance(value, dict) and _has_lazy(value):
+        yield '{'
+        for i, (key, item) in enumerate(value.items()):
+            yield (', ' if i else '') + json.dumps(key) + ': '
+            yield from iter_json(item)
+        yield '}'
+    else:
+        yield json.dumps(value)
+
+def _has_lazy(value: dict) -> bool:
+    return any(isinstance(v, (Deferred, StreamedMapping)) or (isinstance(v, dict) and _has_lazy(v))
+               for v in value.values())
+
+def iter_gzip(chunks: Iterable[str], level: int = 6) -> Iterator[bytes]:
+    """
+    Gzip a stream of text chunks on the fly
+
+    The first chunk is flushed immediately so the client gets the header
+    fields without waiting for the compressor's buffer to fill.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    first = True
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if first:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            first = False
+        if data:
+            yield data
+    yield compressor.flush()
+
+def iter_encoded(chunks: Iterable[str]) -> Iterator[bytes]:
+    for chunk in chunks:
+        yield chunk.encode()
@@ -4,9 +4,16 @@ Logging configuration for BTC Lottery
 import logging
 import sys
 from logging.handlers import RotatingFileHandler
+from config import Config
 
 def setup_logging(log_level='INFO', log_file='lottery.log'):
-    """Setup application logging"""
+    """
+    Setup application logging
+    
+    The log file is opened on the first record written to it, not here,
+    so importing this module works on a read-only filesystem;
+    an empty log_file logs to stdout only.
+    """
     
     # Create logger
     logger = logging.getLogger('btc_lottery')
@@ -24,9 +31,12 @@ def setup_logging(log_level='INFO', log_file='lottery.log'):
     console_handler.setFormatter(console_format)
     logger.addHandler(console_handler)
     
+    if not log_file:
+        return logger
+    
     # File handler with rotation
     file_handler = RotatingFileHandler(
-        log_file, maxBytes=10485760, backupCount=5
+        log_file, maxBytes=10485760, backupCount=5, delay=True
     )
     file_handler.setLevel(logging.DEBUG)
     file_format = logging.Formatter(
@@ -38,4 +48,4 @@ def setup_logging(log_level='INFO', log_file='lottery.log'):
     return logger
 
 # Create global logger
-logger = setup_logging()
+logger = setup_logging(Config.LOG_LEVEL, Config.LOG_FILE)
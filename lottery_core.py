@@ -3,8 +3,18 @@ BTC Lottery Core - Ядро логики честной лотереи на ос
 """
 
 import hashlib
+import heapq
 import json
-from typing import List, Dict, Tuple, Optional, Union, Any
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from typing import List, Dict, Tuple, Optional, Union, Any, Iterable, Iterator, Deque
+from merkle import MerkleBuilder, leaf_hash, inclusion_proof, verify_inclusion
+from metrics import stage
+from result_cache import ResultCache
+from ticket_ranges import TicketRanges
+from ticket_set import TicketSet
 
 
 def sha256(data: bytes) -> bytes:
@@ -74,85 +84,1028 @@ def tie_breaker(seed_bytes: bytes, ticket_number: str, index: int = 1) -> int:
     return int.from_bytes(hash_result, 'big')
 
 
-def pick_winner(seed_hex: str, tickets: List[Union[str, int]]) -> Tuple[str, Dict[str, int], Dict[str, Any]]:
+def _score_base(seed_bytes: bytes) -> Any:
     """
-    Выбирает победителя лотереи
+    Предвычисляет состояние SHA256 (midstate) для префикса seed + b':'
+    
+    Args:
+        seed_bytes: Seed в виде байтов
+    
+    Returns:
+        hashlib-объект, который копируется для каждого билета
+    """
+    return hashlib.sha256(seed_bytes + b':')
+
+
+def _tie_breaker_digest(base: Any, ticket_bytes: bytes, index: int = 1) -> bytes:
+    """Tie-breaker в виде сырого digest, продолжая midstate seed + b':'"""
+    h = base.copy()
+    h.update(ticket_bytes + b':tb' + str(index).encode())
+    return h.digest()
+
+
+def _scan_encoded(base: Any, encoded: Iterable[bytes]) -> Tuple[Optional[bytes], Optional[bytes], Optional[bytes]]:
+    """
+    Однопроходный поиск минимума (score, tie_breaker) по билетам в байтах
+    
+    Сравнивает сырые 32-байтовые digest'ы (лексикографически это то же самое,
+    что сравнение big-endian чисел), а tie-breaker считает только при
+    совпадении score. Память O(1).
+    
+    Returns:
+        Tuple: (победитель в байтах, digest score, digest tie-breaker или None)
+    """
+    copy = base.copy
+    winner = None
+    min_digest = None
+    min_tb = None
+    
+    for t_bytes in encoded:
+        h = copy()
+        h.update(t_bytes)
+        digest = h.digest()
+        
+        if min_digest is None or digest < min_digest:
+            winner = t_bytes
+            min_digest = digest
+            min_tb = None
+        elif digest == min_digest and t_bytes != winner:
+            # Коллизия score - решаем по tie-breaker
+            if min_tb is None:
+                min_tb = _tie_breaker_digest(base, winner)
+            tb = _tie_breaker_digest(base, t_bytes)
+            if tb < min_tb:
+                winner, min_tb = t_bytes, tb
+    
+    return winner, min_digest, min_tb
+
+
+def _scan_winner(base: Any, normalized: Iterable[str]) -> Tuple[Optional[str], Optional[bytes], Optional[bytes]]:
+    """
+    Однопроходный поиск минимума по нормализованным билетам (см. _scan_encoded)
+    
+    Returns:
+        Tuple: (победитель, digest score, digest tie-breaker или None)
+    """
+    winner, min_digest, min_tb = _scan_encoded(base, map(str.encode, normalized))
+    return (winner.decode() if winner is not None else None), min_digest, min_tb
+
+
+def _resolve_tie(base: Any, winner: str, min_tb: Optional[bytes], candidate: str) -> Tuple[str, bytes]:
+    """Коллизия score - решаем по tie-breaker, как в кортежном сравнении"""
+    if min_tb is None:
+        min_tb = _tie_breaker_digest(base, winner.encode())
+    tb = _tie_breaker_digest(base, candidate.encode())
+    if tb < min_tb:
+        return candidate, tb
+    return winner, min_tb
+
+
+def find_winner(seed_hex: str, tickets: Iterable[Union[str, int]]) -> Tuple[Optional[str], Optional[int], Optional[int]]:
+    """
+    Находит только победителя, без построения словарей scores
+    
+    Результат побитово совпадает с pick_winner, но каждый билет
+    нормализуется и хешируется один раз, а память не зависит от числа билетов.
     
     Args:
         seed_hex: Seed в hex формате
-        tickets: Список номеров билетов
+        tickets: Номера билетов (любой итерируемый объект; у TicketSet
+            берутся готовые байтовые формы)
     
     Returns:
-        Tuple[str, Dict[str, int], Dict[str, any]]: 
-            - Номер победившего билета
-            - Словарь {номер_билета: score}
-            - Полная информация для проверки
+        Tuple[str, int, int]: (победитель, score, tie-breaker); для пустого
+        набора билетов - (None, None, None)
     """
-    seed_bytes = bytes.fromhex(seed_hex)
+    base = _score_base(bytes.fromhex(seed_hex))
+    if isinstance(tickets, TicketSet):
+        winner, min_digest, min_tb = _scan_encoded(base, tickets.encoded)
+        winner = winner.decode() if winner is not None else None
+    else:
+        winner, min_digest, min_tb = _scan_winner(base, (normalize_ticket_number(t) for t in tickets))
     
-    winner_ticket = None
-    min_score = None
-    min_tie_breaker = None
-    scores = {}
-    tie_breakers = {}
+    if winner is None:
+        return None, None, None
+    if min_tb is None:
+        min_tb = _tie_breaker_digest(base, winner.encode())
+    
+    return winner, int.from_bytes(min_digest, 'big'), int.from_bytes(min_tb, 'big')
+
+
+class WinnerIndex:
+    """
+    Инкрементальный победитель для фиксированного seed
+    
+    Билеты хранятся в куче по ключу (score, tie_breaker) - в виде сырых
+    digest'ов, как в _scan_winner. Добавление O(log n), удаление O(1)
+    (ленивое: запись остаётся в куче, пока не окажется на вершине),
+    победитель - амортизированно O(log n). Результат всегда совпадает
+    с pick_winner по текущему набору билетов.
+    """
+    
+    def __init__(self, seed_hex: str, tickets: Iterable[Union[str, int]] = ()):
+        self.seed_hex = seed_hex
+        self._base = _score_base(bytes.fromhex(seed_hex))
+        self._live: Dict[str, Tuple[bytes, bytes, str]] = {}
+        for ticket in tickets:
+            t_norm = normalize_ticket_number(ticket)
+            if t_norm not in self._live:
+                self._live[t_norm] = self._key(t_norm)
+        self._heap: List[Tuple[bytes, bytes, str]] = list(self._live.values())
+        heapq.heapify(self._heap)
+    
+    def _key(self, t_norm: str) -> Tuple[bytes, bytes, str]:
+        t_bytes = t_norm.encode()
+        h = self._base.copy()
+        h.update(t_bytes)
+        return h.digest(), _tie_breaker_digest(self._base, t_bytes), t_norm
+    
+    def __len__(self) -> int:
+        return len(self._live)
     
-    for ticket in tickets:
+    def __contains__(self, ticket: Union[str, int]) -> bool:
+        return normalize_ticket_number(ticket) in self._live
+    
+    def add(self, ticket: Union[str, int]) -> bool:
+        """Добавляет билет; False, если он уже есть"""
+        t_norm = normalize_ticket_number(ticket)
+        if t_norm in self._live:
+            return False
+        key = self._key(t_norm)
+        self._live[t_norm] = key
+        heapq.heappush(self._heap, key)
+        return True
+    
+    def remove(self, ticket: Union[str, int]) -> bool:
+        """Удаляет билет; False, если его нет"""
         t_norm = normalize_ticket_number(ticket)
-        score = compute_score(seed_bytes, t_norm)
-        tb = tie_breaker(seed_bytes, t_norm, 1)
+        if self._live.pop(t_norm, None) is None:
+            return False
+        # Удалённых записей не должно накапливаться больше, чем живых
+        if len(self._heap) > 2 * len(self._live) + 64:
+            self._heap = list(self._live.values())
+            heapq.heapify(self._heap)
+        return True
+    
+    def _top(self) -> Optional[Tuple[bytes, bytes, str]]:
+        heap = self._heap
+        while heap:
+            top = heap[0]
+            if top[2] in self._live:
+                return top
+            # Ленивое удаление (повторно добавленный билет тоже лежит в куче и будет найден)
+            heapq.heappop(heap)
+        return None
+    
+    def winner(self) -> Tuple[Optional[str], Optional[int], Optional[int]]:
+        """
+        Текущий победитель
         
-        scores[t_norm] = score
-        tie_breakers[t_norm] = tb
+        Returns:
+            Tuple[str, int, int]: (победитель, score, tie-breaker), как у find_winner
+        """
+        top = self._top()
+        if top is None:
+            return None, None, None
+        return top[2], int.from_bytes(top[0], 'big'), int.from_bytes(top[1], 'big')
+
+
+# Параметры параллельного режима по умолчанию
+PARALLEL_CHUNK_SIZE = 250_000
+PARALLEL_MIN_TICKETS = 500_000
+
+
+def _shard_winner(seed_hex: str, chunk: List[Union[str, int]], normalized: bool = False) -> Tuple[Optional[str], Optional[bytes]]:
+    """Локальный минимум score для одного шарда (выполняется в дочернем процессе)"""
+    base = _score_base(bytes.fromhex(seed_hex))
+    if not normalized:
+        chunk = [normalize_ticket_number(t) for t in chunk]
+    winner, min_digest, _ = _scan_winner(base, chunk)
+    return winner, min_digest
+
+
+def _iter_chunks(tickets: Iterable[Union[str, int]], chunk_size: int) -> Iterator[List[Union[str, int]]]:
+    """Разбивает итерируемый объект на списки по chunk_size элементов"""
+    iterator = iter(tickets)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def find_winner_parallel(seed_hex: str, tickets: Iterable[Union[str, int]], workers: Optional[int] = None,
+                         chunk_size: int = PARALLEL_CHUNK_SIZE,
+                         min_parallel: int = PARALLEL_MIN_TICKETS,
+                         normalized: bool = False) -> Tuple[Optional[str], Optional[int], Optional[int]]:
+    """
+    Находит победителя, распределяя билеты по пулу процессов
+    
+    Каждый шард возвращает свой минимум score, финальная свёртка идёт в
+    порядке шардов с тем же разрешением коллизий, что и в find_winner,
+    поэтому результат побитово совпадает с последовательным режимом.
+    
+    Args:
+        seed_hex: Seed в hex формате
+        tickets: Номера билетов (любой итерируемый объект)
+        workers: Число процессов (по умолчанию os.cpu_count())
+        chunk_size: Размер шарда в билетах
+        min_parallel: Если билетов меньше, считаем последовательно -
+            запуск процессов обойдётся дороже самого подсчёта
+        normalized: Билеты уже нормализованы (normalize_ticket_number)
+    
+    Returns:
+        Tuple[str, int, int]: (победитель, score, tie-breaker)
+    """
+    workers = workers or os.cpu_count() or 1
+    chunk_size = max(1, chunk_size)
+    chunks = _iter_chunks(tickets, chunk_size)
+    
+    # Читаем начало набора, чтобы решить, стоит ли запускать пул
+    head: List[List[Union[str, int]]] = []
+    head_size = 0
+    for chunk in chunks:
+        head.append(chunk)
+        head_size += len(chunk)
+        if head_size >= min_parallel:
+            break
+    
+    if workers <= 1 or head_size < min_parallel:
+        return find_winner(seed_hex, chain(chain.from_iterable(head), chain.from_iterable(chunks)))
+    
+    base = _score_base(bytes.fromhex(seed_hex))
+    winner = None
+    min_digest = None
+    min_tb = None
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Держим в работе не больше 2 * workers шардов, чтобы не читать весь вход в память
+        pending: Deque[Any] = deque()
+        for chunk in chain(head, chunks):
+            pending.append(executor.submit(_shard_winner, seed_hex, chunk, normalized))
+            if len(pending) >= 2 * workers:
+                shard = pending.popleft().result()
+                winner, min_digest, min_tb = _reduce_shard(base, winner, min_digest, min_tb, shard)
+        while pending:
+            shard = pending.popleft().result()
+            winner, min_digest, min_tb = _reduce_shard(base, winner, min_digest, min_tb, shard)
+    
+    if winner is None:
+        return None, None, None
+    if min_tb is None:
+        min_tb = _tie_breaker_digest(base, winner.encode())
+    
+    return winner, int.from_bytes(min_digest, 'big'), int.from_bytes(min_tb, 'big')
+
+
+def _reduce_shard(base: Any, winner: Optional[str], min_digest: Optional[bytes], min_tb: Optional[bytes],
+                  shard: Tuple[Optional[str], Optional[bytes]]) -> Tuple[Optional[str], Optional[bytes], Optional[bytes]]:
+    """Сворачивает локальный минимум шарда в общий"""
+    shard_winner, shard_digest = shard
+    if shard_winner is None:
+        return winner, min_digest, min_tb
+    if min_digest is None or shard_digest < min_digest:
+        return shard_winner, shard_digest, None
+    if shard_digest == min_digest and shard_winner != winner:
+        winner, min_tb = _resolve_tie(base, winner, min_tb, shard_winner)
+    return winner, min_digest, min_tb
+
+
+def _shard_winner_ranges(seed_hex: str, shard: TicketRanges) -> Tuple[Optional[str], Optional[bytes]]:
+    """Локальный минимум score для шарда диапазонов (выполняется в дочернем процессе)"""
+    winner, min_digest, _ = _scan_winner(_score_base(bytes.fromhex(seed_hex)), shard.iter_normalized())
+    return winner, min_digest
+
+
+def find_winner_ranges(seed_hex: str, tickets: TicketRanges, workers: Optional[int] = None,
+                       chunk_size: int = PARALLEL_CHUNK_SIZE,
+                       min_parallel: int = PARALLEL_MIN_TICKETS) -> Tuple[Optional[str], Optional[int], Optional[int]]:
+    """
+    Находит победителя для набора диапазонов, не разворачивая его в список
+    
+    Билеты перебираются лениво (строки получаются прямо из range), а в
+    дочерние процессы уходят только границы шардов - десятки байт вместо
+    списков билетов. Свёртка шардов та же, что в find_winner_parallel,
+    результат побитово совпадает с find_winner для развёрнутого списка.
+    
+    Args:
+        seed_hex: Seed в hex формате
+        tickets: Набор билетов (TicketRanges)
+        workers: Число процессов (по умолчанию os.cpu_count())
+        chunk_size: Размер шарда в билетах
+        min_parallel: Порог числа билетов, ниже которого пул не запускается
+    
+    Returns:
+        Tuple[str, int, int]: (победитель, score, tie-breaker)
+    """
+    workers = workers or os.cpu_count() or 1
+    base = _score_base(bytes.fromhex(seed_hex))
+    
+    if workers <= 1 or len(tickets) < min_parallel:
+        winner, min_digest, min_tb = _scan_winner(base, tickets.iter_normalized())
+    else:
+        winner = None
+        min_digest = None
+        min_tb = None
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_shard_winner_ranges, seed_hex, shard)
+                       for shard in tickets.shards(max(1, chunk_size))]
+            for future in futures:
+                winner, min_digest, min_tb = _reduce_shard(base, winner, min_digest, min_tb, future.result())
+    
+    if winner is None:
+        return None, None, None
+    if min_tb is None:
+        min_tb = _tie_breaker_digest(base, winner.encode())
+    
+    return winner, int.from_bytes(min_digest, 'big'), int.from_bytes(min_tb, 'big')
+
+
+def pick_winner_ranges(seed_hex: str, tickets: TicketRanges, workers: Optional[int] = None,
+                       chunk_size: int = PARALLEL_CHUNK_SIZE, min_parallel: int = PARALLEL_MIN_TICKETS,
+                       cache: Optional[ResultCache] = None) -> Tuple[Optional[str], Dict[str, Any]]:
+    """
+    Выбирает победителя для набора диапазонов (только данные победителя)
+    
+    Доказательство содержит сами диапазоны (ticket_ranges) - по ним любой
+    может восстановить набор билетов. Ключ кеша - дайджест развёрнутого
+    списка по возрастанию, так что записи общие с pick_winner для того же
+    списка.
+    
+    Args:
+        seed_hex: Seed в hex формате
+        tickets: Набор билетов (TicketRanges)
+        workers: Число процессов (None - последовательно, 0 - os.cpu_count())
+        chunk_size, min_parallel: Параметры параллельного режима
+        cache: Кеш результатов (ResultCache) или None
+    
+    Returns:
+        Tuple[str, Dict]: Победитель и данные для проверки
+    """
+    entry = None
+    if cache is not None:
+        with stage('cache_lookup'):
+            key = cache.key(seed_hex, tickets.digest())
+            entry = cache.get(key)
+    
+    if entry is not None:
+        winner, _, stored = entry
+        min_score, min_tie_breaker = stored['winner_score'], stored['winner_tie_breaker']
+    else:
+        with stage('score'):
+            winner, score, tb = find_winner_ranges(
+                seed_hex, tickets, 1 if workers is None else workers, chunk_size, min_parallel
+            )
+        min_score, min_tie_breaker = str(score), str(tb)
+        if cache is not None:
+            stored = {'seed_hex': seed_hex, 'winner': winner, 'winner_score': min_score,
+                      'winner_tie_breaker': min_tie_breaker}
+            cache.put(key, (winner, None, stored), len(tickets))
+    
+    proof_data = {
+        'seed_hex': seed_hex,
+        'ticket_ranges': tickets.to_dict(),
+        'ticket_count': len(tickets),
+        'winner': winner,
+        'winner_score': min_score,
+        'winner_tie_breaker': min_tie_breaker
+    }
+    
+    return winner, proof_data
+
+
+class TicketSetDigest:
+    """
+    Дайджест набора билетов: количество плюс скользящий SHA256
+    
+    Хеш считается по нормализованным билетам в порядке поступления,
+    каждый билет завершается b'\\n'. Позволяет зафиксировать набор билетов
+    в доказательстве, не перечисляя их. Для TicketSet берутся его готовые
+    строки и отпечаток (TicketSet.fingerprint) - это то же значение.
+    """
+    
+    def __init__(self) -> None:
+        self.count = 0
+        self._hash = hashlib.sha256()
+        self._digest: Optional[str] = None
+    
+    def feed(self, tickets: Iterable[Union[str, int]]) -> Iterator[str]:
+        """
+        Нормализует билеты, учитывая их в дайджесте
         
-        # Сравниваем (score, tie_breaker) как кортеж
-        combined = (score, tb)
+        Args:
+            tickets: Номера билетов
         
-        if (min_score is None) or (combined < (min_score, min_tie_breaker)):
-            min_score = score
-            min_tie_breaker = tb
-            winner_ticket = t_norm
+        Yields:
+            str: Нормализованный номер билета
+        """
+        if isinstance(tickets, TicketSet) and self.count == 0:
+            yield from tickets.normalized
+            self.count = len(tickets)
+            self._digest = tickets.fingerprint()['digest']
+            return
+        update = self._hash.update
+        for ticket in tickets:
+            t_norm = normalize_ticket_number(ticket)
+            update(t_norm.encode() + b'\n')
+            self.count += 1
+            yield t_norm
+    
+    def hexdigest(self) -> str:
+        return self._digest or self._hash.hexdigest()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {'count': self.count, 'digest': self.hexdigest()}
+
+
+def ticket_set_digest(tickets: Iterable[Union[str, int]]) -> Dict[str, Any]:
+    """
+    Вычисляет дайджест набора билетов (см. TicketSetDigest)
+    
+    Returns:
+        Dict: {'count': число билетов, 'digest': hex SHA256}
+    """
+    set_digest = TicketSetDigest()
+    for _ in set_digest.feed(tickets):
+        pass
+    return set_digest.to_dict()
+
+
+def pick_winner_stream(seed_hex: str, tickets: Iterable[Union[str, int]], workers: Optional[int] = None,
+                       chunk_size: int = PARALLEL_CHUNK_SIZE,
+                       min_parallel: int = PARALLEL_MIN_TICKETS) -> Tuple[Optional[str], Dict[str, Any]]:
+    """
+    Выбирает победителя за один проход по произвольному итерируемому набору
+    
+    Память не зависит от числа билетов: вместо списка билетов и scores
+    доказательство содержит дайджест набора (количество и SHA256).
+    
+    Args:
+        seed_hex: Seed в hex формате
+        tickets: Номера билетов (генератор, файл через ticket_stream и т.п.)
+        workers, chunk_size, min_parallel: Параметры параллельного режима
+            (None - последовательно, см. pick_winner)
+    
+    Returns:
+        Tuple[str, Dict]: Победитель и данные для проверки
+    """
+    set_digest = TicketSetDigest()
+    normalized = set_digest.feed(tickets)
+    
+    if workers is not None:
+        winner, min_score, min_tie_breaker = find_winner_parallel(
+            seed_hex, normalized, workers, chunk_size, min_parallel, normalized=True
+        )
+    else:
+        winner, min_score, min_tie_breaker = find_winner(seed_hex, normalized)
     
     proof_data = {
         'seed_hex': seed_hex,
-        'tickets': [normalize_ticket_number(t) for t in tickets],
-        'scores': {k: str(v) for k, v in scores.items()},  # Преобразуем в stringsи для JSON
-        'tie_breakers': {k: str(v) for k, v in tie_breakers.items()},
-        'winner': winner_ticket,
+        'ticket_set': set_digest.to_dict(),
+        'winner': winner,
         'winner_score': str(min_score),
         'winner_tie_breaker': str(min_tie_breaker)
     }
     
+    return winner, proof_data
+
+
+class ScoreStream:
+    """
+    Итератор (билет, score) с попутным выбором победителя
+    
+    Нужен для потоковой выдачи scores: каждый score отдаётся сразу после
+    вычисления, а победитель и доказательство доступны после исчерпания
+    итератора. Память не зависит от числа билетов.
+    """
+    
+    def __init__(self, seed_hex: str, tickets: Iterable[Union[str, int]]):
+        self.seed_hex = seed_hex
+        self._tickets = tickets
+        self._base = _score_base(bytes.fromhex(seed_hex))
+        self.set_digest = TicketSetDigest()
+        self.winner: Optional[str] = None
+        self._min_digest: Optional[bytes] = None
+        self._min_tb: Optional[bytes] = None
+    
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        """
+        Yields:
+            Tuple[str, str]: Нормализованный билет и его score (десятичная строка)
+        """
+        base = self._base
+        copy = base.copy
+        for t_norm in self.set_digest.feed(self._tickets):
+            h = copy()
+            h.update(t_norm.encode())
+            digest = h.digest()
+            
+            if self._min_digest is None or digest < self._min_digest:
+                self.winner = t_norm
+                self._min_digest = digest
+                self._min_tb = None
+            elif digest == self._min_digest and t_norm != self.winner:
+                self.winner, self._min_tb = _resolve_tie(base, self.winner, self._min_tb, t_norm)
+            
+            yield t_norm, str(int.from_bytes(digest, 'big'))
+    
+    def proof(self) -> Dict[str, Any]:
+        """Данные для проверки (после полного прохода по итератору)"""
+        min_score = None
+        min_tie_breaker = None
+        if self.winner is not None:
+            if self._min_tb is None:
+                self._min_tb = _tie_breaker_digest(self._base, self.winner.encode())
+            min_score = int.from_bytes(self._min_digest, 'big')
+            min_tie_breaker = int.from_bytes(self._min_tb, 'big')
+        
+        return {
+            'seed_hex': self.seed_hex,
+            'ticket_set': self.set_digest.to_dict(),
+            'winner': self.winner,
+            'winner_score': str(min_score),
+            'winner_tie_breaker': str(min_tie_breaker)
+        }
+
+
+def pick_winner_compact(seed_hex: str, tickets: Iterable[Union[str, int]]) -> Tuple[Optional[str], Dict[str, Any]]:
+    """
+    Выбирает победителя и коммитит все (билет, score) в корень Меркла
+    
+    Один проход, память O(log n). Доказательство содержит только данные
+    победителя, дайджест набора билетов и корень дерева; доказательство
+    включения любого билета строится отдельно (ticket_inclusion_proof).
+    
+    Args:
+        seed_hex: Seed в hex формате
+        tickets: Номера билетов (любой итерируемый объект)
+    
+    Returns:
+        Tuple[str, Dict]: Победитель и компактные данные для проверки
+    """
+    base = _score_base(bytes.fromhex(seed_hex))
+    copy = base.copy
+    set_digest = TicketSetDigest()
+    builder = MerkleBuilder()
+    add_leaf = builder.add
+    
+    winner = None
+    min_digest = None
+    min_tb = None
+    winner_index = None
+    
+    for index, t_norm in enumerate(set_digest.feed(tickets)):
+        h = copy()
+        h.update(t_norm.encode())
+        digest = h.digest()
+        add_leaf(leaf_hash(t_norm, digest))
+        
+        if min_digest is None or digest < min_digest:
+            winner, min_digest, min_tb, winner_index = t_norm, digest, None, index
+        elif digest == min_digest and t_norm != winner:
+            new_winner, min_tb = _resolve_tie(base, winner, min_tb, t_norm)
+            if new_winner != winner:
+                winner, winner_index = new_winner, index
+    
+    if winner is not None and min_tb is None:
+        min_tb = _tie_breaker_digest(base, winner.encode())
+    root = builder.root()
+    
+    proof_data = {
+        'seed_hex': seed_hex,
+        'ticket_set': set_digest.to_dict(),
+        'merkle_root': root.hex() if root else None,
+        'winner': winner,
+        'winner_index': winner_index,
+        'winner_score': str(int.from_bytes(min_digest, 'big')) if winner is not None else 'None',
+        'winner_tie_breaker': str(int.from_bytes(min_tb, 'big')) if winner is not None else 'None'
+    }
+    
+    return winner, proof_data
+
+
+def ticket_inclusion_proof(seed_hex: str, tickets: Iterable[Union[str, int]], ticket: Union[str, int]) -> Optional[Dict[str, Any]]:
+    """
+    Доказательство включения билета в корень Меркла компактного розыгрыша
+    
+    Args:
+        seed_hex: Seed розыгрыша в hex формате
+        tickets: Те же билеты в том же порядке, что и при розыгрыше
+        ticket: Билет, для которого строится доказательство
+    
+    Returns:
+        Dict: Билет, его позиция, score, лист, путь и корень;
+        None, если билета нет в наборе
+    """
+    base = _score_base(bytes.fromhex(seed_hex))
+    target = normalize_ticket_number(ticket)
+    
+    leaves = []
+    index = None
+    target_digest = None
+    for i, t in enumerate(tickets):
+        t_norm = normalize_ticket_number(t)
+        h = base.copy()
+        h.update(t_norm.encode())
+        digest = h.digest()
+        if index is None and t_norm == target:
+            index, target_digest = i, digest
+        leaves.append(leaf_hash(t_norm, digest))
+    
+    if index is None:
+        return None
+    
+    root, path = inclusion_proof(leaves, index)
+    return {
+        'ticket': target,
+        'index': index,
+        'score': str(int.from_bytes(target_digest, 'big')),
+        'leaf': leaf_hash(target, target_digest).hex(),
+        'path': path,
+        'merkle_root': root.hex()
+    }
+
+
+def verify_ticket_inclusion(seed_hex: str, ticket: Union[str, int], path: List[Dict[str, str]], merkle_root: str) -> bool:
+    """
+    Проверяет доказательство включения: пересчитывает score и лист билета
+    
+    Args:
+        seed_hex: Seed розыгрыша в hex формате
+        ticket: Номер билета
+        path: Путь из ticket_inclusion_proof
+        merkle_root: Корень из доказательства розыгрыша (hex)
+    
+    Returns:
+        bool: True, если билет с этим score входит в розыгрыш
+    """
+    t_norm = normalize_ticket_number(ticket)
+    digest = sha256(bytes.fromhex(seed_hex) + b':' + t_norm.encode())
+    return verify_inclusion(leaf_hash(t_norm, digest), path, bytes.fromhex(merkle_root))
+
+
+def pick_winners(seed_hex: str, tickets: Iterable[Union[str, int]], k: int) -> Tuple[List[str], Dict[str, Any]]:
+    """
+    Выбирает k победителей (призовые места) за один проход
+    
+    Места - k наименьших пар (score, tie_breaker), по возрастанию; первое
+    место всегда совпадает с победителем pick_winner. Ограниченная куча
+    из k элементов: время O(n log k), память O(k). Tie-breaker считается
+    только для билетов, попадающих в кучу, и при совпадении score с
+    границей кучи. Повторы билета учитываются один раз.
+    
+    Args:
+        seed_hex: Seed в hex формате
+        tickets: Номера билетов (любой итерируемый объект)
+        k: Число призовых мест
+    
+    Returns:
+        Tuple[List[str], Dict]: Победители по местам и данные для проверки
+    """
+    if k < 1:
+        raise ValueError("k must be at least 1")
+    
+    base = _score_base(bytes.fromhex(seed_hex))
+    copy = base.copy
+    set_digest = TicketSetDigest()
+    
+    # Max-куча через отрицание: вершина - худший из отобранных (-score, -tie_breaker, билет)
+    heap: List[Tuple[int, int, str]] = []
+    members = set()
+    
+    for t_norm in set_digest.feed(tickets):
+        t_bytes = t_norm.encode()
+        h = copy()
+        h.update(t_bytes)
+        score = int.from_bytes(h.digest(), 'big')
+        
+        if len(heap) == k:
+            worst_score = -heap[0][0]
+            if score > worst_score or t_norm in members:
+                continue
+            tb = int.from_bytes(_tie_breaker_digest(base, t_bytes), 'big')
+            if score == worst_score and tb >= -heap[0][1]:
+                continue
+            _, _, evicted = heapq.heapreplace(heap, (-score, -tb, t_norm))
+            members.discard(evicted)
+            members.add(t_norm)
+        elif t_norm not in members:
+            tb = int.from_bytes(_tie_breaker_digest(base, t_bytes), 'big')
+            heapq.heappush(heap, (-score, -tb, t_norm))
+            members.add(t_norm)
+    
+    ranked = sorted((-neg_score, -neg_tb, t_norm) for neg_score, neg_tb, t_norm in heap)
+    winners = [t_norm for _, _, t_norm in ranked]
+    
+    proof_data = {
+        'seed_hex': seed_hex,
+        'ticket_set': set_digest.to_dict(),
+        'k': k,
+        'winners': [
+            {'place': place, 'ticket': t_norm, 'score': str(score), 'tie_breaker': str(tb)}
+            for place, (score, tb, t_norm) in enumerate(ranked, 1)
+        ]
+    }
+    
+    return winners, proof_data
+
+
+def _pick_winner_set(seed_hex: str, ticket_set: TicketSet, include_scores: bool = True,
+                     workers: Optional[int] = None, chunk_size: int = PARALLEL_CHUNK_SIZE,
+                     min_parallel: int = PARALLEL_MIN_TICKETS) -> Tuple[Optional[str], Dict[str, int], Dict[str, Any]]:
+    """pick_winner для канонического набора билетов (TicketSet)"""
+    normalized = ticket_set.normalized
+    if not include_scores:
+        with stage('score'):
+            if workers is not None:
+                winner, min_score, min_tie_breaker = find_winner_parallel(
+                    seed_hex, normalized, workers, chunk_size, min_parallel, normalized=True
+                )
+            else:
+                winner, min_score, min_tie_breaker = find_winner(seed_hex, ticket_set)
+        proof_data = {
+            'seed_hex': seed_hex,
+            'tickets': normalized,
+            'ticket_set': ticket_set.fingerprint(),
+            'winner': winner,
+            'winner_score': str(min_score),
+            'winner_tie_breaker': str(min_tie_breaker)
+        }
+        return winner, {}, proof_data
+    
+    base = _score_base(bytes.fromhex(seed_hex))
+    copy = base.copy
+    
+    winner_ticket = None
+    min_score = None
+    min_tie_breaker = None
+    scores = {}
+    tie_breakers = {}
+    
+    with stage('score'):
+        for t_norm in normalized:
+            t_bytes = t_norm.encode()
+            h = copy()
+            h.update(t_bytes)
+            score = int.from_bytes(h.digest(), 'big')
+            tb = int.from_bytes(_tie_breaker_digest(base, t_bytes), 'big')
+            
+            scores[t_norm] = score
+            tie_breakers[t_norm] = tb
+            
+            # Сравниваем (score, tie_breaker) как кортеж
+            if (min_score is None) or ((score, tb) < (min_score, min_tie_breaker)):
+                min_score = score
+                min_tie_breaker = tb
+                winner_ticket = t_norm
+    
+    with stage('proof'):
+        proof_data = {
+            'seed_hex': seed_hex,
+            'tickets': normalized,
+            'ticket_set': ticket_set.fingerprint(),
+            'scores': {k: str(v) for k, v in scores.items()},  # Преобразуем в строки для JSON
+            'tie_breakers': {k: str(v) for k, v in tie_breakers.items()},
+            'winner': winner_ticket,
+            'winner_score': str(min_score),
+            'winner_tie_breaker': str(min_tie_breaker)
+        }
+    
     return winner_ticket, scores, proof_data
 
 
-def get_lottery_result(block_hashes: List[str], tickets: List[Union[str, int]], block_heights: Optional[List[int]] = None) -> Dict[str, Any]:
+def _pick_winner_cached(seed_hex: str, ticket_set: TicketSet, include_scores: bool = True,
+                        workers: Optional[int] = None, chunk_size: int = PARALLEL_CHUNK_SIZE,
+                        min_parallel: int = PARALLEL_MIN_TICKETS,
+                        cache: Optional[ResultCache] = None) -> Tuple[Optional[str], Dict[str, int], Dict[str, Any]]:
+    """
+    _pick_winner_set с кешем результатов
+    
+    Повторный розыгрыш на тех же seed и билетах сводится к поиску в кеше
+    по отпечатку набора (TicketSet.fingerprint, считается один раз). Запись со scores обслуживает и запросы
+    без scores; списки билетов в кеше не хранятся.
+    """
+    if cache is None:
+        return _pick_winner_set(seed_hex, ticket_set, include_scores, workers, chunk_size, min_parallel)
+    
+    with stage('cache_lookup'):
+        key = cache.key(seed_hex, ticket_set.fingerprint())
+        entry = cache.get(key, with_scores=include_scores)
+    if entry is None:
+        winner, scores, proof_data = _pick_winner_set(
+            seed_hex, ticket_set, include_scores, workers, chunk_size, min_parallel
+        )
+        stored = {k: v for k, v in proof_data.items() if k not in ('tickets', 'ticket_set')}
+        cache.put(key, (winner, scores if include_scores else None, stored), len(ticket_set))
+        return winner, scores, proof_data
+    
+    winner, scores, stored = entry
+    skip = ('seed_hex',) if include_scores else ('seed_hex', 'scores', 'tie_breakers')
+    proof_data = {'seed_hex': seed_hex, 'tickets': ticket_set.normalized, 'ticket_set': ticket_set.fingerprint()}
+    proof_data.update((k, v) for k, v in stored.items() if k not in skip)
+    return winner, (scores if include_scores else {}), proof_data
+
+
+def pick_winner(seed_hex: str, tickets: Union[TicketSet, List[Union[str, int]]], include_scores: bool = True,
+                workers: Optional[int] = None, chunk_size: int = PARALLEL_CHUNK_SIZE,
+                min_parallel: int = PARALLEL_MIN_TICKETS,
+                cache: Optional[ResultCache] = None) -> Tuple[str, Dict[str, int], Dict[str, Any]]:
+    """
+    Выбирает победителя лотереи
+    
+    Args:
+        seed_hex: Seed в hex формате
+        tickets: TicketSet или список номеров билетов (из списка строится
+            TicketSet: билеты проверяются, повторы сливаются)
+        include_scores: Строить ли полные словари scores и tie_breakers.
+            При False используется однопроходный движок find_winner,
+            словарь scores пустой, а proof содержит только данные победителя
+        workers: Число процессов для параллельного режима (None - последовательно,
+            0 - os.cpu_count()). Действует только при include_scores=False
+        chunk_size: Размер шарда для параллельного режима
+        min_parallel: Порог числа билетов, ниже которого пул не запускается
+        cache: Кеш результатов (ResultCache) или None. Возвращаемые из кеша
+            словари общие для всех вызовов, их нельзя изменять
+    
+    Returns:
+        Tuple[str, Dict[str, int], Dict[str, any]]: 
+            - Номер победившего билета
+            - Словарь {номер_билета: score}
+            - Полная информация для проверки
+    
+    Raises:
+        ValueError: Если билет не целое число в диапазоне uint64
+    """
+    ticket_set = TicketSet.of(tickets)
+    return _pick_winner_cached(seed_hex, ticket_set, include_scores, workers, chunk_size, min_parallel, cache)
+
+
+def get_lottery_result(block_hashes: List[str], tickets: Union[TicketSet, Iterable[Union[str, int]]],
+                       block_heights: Optional[List[int]] = None,
+                       include_scores: bool = True, workers: Optional[int] = None,
+                       chunk_size: int = PARALLEL_CHUNK_SIZE, min_parallel: int = PARALLEL_MIN_TICKETS,
+                       cache: Optional[ResultCache] = None) -> Dict[str, Any]:
     """
     Получает полный результат лотереи
     
     Args:
         block_hashes: Список хешей блоков Bitcoin
-        tickets: Список номеров билетов
+        tickets: TicketSet или номера билетов (см. pick_winner)
         block_heights: Список высот блоков (опционально)
+        include_scores: Включать ли scores всех билетов (см. pick_winner)
+        workers, chunk_size, min_parallel: Параметры параллельного режима (см. pick_winner)
+        cache: Кеш результатов (см. pick_winner)
     
     Returns:
         Dict: Полная информация о розыгрыше
     """
-    seed_bytes = generate_seed(block_hashes)
-    seed_hex = seed_bytes.hex()
+    with stage('seed'):
+        seed_bytes = generate_seed(block_hashes)
+        seed_hex = seed_bytes.hex()
     
-    winner, scores, proof_data = pick_winner(seed_hex, tickets)
+    with stage('normalize'):
+        ticket_set = TicketSet.of(tickets)
+    winner, scores, proof_data = _pick_winner_cached(
+        seed_hex, ticket_set, include_scores, workers, chunk_size, min_parallel, cache
+    )
     
     result = {
         'block_hashes': block_hashes,
         'block_heights': block_heights or [],
         'seed_hex': seed_hex,
-        'tickets': [normalize_ticket_number(t) for t in tickets],
+        'tickets': ticket_set.normalized,
+        'winner': winner
+    }
+    if include_scores:
+        result['scores'] = proof_data['scores']
+    result['proof'] = proof_data
+    
+    return result
+
+
+def get_lottery_result_stream(block_hashes: List[str], tickets: Iterable[Union[str, int]],
+                              block_heights: Optional[List[int]] = None, workers: Optional[int] = None,
+                              chunk_size: int = PARALLEL_CHUNK_SIZE,
+                              min_parallel: int = PARALLEL_MIN_TICKETS) -> Dict[str, Any]:
+    """
+    Результат лотереи для потока билетов (один проход, постоянная память)
+    
+    Args:
+        block_hashes: Список хешей блоков Bitcoin
+        tickets: Номера билетов (любой итерируемый объект)
+        block_heights: Список высот блоков (опционально)
+        workers, chunk_size, min_parallel: Параметры параллельного режима
+    
+    Returns:
+        Dict: Информация о розыгрыше с дайджестом набора билетов вместо списка
+    """
+    with stage('seed'):
+        seed_hex = generate_seed(block_hashes).hex()
+    with stage('score'):
+        winner, proof_data = pick_winner_stream(seed_hex, tickets, workers, chunk_size, min_parallel)
+    
+    return {
+        'block_hashes': block_hashes,
+        'block_heights': block_heights or [],
+        'seed_hex': seed_hex,
+        'ticket_set': proof_data['ticket_set'],
         'winner': winner,
-        'scores': {k: str(v) for k, v in scores.items()},
         'proof': proof_data
     }
+
+
+
+def get_lottery_result_ranges(block_hashes: List[str], tickets: TicketRanges,
+                              block_heights: Optional[List[int]] = None, workers: Optional[int] = None,
+                              chunk_size: int = PARALLEL_CHUNK_SIZE, min_parallel: int = PARALLEL_MIN_TICKETS,
+                              cache: Optional[ResultCache] = None) -> Dict[str, Any]:
+    """
+    Результат лотереи для набора диапазонов (см. pick_winner_ranges)
     
-    return result
+    Args:
+        block_hashes: Список хешей блоков Bitcoin
+        tickets: Набор билетов (TicketRanges)
+        block_heights: Список высот блоков (опционально)
+        workers, chunk_size, min_parallel: Параметры параллельного режима
+        cache: Кеш результатов (см. pick_winner)
+    
+    Returns:
+        Dict: Информация о розыгрыше; билеты - в proof['ticket_ranges']
+    """
+    with stage('seed'):
+        seed_hex = generate_seed(block_hashes).hex()
+    winner, proof_data = pick_winner_ranges(seed_hex, tickets, workers, chunk_size, min_parallel, cache)
+    
+    return {
+        'block_hashes': block_hashes,
+        'block_heights': block_heights or [],
+        'seed_hex': seed_hex,
+        'ticket_count': len(tickets),
+        'winner': winner,
+        'proof': proof_data
+    }
+
+
+def get_lottery_result_compact(block_hashes: List[str], tickets: Iterable[Union[str, int]],
+                               block_heights: Optional[List[int]] = None) -> Dict[str, Any]:
+    """
+    Результат лотереи с компактным доказательством (корень Меркла)
+    
+    Размер ответа не зависит от числа билетов: вместо scores всех билетов
+    возвращается корень дерева над листьями (билет, score).
+    
+    Args:
+        block_hashes: Список хешей блоков Bitcoin
+        tickets: Номера билетов (любой итерируемый объект)
+        block_heights: Список высот блоков (опционально)
+    
+    Returns:
+        Dict: Информация о розыгрыше с корнем Меркла
+    """
+    with stage('seed'):
+        seed_hex = generate_seed(block_hashes).hex()
+    with stage('score'):
+        winner, proof_data = pick_winner_compact(seed_hex, tickets)
+    
+    return {
+        'block_hashes': block_hashes,
+        'block_heights': block_heights or [],
+        'seed_hex': seed_hex,
+        'ticket_set': proof_data['ticket_set'],
+        'merkle_root': proof_data['merkle_root'],
+        'winner': winner,
+        'proof': proof_data
+    }
+
+
+def get_lottery_result_top(block_hashes: List[str], tickets: Iterable[Union[str, int]], k: int,
+                           block_heights: Optional[List[int]] = None) -> Dict[str, Any]:
+    """
+    Результат розыгрыша с k призовыми местами (см. pick_winners)
+    
+    Args:
+        block_hashes: Список хешей блоков Bitcoin
+        tickets: Номера билетов (любой итерируемый объект)
+        k: Число призовых мест
+        block_heights: Список высот блоков (опционально)
+    
+    Returns:
+        Dict: Информация о розыгрыше; winner - первое место, winners - все места
+    """
+    with stage('seed'):
+        seed_hex = generate_seed(block_hashes).hex()
+    with stage('score'):
+        winners, proof_data = pick_winners(seed_hex, tickets, k)
+    
+    return {
+        'block_hashes': block_hashes,
+        'block_heights': block_heights or [],
+        'seed_hex': seed_hex,
+        'ticket_set': proof_data['ticket_set'],
+        'winner': winners[0] if winners else None,
+        'winners': winners,
+        'proof': proof_data
+    }
 
 
 if __name__ == "__main__":
@@ -0,0 +1,117 @@
+"""
+Merkle - Commitments to draw scores
+Streaming Merkle root and inclusion proofs over (ticket, score) leaves
+"""
+import hashlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+def leaf_hash(ticket: str, score_digest: bytes) -> bytes:
+    """
+    Hash of one (ticket, score) leaf
+
+    Args:
+        ticket: Normalized ticket number
+        score_digest: 32-byte score digest (SHA256(seed + ":" + ticket))
+
+    Returns:
+        bytes: 32-byte leaf hash
+    """
+    return hashlib.sha256(LEAF_PREFIX + ticket.encode() + b':' + score_digest).digest()
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    """Hash of an inner node"""
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+class MerkleBuilder:
+    """
+    Builds a Merkle root from a stream of leaves in O(log n) memory
+
+    Leaves are paired left to right at every level; an odd node at the end
+    of a level is promoted unchanged (never duplicated). If ``target`` is
+    given, the inclusion path of that leaf index is collected on the way.
+    """
+
+    def __init__(self, target: Optional[int] = None):
+        self.count = 0
+        self.target = target
+        self.path: List[Tuple[str, bytes]] = []
+        # Stack of (height, hash, contains_target)
+        self._stack: List[Tuple[int, bytes, bool]] = []
+
+    def add(self, leaf: bytes) -> None:
+        node = (0, leaf, self.count == self.target)
+        self.count += 1
+        stack = self._stack
+        while stack and stack[-1][0] == node[0]:
+            node = self._merge(stack.pop(), node)
+        stack.append(node)
+
+    def _merge(self, left: Tuple[int, bytes, bool], right: Tuple[int, bytes, bool]) -> Tuple[int, bytes, bool]:
+        if left[2]:
+            self.path.append(('right', right[1]))
+        elif right[2]:
+            self.path.append(('left', left[1]))
+        return left[0] + 1, node_hash(left[1], right[1]), left[2] or right[2]
+
+    def root(self) -> Optional[bytes]:
+        """Merkle root (call once, after the last leaf; None if there are no leaves)"""
+        if not self._stack:
+            return None
+        # Fold the remaining subtrees right to left; smaller ones are promoted
+        node = self._stack[-1]
+        for left in reversed(self._stack[:-1]):
+            node = self._merge(left, node)
+        self._stack = [node]
+        return node[1]
+
+def merkle_root(leaves: Iterable[bytes]) -> Optional[bytes]:
+    """Merkle root of a sequence of leaf hashes"""
+    builder = MerkleBuilder()
+    for leaf in leaves:
+        builder.add(leaf)
+    return builder.root()
+
+def inclusion_proof(leaves: Iterable[bytes], index: int) -> Tuple[Optional[bytes], List[Dict[str, str]]]:
+    """
+    Inclusion path of one leaf
+
+    Args:
+        leaves: All leaf hashes in order
+        index: Position of the leaf to prove
+
+    Returns:
+        Tuple: (root, path as [{'side': 'left'|'right', 'hash': hex}, ...])
+    """
+    builder = MerkleBuilder(target=index)
+    for leaf in leaves:
+        builder.add(leaf)
+    if index < 0 or index >= builder.count:
+        raise IndexError(f"Leaf index {index} out of range")
+    root = builder.root()
+    return root, [{'side': side, 'hash': h.hex()} for side, h in builder.path]
+
+def verify_inclusion(leaf: bytes, path: List[Dict[str, str]], root: bytes) -> bool:
+    """
+    Check an inclusion path against a Merkle root
+
+    Args:
+        leaf: Leaf hash
+        path: Path returned by inclusion_proof
+        root: Expected root
+
+    Returns:
+        bool: True if the leaf is committed to by the root
+    """
+    node = leaf
+    for step in path:
+        sibling = bytes.fromhex(step['hash'])
+        if step['side'] == 'left':
+            node = node_hash(sibling, node)
+        elif step['side'] == 'right':
+            node = node_hash(node, sibling)
+        else:
+            return False
+    return node == root
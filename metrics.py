@@ -0,0 +1,221 @@
+"""
+Metrics - Lightweight counters, histograms and stage timers
+Rendered in the Prometheus text exposition format (no client library needed)
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; the last bucket (+Inf) is implicit
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+class Counter:
+    """Monotonic counter, optionally split by label values"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+class Histogram:
+    """Cumulative-bucket histogram (count and sum per label set)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            row[index] += 1
+            row[-1] += value
+
+    def time(self, *labels: str) -> 'Timer':
+        """Context manager observing the duration of its block"""
+        return Timer(self, labels)
+
+    def count(self, *labels: str) -> int:
+        with self._lock:
+            row = self._values.get(labels)
+            return int(sum(row[:-1])) if row else 0
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        with self._lock:
+            items = [(labels, list(row)) for labels, row in self._values.items()]
+        for labels, row in items:
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (float('inf'),), row[:-1]):
+                cumulative += bucket
+                le = 'le="' + _format_value(bound) + '"'
+                yield self.name + '_bucket', _format_labels(self.labelnames, labels, le), cumulative
+            yield self.name + '_sum', _format_labels(self.labelnames, labels), row[-1]
+            yield self.name + '_count', _format_labels(self.labelnames, labels), cumulative
+
+class CallbackMetric:
+    """
+    Metric read at scrape time from a function returning {label values: value}
+
+    Used for counters that already exist elsewhere (cache stats, ticket
+    store), so the hot path pays nothing for them.
+    """
+
+    def __init__(self, name: str, help: str, fn: Callable[[], Dict[Tuple[str, ...], float]],
+                 labelnames: Sequence[str] = (), kind: str = 'gauge'):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        for labels, value in self.fn().items():
+            if value is not None:
+                yield self.name, _format_labels(self.labelnames, labels), value
+
+class Timer:
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram: Histogram, labels: Tuple[str, ...]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> 'Timer':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        return False
+
+class Registry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: List[object] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def callback(self, name: str, help: str, fn: Callable[[], Dict[Tuple[str, ...], float]],
+                 labelnames: Sequence[str] = (), kind: str = 'gauge') -> CallbackMetric:
+        return self.register(CallbackMetric(name, help, fn, labelnames, kind))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            try:
+                samples = list(metric.samples())
+            except Exception as e:
+                lines.append(f'# {metric.name} unavailable: {_escape(str(e))}')
+                continue
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in samples:
+                lines.append(f'{name}{labels} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+registry = Registry()
+
+# Per-stage timings of draws and verifications. The app marks the operation
+# (operation('draw')); code below it records stages with stage('score').
+# Outside an operation stage() is a shared no-op, so library callers pay
+# one thread-local lookup.
+STAGE_SECONDS = registry.histogram(
+    'lottery_stage_duration_seconds', 'Time spent in each stage of an operation', ('operation', 'stage')
+)
+
+_local = threading.local()
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+_NO_STAGE = _NoStage()
+
+class operation:
+    """Marks the current thread as running an operation (e.g. 'draw') for stage()"""
+
+    __slots__ = ('name', 'previous')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> 'operation':
+        self.previous = getattr(_local, 'operation', None)
+        _local.operation = self.name
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        _local.operation = self.previous
+        return False
+
+def stage(name: str):
+    """Time a stage of the current operation (no-op outside one)"""
+    op: Optional[str] = getattr(_local, 'operation', None)
+    if op is None:
+        return _NO_STAGE
+    return Timer(STAGE_SECONDS, (op, name))
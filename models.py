@@ -4,8 +4,10 @@ Database models for BTC Lottery
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import Column, Integer, String, DateTime, JSON, Float
+from ticket_ranges import TicketRanges
 
-db = SQLAlchemy()
+# Rows are handed out after commit (draw history), so don't expire them
+db = SQLAlchemy(session_options={'expire_on_commit': False})
 
 class Ticket(db.Model):
     """Ticket model"""
@@ -23,24 +25,51 @@ class Ticket(db.Model):
             'active': self.active == 1
         }
 
+def block_key(block_heights) -> str:
+    """Canonical key of the blocks used by a draw (indexed for duplicate detection)"""
+    return ','.join(str(int(h)) for h in block_heights)
+
 class LotteryDraw(db.Model):
     """Lottery draw history"""
     __tablename__ = 'lottery_draws'
     
     id = Column(Integer, primary_key=True)
     draw_id = Column(String(64), unique=True, nullable=False)
-    winner_ticket = Column(Integer, nullable=False)
+    winner_ticket = Column(String(20), nullable=False)  # tickets are uint64, wider than SQLite INTEGER
     seed_hex = Column(String(128), nullable=False)
     block_hashes = Column(JSON, nullable=False)
     block_heights = Column(JSON, nullable=False)
+    block_key = Column(String(255), index=True, nullable=False)
     scores = Column(JSON, nullable=False)
-    tickets_used = Column(JSON, nullable=False)
+    tickets_used = Column(JSON, nullable=False)  # list, or TicketRanges.to_dict() for range-encoded draws
+    ticket_count = Column(Integer, default=0)
+    proof = Column(JSON)
     created_at = Column(DateTime, default=datetime.utcnow)
     
+    def ticket_set(self):
+        """Tickets of the draw: a list, or TicketRanges if they were range-encoded"""
+        if isinstance(self.tickets_used, dict):
+            return TicketRanges.from_dict(self.tickets_used)
+        return self.tickets_used
+    
+    def to_summary(self):
+        """Draw without per-ticket data (for history listings)"""
+        return {
+            'id': self.id,
+            'draw_id': self.draw_id,
+            'winner': int(self.winner_ticket),
+            'seed': self.seed_hex,
+            'block_hashes': self.block_hashes,
+            'block_heights': self.block_heights,
+            'ticket_count': self.ticket_count,
+            'proof': self.proof,
+            'timestamp': self.created_at.isoformat() if self.created_at else None
+        }
+    
     def to_dict(self):
         return {
             'draw_id': self.draw_id,
-            'winner': self.winner_ticket,
+            'winner': int(self.winner_ticket),
             'seed': self.seed_hex,
             'block_hashes': self.block_hashes,
             'block_heights': self.block_heights,
@@ -0,0 +1,185 @@
+"""
+Rate Limit - Token buckets shared by all worker processes on a host
+Fixed-size hash table in a memory-mapped file, cost-weighted hits, bounded eviction
+"""
+import hashlib
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, NamedTuple, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: locking is per process only
+    fcntl = None
+
+# File header: magic, version, number of slots
+FILE_HEADER = struct.Struct('<4sHxxQ')
+FILE_MAGIC = b'RLIM'
+FILE_VERSION = 1
+
+# Slot: key hash (0 - free), tokens left, time of the last update
+SLOT = struct.Struct('<Qdd')
+
+# Slots probed for a key before the least recently used one is evicted
+PROBE_WINDOW = 8
+
+_PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+class Rate(NamedTuple):
+    """``limit`` tokens per ``period`` seconds (bucket capacity and refill rate)"""
+    limit: float
+    period: float
+
+    @property
+    def per_second(self) -> float:
+        return self.limit / self.period
+
+def parse_rate(value: str) -> Rate:
+    """
+    Parse a rate such as "100/hour", "10 per minute" or "5/2 seconds"
+
+    Raises:
+        ValueError: On any other format
+    """
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*(?:/|per)\s*(\d+)?\s*(second|minute|hour|day)s?\s*',
+                         value.lower())
+    if not match or float(match.group(1)) <= 0:
+        raise ValueError(f"Invalid rate: {value!r}")
+    return Rate(float(match.group(1)), int(match.group(2) or 1) * _PERIODS[match.group(3)])
+
+def parse_rates(value: str) -> Dict[str, Rate]:
+    """Per-endpoint rates from "endpoint=rate;endpoint=rate" (see parse_rate)"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(';'))):
+        name, sep, rate = item.partition('=')
+        if not sep:
+            raise ValueError(f"Invalid endpoint rate: {item!r}")
+        rates[name.strip()] = parse_rate(rate)
+    return rates
+
+class Decision(NamedTuple):
+    allowed: bool
+    remaining: float
+    retry_after: float  # seconds until the request would be allowed (0 if it was, inf if never)
+
+    @property
+    def too_large(self) -> bool:
+        """The request costs more than the bucket holds, so it can never pass"""
+        return math.isinf(self.retry_after)
+
+class RateLimiter:
+    """
+    Token buckets keyed by strings (e.g. "client|endpoint")
+
+    State is a fixed table of ``slots`` 24-byte slots in a memory-mapped
+    file, so every worker process that opens the same file shares the
+    same buckets, and memory stays ``slots * 24`` bytes however many
+    clients there are. A key hashes to a slot and is looked for in the
+    next PROBE_WINDOW slots; when none is free, the least recently used
+    slot of the window is taken over. An evicted client starts again with
+    a full bucket, so the table should be larger than the number of
+    clients active within one period.
+
+    Each hit refills the bucket for the time since its last update, then
+    takes ``cost`` tokens. A cost above the bucket capacity is refused
+    outright (``Decision.too_large``), without touching the bucket.
+    Without a path the table lives in anonymous memory (this process only).
+    """
+
+    def __init__(self, path: Optional[str] = None, slots: int = 65536,
+                 clock: Callable[[], float] = time.time):
+        self.path = path
+        self.slots = max(slots, PROBE_WINDOW)
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._fd = -1
+        size = FILE_HEADER.size + self.slots * SLOT.size
+        if not path:
+            self._mmap = mmap.mmap(-1, size)
+            FILE_HEADER.pack_into(self._mmap, 0, FILE_MAGIC, FILE_VERSION, self.slots)
+            return
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._exclusive():
+            header = os.pread(self._fd, FILE_HEADER.size, 0)
+            if (len(header) < FILE_HEADER.size or FILE_HEADER.unpack(header) != (FILE_MAGIC, FILE_VERSION, self.slots)
+                    or os.fstat(self._fd).st_size != size):
+                # New file, or one laid out differently: buckets are transient, start empty
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, self.slots), 0)
+            self._mmap = mmap.mmap(self._fd, size)
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        with self._lock:
+            if self._fd >= 0 and fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if self._fd >= 0 and fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        with self._lock:
+            self._mmap.close()
+            if self._fd >= 0:
+                os.close(self._fd)
+                self._fd = -1
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+
+    def _find(self, key_hash: int) -> Tuple[int, bool]:
+        """Offset of the key's slot, and whether it already holds the key (caller holds the lock)"""
+        m = self._mmap
+        start = key_hash % self.slots
+        victim, oldest = None, None
+        for probe in range(PROBE_WINDOW):
+            offset = FILE_HEADER.size + (start + probe) % self.slots * SLOT.size
+            slot_key, _, updated = SLOT.unpack_from(m, offset)
+            if slot_key == key_hash:
+                return offset, True
+            if slot_key == 0:
+                return offset, False
+            if oldest is None or updated < oldest:
+                victim, oldest = offset, updated
+        return victim, False
+
+    def hit(self, key: str, rate: Rate, cost: float = 1) -> Decision:
+        """Take ``cost`` tokens from the key's bucket if it has them"""
+        cost = max(cost, 0)
+        if cost > rate.limit:
+            return Decision(False, self.peek(key, rate), math.inf)
+        key_hash = self._hash(key)
+        with self._exclusive():
+            now = self.clock()
+            offset, found = self._find(key_hash)
+            tokens = rate.limit
+            if found:
+                _, tokens, updated = SLOT.unpack_from(self._mmap, offset)
+                tokens = min(rate.limit, tokens + max(now - updated, 0) * rate.per_second)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            SLOT.pack_into(self._mmap, offset, key_hash, tokens, now)
+        retry_after = 0.0 if allowed else (cost - tokens) / rate.per_second
+        return Decision(allowed, tokens, retry_after)
+
+    def peek(self, key: str, rate: Rate) -> float:
+        """Tokens the key's bucket holds now (without taking any)"""
+        key_hash = self._hash(key)
+        with self._exclusive():
+            offset, found = self._find(key_hash)
+            if not found:
+                return rate.limit
+            _, tokens, updated = SLOT.unpack_from(self._mmap, offset)
+            return min(rate.limit, tokens + max(self.clock() - updated, 0) * rate.per_second)
@@ -0,0 +1,128 @@
+"""
+Result Cache - Content-addressed cache of draw results
+Keyed by (seed, ticket-set fingerprint); in-process LRU in front of an optional SQLite map
+"""
+import json
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# (winner, scores {ticket: int} or None, proof without the ticket list)
+Entry = Tuple[Optional[str], Optional[Dict[str, int]], Dict[str, Any]]
+
+class ResultCache:
+    """
+    Cache of pick_winner results
+
+    The result of a draw depends only on the seed and the ordered ticket
+    list, so entries are keyed by the seed and the ticket-set digest (see
+    lottery_core.TicketSetDigest). Entries are evicted least recently used
+    first once there are more than ``capacity`` of them or they hold the
+    scores of more than ``max_tickets`` tickets in total. If a path is
+    given, entries are also written to a SQLite file (zlib-compressed JSON)
+    and survive restarts.
+
+    Ticket lists are not stored: the caller already has them.
+    """
+
+    def __init__(self, path: Optional[str] = None, capacity: int = 256, max_tickets: int = 2_000_000):
+        self.path = path
+        self.capacity = capacity
+        self.max_tickets = max_tickets
+        self._memory: 'OrderedDict[str, Tuple[Entry, int]]' = OrderedDict()
+        self._weight = 0
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.stats: Dict[str, int] = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+        }
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS draw_results (key TEXT PRIMARY KEY, entry BLOB NOT NULL)'
+            )
+            self._db.commit()
+
+    @staticmethod
+    def key(seed_hex: str, ticket_set: Dict[str, Any]) -> str:
+        """Cache key for a seed and a ticket-set digest ({'count', 'digest'})"""
+        return f"{seed_hex.lower()}:{ticket_set['count']}:{ticket_set['digest']}"
+
+    def _remember(self, key: str, entry: Entry, count: int) -> None:
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._weight -= old[1]
+        # Entries with per-ticket scores grow with the ticket count, winner-only ones don't
+        weight = count if entry[1] is not None else 1
+        self._memory[key] = (entry, weight)
+        self._weight += weight
+        while self._memory and (len(self._memory) > self.capacity or self._weight > self.max_tickets):
+            _, (_, evicted) = self._memory.popitem(last=False)
+            self._weight -= evicted
+            self.stats['evictions'] += 1
+
+    def get(self, key: str, with_scores: bool = False) -> Optional[Entry]:
+        """
+        Return a cached entry, or None
+
+        Args:
+            key: Cache key (see key())
+            with_scores: Only accept entries that have per-ticket scores
+        """
+        with self._lock:
+            item = self._memory.get(key)
+            if item is not None and (item[0][1] is not None or not with_scores):
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return item[0]
+
+            if self._db is not None:
+                row = self._db.execute('SELECT entry FROM draw_results WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    data = json.loads(zlib.decompress(row[0]))
+                    proof = data['proof']
+                    scores = None
+                    if 'scores' in proof:
+                        scores = {k: int(v) for k, v in proof['scores'].items()}
+                    if scores is not None or not with_scores:
+                        entry = (data['winner'], scores, proof)
+                        self._remember(key, entry, data['count'])
+                        self.stats['disk_hits'] += 1
+                        return entry
+
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, key: str, entry: Entry, count: int) -> None:
+        """Store an entry for a draw over count tickets"""
+        # A winner-only entry never replaces one with scores (same draw, less data)
+        light = entry[1] is None
+        with self._lock:
+            current = self._memory.get(key)
+            if not (light and current is not None and current[0][1] is not None):
+                self._remember(key, entry, count)
+            if self._db is not None:
+                blob = zlib.compress(json.dumps({'winner': entry[0], 'count': count, 'proof': entry[2]}).encode())
+                verb = 'INSERT OR IGNORE' if light else 'INSERT OR REPLACE'
+                self._db.execute(f'{verb} INTO draw_results (key, entry) VALUES (?, ?)', (key, blob))
+                self._db.commit()
+            self.stats['stores'] += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats['memory_entries'] = len(self._memory)
+            stats['memory_tickets'] = self._weight
+            return stats
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,226 @@
+"""
+Score Analytics - Columnar score matrix for auditing draws
+Ranks, percentiles, histograms and uniformity statistics over all ticket scores (requires NumPy)
+"""
+import math
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+from lottery_core import _score_base, _tie_breaker_digest, normalize_ticket_number
+
+def is_available() -> bool:
+    """True if NumPy is installed"""
+    return np is not None
+
+class ScoreMatrix:
+    """
+    Score digests of a draw as four uint64 columns
+
+    Row i is SHA256(seed + ":" + ticket_i), the same digest compute_score
+    turns into an int, split into four big-endian 8-byte words; comparing
+    rows word by word is comparing scores. Tickets are stored as uint64
+    (the ticket store's range), sorted and deduplicated like the scores
+    dict of pick_winner. Memory is 32 bytes per ticket for scores plus 8
+    for the ticket, and 16 more once ranks are computed.
+    """
+
+    def __init__(self, seed_hex: str, tickets: Iterable[Union[str, int]]):
+        if np is None:
+            raise RuntimeError("NumPy is required for score analytics (pip install numpy)")
+        self.seed_hex = seed_hex
+        base = _score_base(bytes.fromhex(seed_hex))
+        copy = base.copy
+        digests = bytearray()
+        numbers = array('Q')
+        for ticket in tickets:
+            t_norm = normalize_ticket_number(ticket)
+            h = copy()
+            h.update(t_norm.encode())
+            digests += h.digest()
+            numbers.append(int(t_norm))
+
+        # Sorted by ticket for lookups; duplicates keep their first row
+        tickets = np.frombuffer(numbers, dtype=np.uint64)
+        self.tickets, first = np.unique(tickets, return_index=True)
+        del numbers, tickets
+        self.columns = np.frombuffer(digests, dtype='>u8').reshape(-1, 4)[first].astype(np.uint64)
+        del digests
+        self._base = base
+        self._order: Optional['np.ndarray'] = None
+        self._ranks: Optional['np.ndarray'] = None
+
+    def __len__(self) -> int:
+        return len(self.tickets)
+
+    @property
+    def digests(self) -> 'np.ndarray':
+        """Raw score digests as an (n, 32) uint8 array (built on demand)"""
+        return self.columns.astype('>u8').view(np.uint8).reshape(-1, 32)
+
+    @property
+    def nbytes(self) -> int:
+        total = self.columns.nbytes + self.tickets.nbytes
+        if self._ranks is not None:
+            total += self._ranks.nbytes + self._order.nbytes
+        return total
+
+    def order(self) -> 'np.ndarray':
+        """Row indices sorted by (score, tie_breaker), best first"""
+        if self._order is None:
+            c = self.columns
+            # The top word almost always decides; fall back to all four words on a collision
+            order = np.argsort(c[:, 0])
+            top = c[order, 0]
+            if len(top) > 1 and (top[1:] == top[:-1]).any():
+                order = np.lexsort((c[:, 3], c[:, 2], c[:, 1], c[:, 0]))
+            self._order = self._break_ties(order)
+        return self._order
+
+    def _break_ties(self, order: 'np.ndarray') -> 'np.ndarray':
+        # Equal scores (never seen in practice) are ordered by tie_breaker, as in pick_winner
+        if len(order) < 2:
+            return order
+        sorted_cols = self.columns[order]
+        equal = np.all(sorted_cols[1:] == sorted_cols[:-1], axis=1)
+        if not equal.any():
+            return order
+        order = order.copy()
+        start = None
+        for i, same in enumerate(np.append(equal, False)):
+            if same and start is None:
+                start = i
+            elif not same and start is not None:
+                group = order[start:i + 1]
+                order[start:i + 1] = sorted(group, key=lambda row: _tie_breaker_digest(
+                    self._base, str(int(self.tickets[row])).encode()))
+                start = None
+        return order
+
+    def ranks(self) -> 'np.ndarray':
+        """1-based place of every row (1 - winner)"""
+        if self._ranks is None:
+            order = self.order()
+            ranks = np.empty(len(order), dtype=np.int64)
+            ranks[order] = np.arange(1, len(order) + 1)
+            self._ranks = ranks
+        return self._ranks
+
+    def _row(self, ticket: Union[str, int]) -> Optional[int]:
+        number = int(normalize_ticket_number(ticket))
+        if not 0 <= number < 2 ** 64:
+            return None
+        i = int(np.searchsorted(self.tickets, np.uint64(number)))
+        if i < len(self.tickets) and int(self.tickets[i]) == number:
+            return i
+        return None
+
+    def rank_of(self, ticket: Union[str, int]) -> Optional[int]:
+        """
+        1-based place of a ticket, or None if it is not in the draw
+
+        Uses the ranks if they are already computed, otherwise counts the
+        better rows with one vectorised comparison (no sort).
+        """
+        row = self._row(ticket)
+        if row is None:
+            return None
+        if self._ranks is not None:
+            return int(self._ranks[row])
+        c = self.columns
+        x = c[row]
+        better = np.zeros(len(self), dtype=bool)
+        equal = np.ones(len(self), dtype=bool)
+        for j in range(4):
+            better |= equal & (c[:, j] < x[j])
+            equal &= c[:, j] == x[j]
+        rank = int(better.sum()) + 1
+        if int(equal.sum()) > 1:
+            rank = int(self.ranks()[row])
+        return rank
+
+    def percentile(self, ticket: Union[str, int]) -> Optional[float]:
+        """Share of tickets (in %) with a worse score than this one"""
+        rank = self.rank_of(ticket)
+        if rank is None:
+            return None
+        return 100.0 * (len(self) - rank) / len(self)
+
+    def top(self, k: int) -> List[str]:
+        """Tickets of the first k places (same as lottery_core.pick_winners)"""
+        return [str(int(t)) for t in self.tickets[self.order()[:k]]]
+
+    def fractions(self) -> 'np.ndarray':
+        """Scores scaled to [0, 1) by their top 64 bits"""
+        return self.columns[:, 0] / float(2 ** 64)
+
+    def histogram(self, bins: int = 16) -> Dict[str, Any]:
+        """Counts of scores in equal-width bins over [0, 1)"""
+        counts, edges = np.histogram(self.fractions(), bins=bins, range=(0.0, 1.0))
+        return {'bins': bins, 'counts': counts.tolist(), 'edges': edges.tolist()}
+
+    def uniformity(self, bins: int = 16) -> Dict[str, Any]:
+        """
+        Goodness of fit of the scores to the uniform distribution
+
+        Returns:
+            Dict: chi-squared statistic over ``bins`` bins with its p-value
+            (Wilson-Hilferty approximation) and the Kolmogorov-Smirnov
+            statistic with its asymptotic p-value
+        """
+        n = len(self)
+        if n == 0:
+            return {'count': 0}
+        u = self.fractions()
+        counts, _ = np.histogram(u, bins=bins, range=(0.0, 1.0))
+        expected = n / bins
+        chi2 = float(((counts - expected) ** 2).sum() / expected)
+        df = bins - 1
+
+        u_sorted = np.sort(u)
+        i = np.arange(1, n + 1)
+        ks = float(max((i / n - u_sorted).max(), (u_sorted - (i - 1) / n).max()))
+
+        return {
+            'count': n,
+            'chi2': chi2,
+            'df': df,
+            'chi2_p_value': _chi2_sf(chi2, df),
+            'ks': ks,
+            'ks_p_value': _ks_sf(ks, n),
+            'mean': float(u.mean()),
+            'std': float(u.std()),
+            'expected_mean': 0.5,
+            'expected_std': 1 / math.sqrt(12)
+        }
+
+    def summary(self, bins: int = 16) -> Dict[str, Any]:
+        """Winner, memory use, histogram and uniformity statistics"""
+        winner = self.top(1)
+        return {
+            'seed_hex': self.seed_hex,
+            'count': len(self),
+            'winner': winner[0] if winner else None,
+            'bytes_per_ticket': round(self.nbytes / len(self), 1) if len(self) else None,
+            'histogram': self.histogram(bins),
+            'uniformity': self.uniformity(bins)
+        }
+
+def _chi2_sf(x: float, df: int) -> float:
+    """P(X >= x) for chi-squared with df degrees of freedom (Wilson-Hilferty)"""
+    if df <= 0:
+        return 1.0
+    z = ((x / df) ** (1 / 3) - (1 - 2 / (9 * df))) / math.sqrt(2 / (9 * df))
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+def _ks_sf(d: float, n: int) -> float:
+    """Asymptotic P(D >= d) of the one-sample Kolmogorov-Smirnov statistic"""
+    t = (math.sqrt(n) + 0.12 + 0.11 / math.sqrt(n)) * d
+    if t < 0.2:
+        return 1.0
+    total = sum((-1) ** (j - 1) * math.exp(-2 * j * j * t * t) for j in range(1, 101))
+    return max(0.0, min(1.0, 2 * total))
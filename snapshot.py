@@ -0,0 +1,78 @@
+"""
+Snapshot - Prebuilt read-only files for cold starts
+Ticket set and block hashes in memory-mappable form, built ahead of a (serverless) deployment
+
+Usage:
+    python snapshot.py tickets                            # ticket store -> tickets.snap
+    python snapshot.py tickets --json tickets.json        # legacy JSON file -> tickets.snap
+    python snapshot.py blocks                             # block cache (+ header store) -> blocks.snap
+
+Deploy the files and set TICKETS_SNAPSHOT / BLOCK_CACHE_SNAPSHOT to their paths.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from typing import Iterator, List, Optional, Tuple
+
+from block_cache import write_block_snapshot
+from config import Config
+from ticket_store import TicketStore, validate_ticket, write_snapshot
+
+def _cached_blocks(path: str) -> Iterator[Tuple[int, str]]:
+    """Blocks of a block cache SQLite file (only confirmed blocks are ever stored there)"""
+    db = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        yield from db.execute('SELECT height, hash FROM block_hashes')
+    finally:
+        db.close()
+
+def _stored_blocks(path: str, from_height: int) -> Iterator[Tuple[int, str]]:
+    """Blocks of a header store from ``from_height`` up to its tip"""
+    from header_store import HeaderStore
+
+    with HeaderStore(path) as store:
+        if store.tip_height is None:
+            return
+        for height in range(max(from_height, store.first_height), store.tip_height + 1):
+            yield height, store.block_hash(height)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    commands = parser.add_subparsers(dest='command', required=True)
+    tickets = commands.add_parser('tickets', help='snapshot of the ticket set')
+    tickets.add_argument('--store', default=Config.TICKETS_STORE, help='ticket store file')
+    tickets.add_argument('--json', help='legacy {"tickets": [...]} file instead of the store')
+    tickets.add_argument('--out', default='tickets.snap', help='snapshot file')
+    blocks = commands.add_parser('blocks', help='snapshot of confirmed block hashes')
+    blocks.add_argument('--cache', default=Config.BLOCK_CACHE_FILE, help='block cache SQLite file')
+    blocks.add_argument('--headers', help='also take the hashes of a header store')
+    blocks.add_argument('--from-height', type=int, default=0, help='lowest header store height to include')
+    blocks.add_argument('--out', default='blocks.snap', help='snapshot file')
+    args = parser.parse_args(argv)
+
+    if args.command == 'tickets':
+        if args.json:
+            with open(args.json) as f:
+                values = sorted({validate_ticket(t) for t in json.load(f).get('tickets', [])})
+            count = write_snapshot(args.out, values)
+        else:
+            with TicketStore(args.store) as store:
+                count = write_snapshot(args.out, store)
+        print(f"Wrote {count} tickets to {args.out}")
+        return 0
+
+    sources = []
+    if args.cache and os.path.exists(args.cache):
+        sources.append(_cached_blocks(args.cache))
+    if args.headers:
+        sources.append(_stored_blocks(args.headers, args.from_height))
+    if not sources:
+        parser.error('no block source: the block cache file does not exist and --headers is not given')
+    count = write_block_snapshot(args.out, (block for source in sources for block in source))
+    print(f"Wrote {count} block hashes to {args.out}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
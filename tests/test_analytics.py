@@ -0,0 +1,54 @@
+"""
+Unit tests for the NumPy score matrix (skipped if NumPy is not installed)
+"""
+import unittest
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lottery_core import generate_seed, compute_score, tie_breaker, pick_winner, pick_winners
+import score_analytics
+from score_analytics import ScoreMatrix
+
+@unittest.skipUnless(score_analytics.is_available(), "NumPy is not installed")
+class TestScoreMatrix(unittest.TestCase):
+    def setUp(self):
+        self.seed_hex = generate_seed(['s', 'e', 'e', 'd']).hex()
+        self.tickets = list(range(1000, 3000, 3)) + ['01000', 1003]
+        self.matrix = ScoreMatrix(self.seed_hex, self.tickets)
+
+    def test_ranks_match_scores(self):
+        seed = bytes.fromhex(self.seed_hex)
+        unique = sorted({int(t) for t in self.tickets})
+        expected = sorted((compute_score(seed, str(t)), tie_breaker(seed, str(t)), str(t)) for t in unique)
+        self.assertEqual(len(self.matrix), len(unique))
+        self.assertEqual(self.matrix.top(len(unique)), [t for _, _, t in expected])
+        self.assertEqual(self.matrix.top(5), pick_winners(self.seed_hex, self.tickets, 5)[0])
+        self.assertEqual(self.matrix.top(1)[0], pick_winner(self.seed_hex, self.tickets)[0])
+
+        digest = self.matrix.digests[0].tobytes()
+        self.assertEqual(int.from_bytes(digest, 'big'), compute_score(seed, str(unique[0])))
+
+    def test_rank_lookup(self):
+        order = self.matrix.top(len(self.matrix))
+        for place in (1, 2, 17, len(order)):
+            ticket = order[place - 1]
+            self.assertEqual(self.matrix.rank_of(ticket), place)
+        self.assertEqual(self.matrix.percentile(order[0]), 100.0 * (len(order) - 1) / len(order))
+        self.assertIsNone(self.matrix.rank_of(1001))
+        self.assertIsNone(self.matrix.rank_of(2 ** 70))
+        # Same answers once the full ranking is cached
+        self.matrix.ranks()
+        self.assertEqual(self.matrix.rank_of(order[16]), 17)
+
+    def test_statistics(self):
+        summary = self.matrix.summary(bins=8)
+        self.assertEqual(sum(summary['histogram']['counts']), len(self.matrix))
+        uniformity = summary['uniformity']
+        self.assertEqual(uniformity['df'], 7)
+        self.assertGreater(uniformity['chi2_p_value'], 0.001)
+        self.assertGreater(uniformity['ks_p_value'], 0.001)
+        self.assertLessEqual(self.matrix.nbytes / len(self.matrix), 40)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,215 @@
+"""
+Tests for the Flask API through the test client (lazy mode, Bitcoin API stubbed)
+"""
+import unittest
+import json
+import shutil
+import subprocess
+import tempfile
+import time
+import sys
+import os
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import Config
+
+def app_config(directory):
+    """Config overrides pointing every file the app opens into ``directory``"""
+    return {
+        'DATABASE_URL': 'sqlite:///' + os.path.join(directory, 'lottery.db'),
+        'TICKETS_STORE': os.path.join(directory, 'tickets.u64'),
+        'TICKETS_FILE': os.path.join(directory, 'tickets.json'),
+        'JOBS_FILE': os.path.join(directory, 'jobs.db'),
+        'BLOCK_CACHE_FILE': '',
+        'RESULT_CACHE_FILE': '',
+        'RATELIMIT_ENABLED': False,
+        'TIP_POLL_INTERVAL': 0,
+        'JOB_WORKERS': 1,
+        'JOB_POLL_INTERVAL': 0.05,
+        'LAZY_INIT': True,
+    }
+
+# Config is read by app at import; point every file it opens at a temporary directory
+TMP = tempfile.mkdtemp()
+for name, value in app_config(TMP).items():
+    setattr(Config, name, value)
+
+import app as app_module
+
+# Imports the app afresh and reports what /health and /metrics left initialised
+COLD_START = """
+import json, sys
+sys.path.insert(0, {root!r})
+from config import Config
+for name, value in {config!r}.items():
+    setattr(Config, name, value)
+import app
+client = app.app.test_client()
+health = client.get('/health').get_json()
+print(json.dumps({{
+    'jobs': health['jobs'],
+    'tickets_count': health['tickets_count'],
+    'metrics_status': client.get('/metrics').status_code,
+    'loaded': [app.draw_jobs.loaded, app.draw_history.loaded, app.ticket_store_loaded()],
+}}))
+"""
+
+def stub_block_hashes(draw_block_height=None, count=3):
+    top = 800_000 if draw_block_height is None else draw_block_height
+    chain = [top - i for i in range(count)]
+    return [f'{h:064x}' for h in chain], chain
+
+def tearDownModule():
+    if app_module.draw_history.loaded:
+        app_module.draw_history.flush()
+    shutil.rmtree(TMP, ignore_errors=True)
+
+class TestColdStart(unittest.TestCase):
+    def test_health_and_metrics_do_not_initialise(self):
+        # In a fresh process: the other tests have built everything in this one
+        directory = tempfile.mkdtemp()
+        try:
+            code = COLD_START.format(root=ROOT, config=app_config(directory))
+            output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                    timeout=60, cwd=directory)
+            self.assertEqual(output.returncode, 0, output.stderr)
+            state = json.loads(output.stdout.strip().splitlines()[-1])
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        self.assertIsNone(state['jobs'])
+        self.assertIsNone(state['tickets_count'])
+        self.assertEqual(state['metrics_status'], 200)
+        self.assertEqual(state['loaded'], [False, False, False])
+
+class TestApi(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        app_module.get_block_hashes_for_draw = stub_block_hashes
+        cls.client = app_module.app.test_client()
+
+    def draw(self, **body):
+        response = self.client.post('/api/lottery/draw', json=dict({'tickets': list(range(1, 51))}, **body))
+        self.assertIn(response.status_code, (200, 202), response.get_data(as_text=True))
+        return response.get_json()
+
+    def test_draw_proof_and_analytics(self):
+        draw_id = self.draw(proof='compact', block_height=700_000)['result']['draw_id']
+
+        response = self.client.get(f'/api/lottery/draws/{draw_id}/proof/7')
+        self.assertEqual(response.status_code, 200, response.get_data(as_text=True))
+        self.assertEqual(response.get_json()['proof']['ticket'], '7')
+        self.assertEqual(self.client.get(f'/api/lottery/draws/{draw_id}/proof/999').status_code, 404)
+
+        import score_analytics
+        response = self.client.get(f'/api/lottery/draws/{draw_id}/analytics?ticket=7')
+        self.assertEqual(response.status_code, 200 if score_analytics.is_available() else 501)
+        self.assertEqual(self.client.get('/api/lottery/draws/missing/analytics').status_code,
+                         404 if score_analytics.is_available() else 501)
+
+    def test_async_draw_job(self):
+        job_id = self.draw(block_height=710_000, include_scores=False, **{'async': True})['job_id']
+
+        response = self.client.get(f'/api/lottery/jobs/{job_id}')
+        self.assertEqual(response.status_code, 200, response.get_data(as_text=True))
+        self.assertIn(response.get_json()['job']['status'], ('queued', 'running', 'done'))
+
+        deadline = time.monotonic() + 10
+        while True:
+            response = self.client.get(f'/api/lottery/jobs/{job_id}/result')
+            if response.status_code != 202 or time.monotonic() > deadline:
+                break
+            time.sleep(0.05)
+        self.assertEqual(response.status_code, 200, response.get_data(as_text=True))
+        self.assertIn(int(response.get_json()['result']['winner']), range(1, 51))
+        self.assertEqual(self.client.get('/api/lottery/jobs/missing').status_code, 404)
+        self.assertEqual(self.client.get('/api/lottery/jobs/missing/result').status_code, 404)
+
+    def test_ticket_range_limits(self):
+        whole = {'ticket_ranges': {'ranges': [[0, 2 ** 64 - 1]]}}
+        for body in (whole, dict(whole, include_scores=False), dict(whole, **{'async': True})):
+            self.assertEqual(self.client.post('/api/lottery/draw', json=body).status_code, 400)
+        verify = dict(whole, seed_hex='22' * 32, claimed_winner=1)
+        self.assertEqual(self.client.post('/api/lottery/verify', json=verify).status_code, 400)
+
+        saved = Config.TICKET_RANGES_MAX_EXPANDED
+        Config.TICKET_RANGES_MAX_EXPANDED = 100
+        try:
+            ranges = {'ticket_ranges': {'ranges': [[1, 500]]}, 'block_height': 720_000}
+            response = self.client.post('/api/lottery/draw', json=ranges)
+            self.assertEqual(response.status_code, 200, response.get_data(as_text=True))
+            body = response.get_json()
+            self.assertNotIn('scores', body['result'])
+            self.assertEqual([w['type'] for w in body['warnings']], ['scores_omitted'])
+
+            # Re-verified from history as ranges, without expanding them
+            draw_id = body['result']['draw_id']
+            response = self.client.post('/api/lottery/verify/batch', json={'draw_ids': [draw_id]})
+            verdict = json.loads(response.get_data(as_text=True).splitlines()[0])
+            self.assertTrue(verdict['valid'], verdict)
+            for extra in ({'include_scores': True}, {'stream': True}, {'proof': 'compact'}, {'winners': 3}):
+                response = self.client.post('/api/lottery/draw', json=dict(ranges, **extra))
+                self.assertEqual(response.status_code, 400, extra)
+        finally:
+            Config.TICKET_RANGES_MAX_EXPANDED = saved
+
+    def test_verify_claimed_winners(self):
+        body = {'seed_hex': '11' * 32, 'tickets': list(range(1, 21))}
+        winners = self.client.post('/api/lottery/verify', json=dict(body, claimed_winners=[1, 2])).get_json()
+        calculated = winners['calculated_winners']
+
+        response = self.client.post('/api/lottery/verify',
+                                    json=dict(body, claimed_winners=[f'00{w}' for w in calculated]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.get_json()['valid'])
+
+        for claimed in (5, [], ['x'], list(range(30))):
+            response = self.client.post('/api/lottery/verify', json=dict(body, claimed_winners=claimed))
+            self.assertEqual(response.status_code, 400, claimed)
+
+    def test_ticket_count(self):
+        tickets = list(range(1, 101))
+        inline = {'records': [{'seed_hex': '44' * 32, 'tickets': tickets}]}
+        shared = {'records': [{'seed_hex': '44' * 32, 'ticket_set': 'a'}], 'ticket_sets': {'a': tickets}}
+        self.assertEqual(app_module.ticket_count(inline), 100)
+        self.assertEqual(app_module.ticket_count(shared), 100)
+        self.assertEqual(app_module.ticket_count({'ticket_ranges': {'ranges': [[1, 10]], 'tickets': [20]}}), 11)
+
+    def test_simulation_budget(self):
+        body = {'draws': 11, 'tickets': list(range(1, 101))}
+        with app_module.app.test_request_context('/api/lottery/simulations', method='POST', json=body):
+            self.assertEqual(app_module.request_cost(), 1 + 1100 / Config.RATELIMIT_TICKETS_PER_TOKEN)
+
+        saved = Config.SIMULATION_MAX_SCORES
+        Config.SIMULATION_MAX_SCORES = 1000
+        try:
+            response = self.client.post('/api/lottery/simulations', json=body)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('draws x tickets', response.get_json()['error'])
+        finally:
+            Config.SIMULATION_MAX_SCORES = saved
+
+    def test_rate_limits(self):
+        from rate_limit import RateLimiter, parse_rate
+        saved = app_module.rate_limiter, app_module.DEFAULT_RATE
+        app_module.rate_limiter, app_module.DEFAULT_RATE = RateLimiter(), parse_rate('3/hour')
+        try:
+            # Costs more than the whole bucket: refused for good, bucket untouched
+            big = {'tickets': list(range(1, 3 * Config.RATELIMIT_TICKETS_PER_TOKEN + 1))}
+            response = self.client.post('/api/lottery/verify', json=dict(big, seed_hex='33' * 32))
+            self.assertEqual(response.status_code, 413)
+            self.assertNotIn('Retry-After', response.headers)
+
+            # Job polling has its own bucket, beyond the default limit
+            for _ in range(10):
+                self.assertEqual(self.client.get('/api/lottery/jobs/missing').status_code, 404)
+            for _ in range(3):
+                self.client.get('/api/lottery/draws/missing/proof/1')
+            response = self.client.get('/api/lottery/draws/missing/proof/1')
+            self.assertEqual(response.status_code, 429)
+            self.assertIn('Retry-After', response.headers)
+        finally:
+            app_module.rate_limiter, app_module.DEFAULT_RATE = saved
+
+if __name__ == '__main__':
+    unittest.main()
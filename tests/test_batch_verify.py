@@ -0,0 +1,79 @@
+"""
+Unit tests for batch verification
+"""
+import unittest
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_verify import BatchVerification
+from lottery_core import pick_winner, pick_winners
+from result_cache import ResultCache
+from ticket_ranges import TicketRanges
+
+SEEDS = [f'{i:064x}' for i in range(1, 7)]
+TICKETS = list(range(1, 3001))
+
+def winner(seed_hex, tickets=TICKETS):
+    return pick_winner(seed_hex, tickets, include_scores=False)[0]
+
+class TestBatchVerification(unittest.TestCase):
+    def records(self):
+        records = [{'id': i, 'seed_hex': seed, 'tickets': TICKETS, 'claimed_winner': winner(seed)}
+                   for i, seed in enumerate(SEEDS)]
+        records.append({'seed_hex': SEEDS[0], 'tickets': [str(t) for t in TICKETS], 'claimed_winner': 1})
+        records.append({'seed_hex': SEEDS[1], 'tickets': TICKETS, 'claimed_winners': pick_winners(SEEDS[1], TICKETS, 3)[0]})
+        records.append({'seed_hex': 'not hex', 'tickets': TICKETS, 'claimed_winner': 1})
+        records.append({'draw_id': 'gone', 'error': 'Draw gone not found'})
+        return records
+
+    def check(self, batch):
+        verdicts = {v['index']: v for v in batch}
+        self.assertEqual(sorted(verdicts), list(range(10)))
+        for i in range(6):
+            self.assertTrue(verdicts[i]['valid'])
+            self.assertEqual(verdicts[i]['id'], i)
+        # Same tickets as strings - same ticket set, but a wrong claim
+        self.assertFalse(verdicts[6]['valid'])
+        self.assertEqual(verdicts[6]['calculated_winner'], verdicts[0]['calculated_winner'])
+        self.assertEqual(verdicts[6]['ticket_set'], verdicts[0]['ticket_set'])
+        self.assertTrue(verdicts[7]['valid'])
+        self.assertEqual(len(verdicts[7]['calculated_winners']), 3)
+        self.assertIn('error', verdicts[8])
+        self.assertEqual(verdicts[9], {'index': 9, 'draw_id': 'gone', 'valid': False, 'error': 'Draw gone not found'})
+        self.assertEqual(batch.stats['ticket_sets'], 1)
+        self.assertEqual((batch.stats['valid'], batch.stats['invalid'], batch.stats['errors']), (7, 1, 2))
+        return verdicts
+
+    def test_inline_and_pool_agree(self):
+        inline = self.check(BatchVerification(self.records(), workers=1))
+        pooled = self.check(BatchVerification(self.records(), workers=2, min_parallel=0))
+        self.assertEqual(inline, pooled)
+
+    def test_ticket_ranges_stay_unexpanded(self):
+        ranges = TicketRanges([(1, 3000)])
+        records = [{'seed_hex': SEEDS[0], 'tickets': ranges, 'claimed_winner': winner(SEEDS[0])},
+                   {'seed_hex': SEEDS[1], 'tickets': ranges, 'claimed_winners': pick_winners(SEEDS[1], TICKETS, 2)[0]},
+                   {'seed_hex': SEEDS[2], 'tickets': TICKETS, 'claimed_winner': winner(SEEDS[2])}]
+        for workers, min_parallel in ((1, 0), (2, 0)):
+            batch = BatchVerification(records, workers=workers, min_parallel=min_parallel)
+            verdicts = list(batch)
+            self.assertTrue(all(v['valid'] for v in verdicts), verdicts)
+            # The ranges and the equal list are one ticket set, held as ranges
+            self.assertEqual(batch.stats['ticket_sets'], 1)
+            self.assertIs(next(iter(batch._sets.values())), ranges)
+
+    def test_shared_draws_are_computed_once(self):
+        cache = ResultCache()
+        batch = BatchVerification(self.records(), workers=1, cache=cache)
+        self.check(batch)
+        # Records 0 and 6 share a seed and ticket set
+        self.assertEqual(batch.stats['draws_computed'], 7)
+
+        again = BatchVerification(self.records(), workers=1, cache=cache)
+        self.check(again)
+        # Single-winner draws come from the cache; the 3-place draw is recomputed
+        self.assertEqual((again.stats['cache_hits'], again.stats['draws_computed']), (6, 1))
+
+if __name__ == '__main__':
+    unittest.main()
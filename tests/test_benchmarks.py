@@ -0,0 +1,36 @@
+"""
+Unit tests for the benchmark report helpers
+"""
+import unittest
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.run import compare, main, percentile, summarize
+
+class TestBenchmarkReport(unittest.TestCase):
+    def test_percentiles(self):
+        values = [float(i) for i in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+        self.assertEqual(percentile([3.0], 95), 3.0)
+        stats = summarize([0.2, 0.1, 0.4], items=10)
+        self.assertEqual(stats['p50_s'], 0.2)
+        self.assertEqual(stats['throughput'], 50.0)
+
+    def test_compare_flags_regressions(self):
+        baseline = {'a': {'p50_s': 1.0}, 'b': {'p50_s': 1.0}, 'gone': {'p50_s': 1.0}}
+        current = {'a': {'p50_s': 1.1}, 'b': {'p50_s': 1.5}, 'new': {'p50_s': 1.0}, 'raw': {'ops': 5}}
+        rows = {row['name']: row for row in compare(current, baseline, threshold=0.2)}
+        self.assertEqual(set(rows), {'a', 'b'})
+        self.assertFalse(rows['a']['regression'])
+        self.assertTrue(rows['b']['regression'])
+
+    def test_small_run(self):
+        self.assertEqual(main(['--only', 'core', '--sizes', '100', '--repeat', '1', '--no-memory']), 0)
+
+    def test_startup_run(self):
+        self.assertEqual(main(['--only', 'startup', '--startup-tickets', '100', '--startup-runs', '1']), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+"""
+Tests for the Bitcoin API client against a local stand-in server
+"""
+import unittest
+import tempfile
+import threading
+import time
+import sys
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bitcoin_api
+from block_cache import BlockHashCache, BlockHashSnapshot, write_block_snapshot
+from tip_tracker import TipTracker
+
+TIP_HEIGHT = 1000
+
+def fake_hash(height):
+    return f"{height:064x}"
+
+class FakeBlockstream(BaseHTTPRequestHandler):
+    """Serves /blocks/tip/height and /block-height/<n> like blockstream.info"""
+    requests_seen = []
+    delay = 0.0
+    failures = {}  # path -> number of 503 responses before succeeding
+
+    def do_GET(self):
+        FakeBlockstream.requests_seen.append(self.path)
+        if FakeBlockstream.failures.get(self.path, 0) > 0:
+            FakeBlockstream.failures[self.path] -= 1
+            self.send_error(503)
+            return
+        if self.path == '/blocks/tip/height':
+            time.sleep(FakeBlockstream.delay)
+            body = str(TIP_HEIGHT)
+        elif self.path.startswith('/block-height/'):
+            height = int(self.path.rsplit('/', 1)[1])
+            if height > TIP_HEIGHT:
+                self.send_error(404)
+                return
+            time.sleep(FakeBlockstream.delay)
+            body = fake_hash(height)
+        else:
+            self.send_error(404)
+            return
+        data = body.encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+class TestBitcoinApi(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeBlockstream)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.saved_base = bitcoin_api.API_BASE
+        bitcoin_api.API_BASE = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        bitcoin_api.API_BASE = cls.saved_base
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmp.name, 'blocks.db')
+        self.cache = BlockHashCache(self.cache_path, capacity=2)
+        bitcoin_api.set_block_cache(self.cache)
+        bitcoin_api._tip_tracker = TipTracker(bitcoin_api._fetch_latest_block_height)
+        FakeBlockstream.requests_seen = []
+        FakeBlockstream.delay = 0.0
+        FakeBlockstream.failures = {}
+
+    def tearDown(self):
+        self.cache.close()
+        bitcoin_api.set_block_cache(None)
+        self.tmp.cleanup()
+
+    def tip_requests(self):
+        return [p for p in FakeBlockstream.requests_seen if p == '/blocks/tip/height']
+
+    def block_requests(self):
+        return [p for p in FakeBlockstream.requests_seen if p.startswith('/block-height/')]
+
+    def test_confirmed_blocks_are_cached(self):
+        hashes, heights = bitcoin_api.get_block_hashes_for_draw(990, count=3)
+        self.assertEqual(heights, [990, 989, 988])
+        self.assertEqual(hashes, [fake_hash(h) for h in heights])
+        self.assertEqual(len(self.block_requests()), 3)
+
+        self.assertEqual(bitcoin_api.get_block_hashes_for_draw(990, count=3)[0], hashes)
+        self.assertEqual(len(self.block_requests()), 3)
+        stats = self.cache.get_stats()
+        self.assertEqual(stats['stores'], 3)
+        self.assertEqual(stats['memory_hits'] + stats['disk_hits'], 3)
+        self.assertGreaterEqual(stats['disk_hits'], 1)
+
+    def test_recent_blocks_are_not_cached(self):
+        bitcoin_api.get_block_hash_by_height(TIP_HEIGHT)
+        bitcoin_api.get_block_hash_by_height(TIP_HEIGHT)
+        self.assertEqual(len(self.block_requests()), 2)
+        self.assertEqual(self.cache.get_stats()['stores'], 0)
+
+    def test_disk_tier_survives_restart(self):
+        bitcoin_api.get_block_hash_by_height(500)
+        self.cache.close()
+        self.cache = BlockHashCache(self.cache_path)
+        bitcoin_api.set_block_cache(self.cache)
+        self.assertEqual(bitcoin_api.get_block_hash_by_height(500), fake_hash(500))
+        self.assertEqual(len(self.block_requests()), 1)
+        self.assertEqual(self.cache.get_stats()['disk_hits'], 1)
+
+    def test_snapshot_tier(self):
+        snapshot_path = os.path.join(self.tmp.name, 'blocks.snap')
+        self.assertEqual(write_block_snapshot(snapshot_path, [(h, fake_hash(h)) for h in (600, 400, 500)]), 3)
+        self.cache.close()
+        self.cache = BlockHashCache(None, snapshot=BlockHashSnapshot(snapshot_path))
+        bitcoin_api.set_block_cache(self.cache)
+        self.assertEqual(bitcoin_api.get_block_hash_by_height(500), fake_hash(500))
+        self.assertEqual(len(self.block_requests()), 0)
+        self.assertEqual(bitcoin_api.get_block_hash_by_height(450), fake_hash(450))
+        self.assertEqual(len(self.block_requests()), 1)
+        self.assertEqual(self.cache.get_stats()['snapshot_hits'], 1)
+
+    def test_draw_fetches_concurrently(self):
+        FakeBlockstream.delay = 0.3
+        start = time.monotonic()
+        hashes, heights = bitcoin_api.get_block_hashes_for_draw(900, count=6)
+        elapsed = time.monotonic() - start
+        self.assertEqual(heights, [900, 899, 898, 897, 896, 895])
+        self.assertEqual(hashes, [fake_hash(h) for h in heights])
+        self.assertLess(elapsed, 6 * 0.3)
+
+    def test_transient_errors_are_retried(self):
+        FakeBlockstream.failures = {'/block-height/700': 2}
+        self.assertEqual(bitcoin_api.get_block_hash_by_height(700), fake_hash(700))
+        self.assertEqual(self.block_requests().count('/block-height/700'), 3)
+
+    def test_missing_block_is_not_retried(self):
+        with self.assertRaises(Exception):
+            bitcoin_api.get_block_hashes_for_draw(TIP_HEIGHT + 1, count=2)
+        self.assertEqual(self.block_requests().count(f'/block-height/{TIP_HEIGHT + 1}'), 1)
+
+    def test_tip_is_served_from_memory(self):
+        self.assertEqual(bitcoin_api.get_latest_block_height(), TIP_HEIGHT)
+        self.assertEqual(bitcoin_api.get_latest_block_height(), TIP_HEIGHT)
+        self.assertEqual(len(self.tip_requests()), 1)
+        self.assertLess(bitcoin_api.get_tip_status()['age_seconds'], 5)
+        # A zero staleness bound forces a refresh
+        bitcoin_api.get_latest_block_height(max_age=0)
+        self.assertEqual(len(self.tip_requests()), 2)
+
+    def test_concurrent_tip_misses_are_coalesced(self):
+        FakeBlockstream.delay = 0.3
+        barrier = threading.Barrier(8)
+        results = []
+
+        def reader():
+            barrier.wait()
+            results.append(bitcoin_api.get_latest_block_height())
+
+        threads = [threading.Thread(target=reader) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, [TIP_HEIGHT] * 8)
+        self.assertEqual(len(self.tip_requests()), 1)
+        self.assertEqual(bitcoin_api.get_tip_status()['coalesced'], 7)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,9 +5,13 @@ import unittest
 import hashlib
 import sys
 import os
+import json
+import tempfile
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from lottery_core import generate_seed, compute_score, pick_winner
+from lottery_core import generate_seed, compute_score, tie_breaker, pick_winner, find_winner, find_winner_parallel, get_lottery_result
+from lottery_core import get_lottery_result_stream, ticket_set_digest, WinnerIndex, pick_winners
+from ticket_stream import open_ticket_stream, write_uint64
 
 class TestLotteryCore(unittest.TestCase):
     def test_generate_seed(self):
@@ -40,6 +44,127 @@ class TestLotteryCore(unittest.TestCase):
         self.assertEqual(scores[winner], min(scores.values()))
         self.assertIn('seed_hex', proof)
         self.assertIn('scores', proof)
+    
+    def test_find_winner_matches_pick_winner(self):
+        seed_hex = generate_seed(['x', 'y', 'z']).hex()
+        seed = bytes.fromhex(seed_hex)
+        tickets = [7, '007', 3, 12345, '42', 42, 0, 999999]
+        
+        expected = min(
+            (compute_score(seed, str(int(t))), tie_breaker(seed, str(int(t))), str(int(t)))
+            for t in tickets
+        )
+        winner, score, tb = find_winner(seed_hex, tickets)
+        self.assertEqual((score, tb, winner), expected)
+        
+        full_winner, scores, proof = pick_winner(seed_hex, tickets)
+        self.assertEqual(full_winner, winner)
+        self.assertEqual(proof['winner_score'], str(score))
+        self.assertEqual(proof['winner_tie_breaker'], str(tb))
+        
+        lean_winner, lean_scores, lean_proof = pick_winner(seed_hex, tickets, include_scores=False)
+        self.assertEqual(lean_winner, winner)
+        self.assertEqual(lean_scores, {})
+        self.assertNotIn('scores', lean_proof)
+        self.assertEqual(lean_proof['winner_tie_breaker'], proof['winner_tie_breaker'])
+    
+    def test_find_winner_parallel_matches_serial(self):
+        seed_hex = generate_seed(['p', 'q', 'r']).hex()
+        tickets = list(range(1, 2001))
+        expected = find_winner(seed_hex, tickets)
+        self.assertEqual(
+            find_winner_parallel(seed_hex, tickets, workers=2, chunk_size=300, min_parallel=0),
+            expected
+        )
+        # Small inputs fall back to the serial engine
+        self.assertEqual(find_winner_parallel(seed_hex, iter(tickets), workers=2), expected)
+        
+        _, _, proof = pick_winner(seed_hex, tickets, include_scores=False, workers=2, chunk_size=500, min_parallel=0)
+        self.assertEqual(proof['winner'], expected[0])
+        self.assertEqual(proof['winner_tie_breaker'], str(expected[2]))
+    
+    def test_find_winner_empty(self):
+        self.assertEqual(find_winner('0' * 64, []), (None, None, None))
+    
+    def test_pick_winners_matches_full_sort(self):
+        seed_hex = generate_seed(['t', 'o', 'p']).hex()
+        seed = bytes.fromhex(seed_hex)
+        tickets = list(range(300)) + ['007', 42, 299]
+        ranked = sorted(
+            (compute_score(seed, str(t)), tie_breaker(seed, str(t)), str(t)) for t in set(range(300))
+        )
+        for k in (1, 3, 50, 300, 400):
+            winners, proof = pick_winners(seed_hex, iter(tickets), k)
+            self.assertEqual(winners, [t for _, _, t in ranked[:k]])
+            self.assertEqual(proof['winners'][0]['score'], str(ranked[0][0]))
+            self.assertEqual(proof['ticket_set'], ticket_set_digest(tickets))
+        self.assertEqual(pick_winners(seed_hex, tickets, 1)[0], [pick_winner(seed_hex, tickets)[0]])
+        with self.assertRaises(ValueError):
+            pick_winners(seed_hex, tickets, 0)
+    
+    def test_winner_index_matches_pick_winner(self):
+        import random
+        rng = random.Random(7)
+        seed_hex = generate_seed(['i', 'n', 'c']).hex()
+        index = WinnerIndex(seed_hex, [1, '01', 2])
+        current = {1, 2}
+        for _ in range(400):
+            ticket = rng.randrange(60)
+            if rng.random() < 0.55:
+                self.assertEqual(index.add(ticket), ticket not in current)
+                current.add(ticket)
+            else:
+                self.assertEqual(index.remove(str(ticket)), ticket in current)
+                current.discard(ticket)
+            self.assertEqual(len(index), len(current))
+            self.assertEqual(index.winner(), find_winner(seed_hex, current))
+            if current:
+                self.assertEqual(index.winner()[0], pick_winner(seed_hex, list(current))[0])
+        
+        for ticket in list(current):
+            index.remove(ticket)
+        self.assertEqual(index.winner(), (None, None, None))
+    
+    def test_get_lottery_result_without_scores(self):
+        result = get_lottery_result(['a', 'b', 'c'], [5, 6, 7], include_scores=False)
+        full = get_lottery_result(['a', 'b', 'c'], [5, 6, 7])
+        self.assertEqual(result['winner'], full['winner'])
+        self.assertNotIn('scores', result)
+        self.assertEqual(full['scores'], full['proof']['scores'])
+
+class TestLotteryStream(unittest.TestCase):
+    block_hashes = ['a', 'b', 'c']
+    tickets = [12, 5, 77, 1000, 3, 42]
+    
+    def assert_matches_batch(self, stream_result):
+        batch = get_lottery_result(self.block_hashes, self.tickets)
+        self.assertEqual(stream_result['winner'], batch['winner'])
+        self.assertEqual(stream_result['proof']['winner_score'], batch['proof']['winner_score'])
+        self.assertEqual(stream_result['ticket_set'], ticket_set_digest(self.tickets))
+        self.assertEqual(stream_result['ticket_set']['count'], len(self.tickets))
+    
+    def test_generator_input(self):
+        result = get_lottery_result_stream(self.block_hashes, (t for t in self.tickets))
+        self.assert_matches_batch(result)
+        self.assertNotIn('tickets', result)
+    
+    def test_file_formats(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            lines_path = os.path.join(tmp, 'tickets.txt')
+            with open(lines_path, 'w') as f:
+                f.write('\n'.join(str(t) for t in self.tickets) + '\n')
+            
+            ndjson_path = os.path.join(tmp, 'tickets.ndjson')
+            with open(ndjson_path, 'w') as f:
+                for t in self.tickets:
+                    f.write(json.dumps({'ticket': t}) + '\n')
+            
+            bin_path = os.path.join(tmp, 'tickets.bin')
+            self.assertEqual(write_uint64(bin_path, self.tickets), len(self.tickets))
+            
+            for path in (lines_path, ndjson_path, bin_path):
+                result = get_lottery_result_stream(self.block_hashes, open_ticket_stream(path))
+                self.assert_matches_batch(result)
 
 if __name__ == '__main__':
     unittest.main()
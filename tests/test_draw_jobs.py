@@ -0,0 +1,133 @@
+"""
+Unit tests for the persistent draw job queue
+"""
+import unittest
+import sys
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from draw_jobs import JobQueue
+from lottery_core import get_lottery_result
+
+def run_draw(params):
+    if not params.get('tickets'):
+        raise ValueError('No tickets available')
+    return {'result': get_lottery_result(['a', 'b', 'c'], params['tickets'], include_scores=False)}
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'jobs.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_results_survive_restart(self):
+        queue = JobQueue(self.path, run_draw, workers=0)
+        ok = queue.submit({'tickets': [1, 2, 3]})
+        bad = queue.submit({'tickets': []})
+        self.assertEqual(queue.get(ok)['status'], 'queued')
+        self.assertEqual(queue.get(bad)['queue_position'], 2)
+        self.assertEqual(queue.run_pending(), 2)
+        queue.close()
+
+        reopened = JobQueue(self.path, run_draw, workers=0)
+        job = reopened.get(ok, with_result=True)
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['result']['result']['winner'],
+                         get_lottery_result(['a', 'b', 'c'], [1, 2, 3])['winner'])
+        self.assertEqual(reopened.get(bad)['error'], 'No tickets available')
+        self.assertEqual(reopened.counts(), {'queued': 0, 'running': 0, 'done': 1, 'failed': 1})
+        self.assertIsNone(reopened.get('missing'))
+        reopened.close()
+
+    def test_expired_leases_are_requeued(self):
+        queue = JobQueue(self.path, run_draw, workers=0)
+        stale = queue.submit({'tickets': [5]})
+        live = queue.submit({'tickets': [6]})
+        queue.close()
+        # A worker that died mid-job (an owner token is never a PID, which a restart may reuse)
+        # and one that is still renewing its lease
+        db = sqlite3.connect(self.path)
+        db.execute("UPDATE draw_jobs SET status = 'running', owner = 'dead', heartbeat_at = ? WHERE id = ?",
+                   (time.time() - 60, stale))
+        db.execute("UPDATE draw_jobs SET status = 'running', owner = 'alive', heartbeat_at = ? WHERE id = ?",
+                   (time.time(), live))
+        db.commit()
+        db.close()
+
+        reopened = JobQueue(self.path, run_draw, workers=0, lease=30)
+        self.assertEqual(reopened.get(stale)['status'], 'queued')
+        self.assertEqual(reopened.get(live)['status'], 'running')
+        self.assertEqual(reopened.run_pending(), 1)
+        self.assertEqual(reopened.get(stale)['status'], 'done')
+        reopened.close()
+
+    def test_jobs_that_keep_losing_their_worker_fail(self):
+        queue = JobQueue(self.path, run_draw, workers=0, lease=30, max_attempts=2)
+        job_id = queue.submit({'tickets': [7]})
+        db = sqlite3.connect(self.path)
+        for attempt in (1, 2):
+            # The worker claims the job, then dies with it (e.g. killed for memory)
+            self.assertIsNotNone(queue._claim())
+            db.execute('UPDATE draw_jobs SET heartbeat_at = ? WHERE id = ?', (time.time() - 60, job_id))
+            db.commit()
+            queue._recover()
+            self.assertEqual(queue.get(job_id)['attempts'], attempt)
+        db.close()
+
+        job = queue.get(job_id)
+        self.assertEqual(job['status'], 'failed')
+        self.assertIn('2 times', job['error'])
+        self.assertEqual(queue.run_pending(), 0)
+        queue.close()
+
+    def test_heartbeat_keeps_long_jobs_leased(self):
+        started = threading.Event()
+
+        def slow(params):
+            started.set()
+            time.sleep(0.5)
+            return {}
+
+        worker = JobQueue(self.path, slow, workers=0, lease=0.15)
+        job_id = worker.submit({})
+        thread = threading.Thread(target=worker.run_pending)
+        thread.start()
+        started.wait(5)
+        other = JobQueue(self.path, slow, workers=0, lease=0.15)
+        for _ in range(4):
+            time.sleep(0.1)
+            self.assertEqual(other._recover(), 0)
+        thread.join()
+        self.assertEqual(other.get(job_id)['status'], 'done')
+        other.close()
+        worker.close()
+
+    def test_workers_run_each_job_once(self):
+        runs = []
+        lock = threading.Lock()
+
+        def run(params):
+            with lock:
+                runs.append(params['n'])
+            return {}
+
+        queues = [JobQueue(self.path, run, workers=2, poll_interval=0.05) for _ in range(2)]
+        job_ids = [queues[n % 2].submit({'n': n}) for n in range(20)]
+        for queue in queues:
+            queue.start()
+        deadline = time.monotonic() + 10
+        while queues[0].counts()['done'] < 20 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        for queue in queues:
+            queue.close()
+        self.assertEqual(sorted(runs), list(range(20)))
+        self.assertEqual(len(job_ids), 20)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+"""
+Unit tests for the fairness simulation
+"""
+import unittest
+import tempfile
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fairness_sim import FairnessSimulation, simulation_seed, wilson_interval
+from lottery_core import find_winner
+
+class TestFairnessSimulation(unittest.TestCase):
+    def test_winners_match_engine(self):
+        tickets = list(range(100, 130))
+        sim = FairnessSimulation(tickets, label='engine').run(40, workers=1, batch_size=7)
+        counts = [0] * len(tickets)
+        for i in range(40):
+            winner = find_winner(simulation_seed('engine', i).hex(), tickets)[0]
+            counts[tickets.index(int(winner))] += 1
+        self.assertEqual(sim.counts.tolist(), counts)
+        self.assertEqual(sum(sim.score_histogram), 40)
+
+        pooled = FairnessSimulation(tickets, label='engine').run(40, workers=2, batch_size=7)
+        self.assertEqual(pooled.counts, sim.counts)
+        self.assertEqual(pooled.score_histogram, sim.score_histogram)
+
+    def test_checkpoint_resume(self):
+        tickets = range(1, 41)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'sim.json')
+            FairnessSimulation(tickets, checkpoint=path).run(300, workers=1, checkpoint_every=50)
+            resumed = FairnessSimulation(tickets, checkpoint=path)
+            self.assertEqual(resumed.draws, 300)
+            resumed.run(700, workers=1)
+            straight = FairnessSimulation(tickets).run(700, workers=1)
+            self.assertEqual(resumed.counts, straight.counts)
+            self.assertEqual(resumed.report(), straight.report())
+
+            with self.assertRaises(ValueError):
+                FairnessSimulation(range(1, 42), checkpoint=path)
+            with self.assertRaises(ValueError):
+                FairnessSimulation(tickets, label='other', checkpoint=path)
+
+    def test_report(self):
+        report = FairnessSimulation(range(1, 11)).run(2000, workers=1).report(max_listed=5)
+        self.assertEqual(report['draws'], 2000)
+        self.assertEqual(report['winners']['df'], 9)
+        self.assertGreater(report['winners']['p_value'], 0.001)
+        self.assertGreater(report['winning_scores']['p_value'], 0.001)
+        self.assertLessEqual(len(report['frequencies']['tickets']), 5)
+
+        low, high = wilson_interval(50, 100)
+        self.assertLess(low, 0.5)
+        self.assertGreater(high, 0.5)
+        self.assertEqual(wilson_interval(0, 0), (0.0, 1.0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+"""
+Unit tests for the block-header store
+"""
+import unittest
+import hashlib
+import struct
+import tempfile
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bitcoin_api
+from header_store import (HEADER_SIZE, HeaderError, HeaderStore, bits_to_target, block_hash_hex, check_pow,
+                          header_hash)
+
+# Mainnet blocks 0-2
+MAINNET_HEADERS = bytes.fromhex(
+    '0100000000000000000000000000000000000000000000000000000000000000000000003ba3edfd7a7b12b27ac72c3e'
+    '67768f617fc81bc3888a51323a9fb8aa4b1e5e4a29ab5f49ffff001d1dac2b7c'
+    '010000006fe28c0ab6f1b372c1a6a246ae63f74f931e8365e15a089c68d6190000000000982051fd1e4ba744bbbe680e'
+    '1fee14677ba1a3c3540bf7b1cdb606e857233e0e61bc6649ffff001d01e36299'
+    '010000004860eb18bf1b1620e37e9490fc8a427514416fd75159ab86688e9a8300000000d5fdcc541e25de1c7a5added'
+    'f24858b8bb665c9f36ef744ee42c316022c90f9bb0bc6649ffff001d08d2bd61'
+)
+GENESIS_HASH = '000000000019d6689c085ae165831e934ff763ae46a2a6c172b3f1b60a8ce26f'
+
+# Regtest difficulty, so test chains are mined in a few tries
+EASY_BITS = 0x207fffff
+EASY_LIMIT = bits_to_target(EASY_BITS)
+
+def mine_chain(n, parent=bytes(HEADER_SIZE)):
+    headers = []
+    prev = header_hash(parent)
+    for i in range(n):
+        nonce = 0
+        while True:
+            header = (struct.pack('<I', 1) + prev + hashlib.sha256(str(i).encode()).digest()
+                      + struct.pack('<III', 1600000000 + i, EASY_BITS, nonce))
+            if int.from_bytes(header_hash(header), 'little') <= EASY_LIMIT:
+                break
+            nonce += 1
+        headers.append(header)
+        prev = header_hash(header)
+    return headers
+
+class TestHeaderStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'headers.dat')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_mainnet_headers(self):
+        headers = [MAINNET_HEADERS[i:i + HEADER_SIZE] for i in range(0, len(MAINNET_HEADERS), HEADER_SIZE)]
+        for header in headers:
+            check_pow(header)
+        with HeaderStore(self.path) as store:
+            self.assertEqual(store.append(headers), 3)
+            self.assertEqual(store.tip_height, 2)
+            self.assertEqual(store.block_hash(0, verify=True), GENESIS_HASH)
+            self.assertEqual(store.block_hash(2, verify=True),
+                             '000000006a625f06636b8bb6ac7b960a8d03705d1ace08b1a19da3fdcc99ddbd')
+            self.assertIsNone(store.block_hash(3))
+
+        forged = bytearray(headers[1])
+        forged[-1] ^= 1  # another nonce
+        with self.assertRaises(HeaderError):
+            check_pow(bytes(forged))
+        with HeaderStore(os.path.join(self.tmp.name, 'other.dat')) as store:
+            store.append(headers[:1])
+            with self.assertRaises(HeaderError):
+                store.append([headers[2]])  # skips block 1
+            self.assertEqual(len(store), 1)
+
+    def test_append_import_and_reopen(self):
+        chain = mine_chain(50)
+        with HeaderStore(self.path, first_height=1000, pow_limit=EASY_LIMIT) as store:
+            self.assertIsNone(store.tip_height)
+            store.append(chain[:10])
+            with self.assertRaises(HeaderError):
+                store.append(chain[11:20])  # gap: nothing written
+            self.assertEqual(store.tip_height, 1009)
+
+            dump = os.path.join(self.tmp.name, 'dump.hex')
+            with open(dump, 'w') as f:
+                f.write('\n'.join(h.hex() for h in chain[10:30]) + '\n')
+            self.assertEqual(store.import_dump(dump), 20)
+            dump = os.path.join(self.tmp.name, 'dump.bin')
+            with open(dump, 'wb') as f:
+                f.write(b''.join(chain[30:]))
+            self.assertEqual(store.import_dump(dump), 20)
+
+        # A torn write leaves a partial slot that is ignored, then overwritten
+        with open(self.path, 'ab') as f:
+            f.write(b'\x00' * 30)
+        with HeaderStore(self.path, pow_limit=EASY_LIMIT) as store:
+            self.assertEqual((store.first_height, store.tip_height), (1000, 1049))
+            for height in (1000, 1025, 1049):
+                self.assertEqual(store.block_hash(height, verify=True), block_hash_hex(chain[height - 1000]))
+            self.assertEqual(store.block_hash(999), None)
+            store.append(mine_chain(1, chain[-1]))
+            self.assertEqual(store.tip_height, 1050)
+            store.check(1050)
+
+    def test_bitcoin_api_uses_store(self):
+        chain = mine_chain(5)
+        store = HeaderStore(self.path, pow_limit=EASY_LIMIT)
+        store.append(chain)
+        saved_base = bitcoin_api.API_BASE
+        bitcoin_api.API_BASE = 'http://127.0.0.1:9'  # nothing listens: any request fails
+        bitcoin_api.set_header_store(store)
+        try:
+            hashes, heights = bitcoin_api.get_block_hashes_for_draw(4, count=3)
+            self.assertEqual(heights, [4, 3, 2])
+            self.assertEqual(hashes, [block_hash_hex(chain[h]) for h in heights])
+
+            # A tampered file fails the check instead of feeding the seed
+            with open(self.path, 'r+b') as f:
+                f.seek(16 + 3 * HEADER_SIZE + 4)
+                f.write(b'\xff')
+            with self.assertRaises(Exception):
+                bitcoin_api.get_block_hashes_for_draw(4, count=3)
+        finally:
+            bitcoin_api.API_BASE = saved_base
+            bitcoin_api.set_header_store(None)
+            store.close()
+
+if __name__ == '__main__':
+    unittest.main()
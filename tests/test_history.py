@@ -0,0 +1,133 @@
+"""
+Unit tests for the persistent draw history
+"""
+import unittest
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from models import db, block_key, VerificationRequest
+from draw_history import DrawHistory
+
+def make_result(i, heights):
+    return {
+        'draw_id': f'draw-{i}',
+        'winner': 2 ** 64 - 1 - i,
+        'seed_hex': f'{i:064x}',
+        'block_hashes': [f'hash-{h}' for h in heights],
+        'block_heights': heights,
+        'scores': {str(i): '1'},
+        'proof': {'winner_score': '1', 'scores': {str(i): '1'}}
+    }
+
+class TestDrawHistory(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(self.tmp.name, 'lottery.db')
+        db.init_app(self.app)
+        with self.app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.engine.dispose()
+        self.tmp.cleanup()
+
+    def history(self, **kwargs):
+        kwargs.setdefault('flush_interval', 0)
+        return DrawHistory(self.app, **kwargs)
+
+    def test_block_key_is_canonical(self):
+        self.assertEqual(block_key([800002, 800001, 800000]), '800002,800001,800000')
+        self.assertEqual(block_key(['7', 6]), block_key([7, 6]))
+
+    def test_batched_inserts(self):
+        history = self.history(batch_size=3, flush_interval=60)
+        history.record(make_result(0, [10, 9]), [1, 2])
+        history.record(make_result(1, [11, 10]), [1, 2])
+        self.assertEqual(history.stats['flushes'], 0)
+        # Pending draws are visible before they are written
+        self.assertEqual(history.get('draw-1').seed_hex, f'{1:064x}')
+        self.assertEqual(history.count(), 2)
+        history.record(make_result(2, [12, 11]), [1, 2])
+        self.assertEqual(history.stats['flushes'], 1)
+
+        # Survives a restart (new instance, same database)
+        reopened = self.history()
+        draw = reopened.get('draw-0')
+        self.assertEqual(draw.tickets_used, [1, 2])
+        self.assertEqual(draw.to_dict()['winner'], 2 ** 64 - 1)
+        self.assertNotIn('scores', draw.proof)
+
+    def test_scores_are_not_stored(self):
+        history = self.history()
+        result = dict(make_result(0, [10]), ticket_set={'count': 1, 'digest': 'ab'}, merkle_root='cd')
+        history.record(result, [0])
+        history.flush()
+        draw = self.history().get('draw-0')
+        self.assertEqual(draw.scores, {})
+        self.assertEqual(draw.proof['ticket_set'], {'count': 1, 'digest': 'ab'})
+        self.assertEqual(draw.proof['merkle_root'], 'cd')
+
+    def test_failed_flush_drops_only_bad_draws(self):
+        history = self.history(batch_size=10, flush_interval=60)
+        history.record(make_result(0, [10]), [0])
+        history.flush()
+        # draw-0 again violates the unique draw_id; the other two must still be written
+        for i in (1, 0, 2):
+            history.record(make_result(i, [10 + i]), [i])
+        self.assertEqual(history.flush(), 2)
+        self.assertEqual(history.stats['dropped'], 1)
+        self.assertEqual(history.get_stats()['pending'], 0)
+
+        history.record(make_result(3, [13]), [3])
+        self.assertEqual(history.flush(), 1)
+        self.assertEqual(self.history().count(), 4)
+
+    def test_duplicate_blocks(self):
+        history = self.history(batch_size=2, flush_interval=60)
+        history.record(make_result(0, [10, 9]), [1])
+        self.assertEqual(history.find_by_blocks([10, 9]).draw_id, 'draw-0')
+        history.record(make_result(1, [10, 9]), [1])
+        history.record(make_result(2, [20, 19]), [1])
+        # Earliest draw wins, across stored and pending rows
+        self.assertEqual(history.find_by_blocks([10, 9]).draw_id, 'draw-0')
+        self.assertEqual(history.find_by_blocks([20, 19]).draw_id, 'draw-2')
+        self.assertIsNone(history.find_by_blocks([10]))
+
+    def test_cursor_pagination(self):
+        history = self.history(batch_size=4)
+        for i in range(10):
+            history.record(make_result(i, [100 + i]), [i])
+
+        seen = []
+        cursor = None
+        while True:
+            draws, cursor = history.page(cursor, limit=3)
+            seen.extend(d.draw_id for d in draws)
+            if cursor is None:
+                break
+        self.assertEqual(seen, [f'draw-{i}' for i in reversed(range(10))])
+
+    def test_get_many_and_verification_log(self):
+        history = self.history(batch_size=2, flush_interval=60)
+        for i in range(3):
+            history.record(make_result(i, [200 + i]), [i])
+        # draw-0/1 are flushed, draw-2 is pending
+        found = history.get_many(['draw-0', 'draw-2', 'missing'])
+        self.assertEqual(sorted(found), ['draw-0', 'draw-2'])
+
+        written = history.log_verifications(
+            [{'draw_id': 'draw-0', 'valid': True}, {'id': 7, 'valid': False}], verified_by='auditor'
+        )
+        self.assertEqual(written, 2)
+        with self.app.app_context():
+            rows = [r.to_dict() for r in VerificationRequest.query.order_by(VerificationRequest.id)]
+        self.assertEqual([(r['draw_id'], r['valid'], r['verified_by']) for r in rows],
+                         [('draw-0', True, 'auditor'), ('7', False, 'auditor')])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+"""
+Unit tests for incremental JSON encoding
+"""
+import unittest
+import gzip
+import json
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_stream import Deferred, StreamedMapping, iter_gzip, iter_json
+from lottery_core import ScoreStream, pick_winner
+
+class TestJsonStream(unittest.TestCase):
+    def test_streamed_draw_matches_batch(self):
+        seed_hex = 'ab' * 32
+        tickets = list(range(1, 50))
+        scores = ScoreStream(seed_hex, tickets)
+        body = {
+            'seed_hex': seed_hex,
+            'scores': StreamedMapping(scores, batch=7),
+            'winner': Deferred(lambda: scores.winner),
+            'proof': Deferred(scores.proof)
+        }
+        chunks = list(iter_json(body))
+        self.assertTrue(chunks[0].startswith('{'))
+        decoded = json.loads(''.join(chunks))
+
+        winner, _, proof = pick_winner(seed_hex, tickets)
+        self.assertEqual(decoded['winner'], winner)
+        self.assertEqual(decoded['scores'], proof['scores'])
+        self.assertEqual(decoded['proof']['winner_tie_breaker'], proof['winner_tie_breaker'])
+        self.assertEqual(list(decoded), ['seed_hex', 'scores', 'winner', 'proof'])
+
+    def test_error_closes_object(self):
+        def items():
+            yield 'a', 1
+            raise ValueError('boom')
+        mapping = StreamedMapping(items())
+        body = {'scores': mapping, 'error': Deferred(lambda: str(mapping.error))}
+        self.assertEqual(json.loads(''.join(iter_json(body))), {'scores': {'a': 1}, 'error': 'boom'})
+
+    def test_gzip(self):
+        body = {'items': StreamedMapping((str(i), i) for i in range(5000))}
+        data = b''.join(iter_gzip(iter_json(body)))
+        self.assertEqual(len(json.loads(gzip.decompress(data))['items']), 5000)
+
+if __name__ == '__main__':
+    unittest.main()
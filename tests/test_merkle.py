@@ -0,0 +1,51 @@
+"""
+Unit tests for Merkle-committed draw proofs
+"""
+import unittest
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from merkle import merkle_root, inclusion_proof, verify_inclusion, node_hash
+from lottery_core import (generate_seed, find_winner, pick_winner_compact, ticket_inclusion_proof,
+                          verify_ticket_inclusion)
+
+def naive_root(leaves):
+    """Level-by-level reference: pair nodes, promote an odd last node"""
+    level = list(leaves)
+    while len(level) > 1:
+        paired = [node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            paired.append(level[-1])
+        level = paired
+    return level[0]
+
+class TestMerkle(unittest.TestCase):
+    def test_streaming_root_matches_reference(self):
+        for n in range(1, 20):
+            leaves = [bytes([i]) * 32 for i in range(n)]
+            self.assertEqual(merkle_root(leaves), naive_root(leaves))
+            for index in range(n):
+                root, path = inclusion_proof(leaves, index)
+                self.assertTrue(verify_inclusion(leaves[index], path, root))
+                if n > 1:
+                    self.assertFalse(verify_inclusion(leaves[(index + 1) % n], path, root))
+
+    def test_compact_draw(self):
+        seed_hex = generate_seed(['a', 'b', 'c']).hex()
+        tickets = list(range(100, 137))
+        winner, proof = pick_winner_compact(seed_hex, iter(tickets))
+        expected_winner, score, tb = find_winner(seed_hex, tickets)
+        self.assertEqual(winner, expected_winner)
+        self.assertEqual(proof['winner_score'], str(score))
+        self.assertEqual(proof['winner_tie_breaker'], str(tb))
+        self.assertEqual(tickets[proof['winner_index']], int(winner))
+
+        inclusion = ticket_inclusion_proof(seed_hex, tickets, 120)
+        self.assertEqual(inclusion['merkle_root'], proof['merkle_root'])
+        self.assertTrue(verify_ticket_inclusion(seed_hex, 120, inclusion['path'], proof['merkle_root']))
+        self.assertFalse(verify_ticket_inclusion(seed_hex, 121, inclusion['path'], proof['merkle_root']))
+        self.assertIsNone(ticket_inclusion_proof(seed_hex, tickets, 99))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+"""
+Unit tests for metrics and stage timers
+"""
+import unittest
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from metrics import Registry, operation, stage
+from lottery_core import get_lottery_result
+
+class TestMetrics(unittest.TestCase):
+    def test_render(self):
+        registry = Registry()
+        requests = registry.counter('requests_total', 'Requests', ('endpoint',))
+        latency = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+        registry.callback('queue_size', 'Queue size', lambda: {(): 3})
+        requests.inc(1, 'draw')
+        requests.inc(2, 'draw')
+        requests.inc(1, 'say "hi"')
+        for value in (0.05, 0.5, 0.5, 7):
+            latency.observe(value)
+
+        lines = registry.render().splitlines()
+        self.assertIn('# TYPE requests_total counter', lines)
+        self.assertIn('requests_total{endpoint="draw"} 3', lines)
+        self.assertIn('requests_total{endpoint="say \\"hi\\""} 1', lines)
+        self.assertIn('latency_seconds_bucket{le="0.1"} 1', lines)
+        self.assertIn('latency_seconds_bucket{le="1"} 3', lines)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 4', lines)
+        self.assertIn('latency_seconds_count 4', lines)
+        self.assertIn('latency_seconds_sum 8.05', lines)
+        self.assertIn('queue_size 3', lines)
+
+    def test_stages(self):
+        histogram = metrics.STAGE_SECONDS
+        before = histogram.count('unit-test', 'score')
+        # No operation: stage() records nothing
+        get_lottery_result(['a', 'b', 'c'], [1, 2, 3])
+        self.assertEqual(histogram.count('unit-test', 'score'), before)
+
+        with operation('unit-test'):
+            with stage('outer'):
+                get_lottery_result(['a', 'b', 'c'], [1, 2, 3])
+        for name in ('outer', 'seed', 'score', 'proof'):
+            self.assertEqual(histogram.count('unit-test', name), 1)
+        self.assertIs(stage('after'), stage('again'))
+
+if __name__ == '__main__':
+    unittest.main()
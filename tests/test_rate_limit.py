@@ -0,0 +1,81 @@
+"""
+Unit tests for the shared token-bucket rate limiter
+"""
+import unittest
+import multiprocessing
+import tempfile
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limit import Rate, RateLimiter, parse_rate, parse_rates
+
+def _hammer(path, hits, results):
+    limiter = RateLimiter(path, slots=64)
+    results.put(sum(limiter.hit('client|verify', Rate(50, 3600)).allowed for _ in range(hits)))
+    limiter.close()
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class TestRateLimiter(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(parse_rate('100/hour'), Rate(100, 3600))
+        self.assertEqual(parse_rate('10 per minute'), Rate(10, 60))
+        self.assertEqual(parse_rate('5/2 seconds'), Rate(5, 2))
+        self.assertEqual(parse_rates('a=1/day; b=2/second'), {'a': Rate(1, 86400), 'b': Rate(2, 1)})
+        for bad in ('100', 'ten/hour', '0/hour', '5/week'):
+            with self.assertRaises(ValueError):
+                parse_rate(bad)
+
+    def test_bucket_refill_and_cost(self):
+        clock = FakeClock()
+        limiter = RateLimiter(slots=64, clock=clock)
+        rate = Rate(10, 10)  # 1 token per second
+        self.assertEqual([limiter.hit('a', rate).allowed for _ in range(11)], [True] * 10 + [False])
+        self.assertTrue(limiter.hit('b', rate).allowed)  # separate bucket
+
+        decision = limiter.hit('a', rate, cost=3)
+        self.assertFalse(decision.allowed)
+        self.assertAlmostEqual(decision.retry_after, 3)
+        clock.now += 3
+        self.assertTrue(limiter.hit('a', rate, cost=3).allowed)
+
+        # A cost above capacity can never pass and leaves the bucket alone
+        clock.now += 100
+        decision = limiter.hit('a', rate, cost=1000)
+        self.assertFalse(decision.allowed)
+        self.assertTrue(decision.too_large)
+        self.assertEqual(limiter.peek('a', rate), 10)
+        self.assertTrue(limiter.hit('a', rate, cost=10).allowed)
+
+    def test_bounded_table_evicts_least_recent(self):
+        clock = FakeClock()
+        limiter = RateLimiter(slots=8, clock=clock)
+        rate = Rate(1, 3600)
+        for i in range(100):
+            clock.now += 1
+            self.assertTrue(limiter.hit(f'client{i}', rate).allowed)
+        self.assertEqual(len(limiter._mmap), 16 + 8 * 24)
+        # Recent keys are still limited
+        self.assertFalse(limiter.hit('client99', rate).allowed)
+
+    def test_shared_across_processes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'ratelimit.bin')
+            ctx = multiprocessing.get_context('spawn')
+            results = ctx.Queue()
+            workers = [ctx.Process(target=_hammer, args=(path, 30, results)) for _ in range(3)]
+            for w in workers:
+                w.start()
+            allowed = sum(results.get(timeout=30) for _ in workers)
+            for w in workers:
+                w.join()
+            self.assertEqual(allowed, 50)
+
+if __name__ == '__main__':
+    unittest.main()
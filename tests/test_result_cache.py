@@ -0,0 +1,69 @@
+"""
+Unit tests for the draw result cache
+"""
+import unittest
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lottery_core import generate_seed, pick_winner, get_lottery_result, ticket_set_digest
+from result_cache import ResultCache
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.seed_hex = generate_seed(['a', 'b', 'c']).hex()
+        self.tickets = [5, '007', 42, 1000, 31337]
+
+    def test_key_matches_ticket_set_digest(self):
+        cache = ResultCache()
+        pick_winner(self.seed_hex, self.tickets, cache=cache)
+        key = ResultCache.key(self.seed_hex, ticket_set_digest(self.tickets))
+        self.assertIsNotNone(cache.get(key, with_scores=True))
+
+    def test_cached_results_match(self):
+        cache = ResultCache()
+        for include_scores in (False, True, False, True):
+            expected = pick_winner(self.seed_hex, self.tickets, include_scores=include_scores)
+            self.assertEqual(pick_winner(self.seed_hex, self.tickets, include_scores=include_scores, cache=cache),
+                             expected)
+        # The first full request missed (the winner-only entry has no scores), the rest hit
+        self.assertEqual(cache.stats['misses'], 2)
+        self.assertEqual(cache.stats['memory_hits'], 2)
+
+        result = get_lottery_result(['a', 'b', 'c'], self.tickets, cache=cache)
+        self.assertEqual(result, get_lottery_result(['a', 'b', 'c'], self.tickets))
+        self.assertEqual(cache.stats['memory_hits'], 3)
+
+    def test_order_and_seed_are_part_of_the_key(self):
+        cache = ResultCache()
+        pick_winner(self.seed_hex, self.tickets, cache=cache)
+        reordered = list(reversed(self.tickets))
+        self.assertEqual(pick_winner(self.seed_hex, reordered, cache=cache), pick_winner(self.seed_hex, reordered))
+        other_seed = generate_seed(['x']).hex()
+        self.assertEqual(pick_winner(other_seed, self.tickets, cache=cache), pick_winner(other_seed, self.tickets))
+        self.assertEqual(cache.stats['misses'], 3)
+
+    def test_eviction(self):
+        cache = ResultCache(capacity=10, max_tickets=8)
+        pick_winner(self.seed_hex, self.tickets, cache=cache)
+        pick_winner(self.seed_hex, [1, 2, 3, 4], cache=cache)
+        # 5 + 4 scored tickets exceed the budget: the older entry is gone
+        self.assertEqual(cache.get_stats()['memory_entries'], 1)
+        self.assertEqual(cache.stats['evictions'], 1)
+
+    def test_disk_tier(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'results.db')
+            cache = ResultCache(path)
+            expected = pick_winner(self.seed_hex, self.tickets, cache=cache)
+            pick_winner(self.seed_hex, self.tickets, include_scores=False, cache=cache)
+            cache.close()
+
+            reopened = ResultCache(path)
+            self.assertEqual(pick_winner(self.seed_hex, self.tickets, cache=reopened), expected)
+            self.assertEqual(reopened.stats['disk_hits'], 1)
+            reopened.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+Unit tests for range-encoded ticket sets
+"""
+import unittest
+import random
+import tempfile
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ticket_ranges import TicketRanges, parse_ticket_ranges
+from ticket_store import TicketStore
+from lottery_core import find_winner, find_winner_ranges, pick_winner, pick_winner_ranges, ticket_set_digest
+from result_cache import ResultCache
+
+SEED = 'ef' * 32
+
+class TestTicketRanges(unittest.TestCase):
+    def test_matches_a_set_under_random_edits(self):
+        rng = random.Random(7)
+        for _ in range(50):
+            expected = set()
+            ranges = []
+            for _ in range(rng.randint(0, 5)):
+                first = rng.randint(0, 200)
+                last = first + rng.randint(0, 30)
+                ranges.append((first, last))
+                expected.update(range(first, last + 1))
+            extras = [rng.randint(0, 300) for _ in range(rng.randint(0, 20))]
+            expected.update(extras)
+            tickets = TicketRanges(ranges, extras)
+
+            for _ in range(100):
+                t = rng.randint(0, 300)
+                if rng.random() < 0.5:
+                    self.assertEqual(tickets.add(t), t not in expected)
+                    expected.add(t)
+                else:
+                    self.assertEqual(tickets.remove(t), t in expected)
+                    expected.discard(t)
+                self.assertEqual(t in tickets, t in expected)
+
+            self.assertEqual(list(tickets), sorted(expected))
+            self.assertEqual(len(tickets), len(expected))
+            self.assertEqual(list(TicketRanges.from_dict(tickets.to_dict())), sorted(expected))
+            self.assertEqual(list(TicketRanges.from_sorted(sorted(expected), min_run=3)), sorted(expected))
+
+    def test_compact_encoding(self):
+        tickets = TicketRanges([(1, 10_000_000), (5, 20)], [2 ** 64 - 1, 3])
+        self.assertEqual(len(tickets), 10_000_001)
+        self.assertEqual(tickets.to_dict(), {'ranges': [[1, 10_000_000]], 'tickets': [2 ** 64 - 1]})
+        self.assertEqual(tickets.nbytes, 24)
+        self.assertIn(9_999_999, tickets)
+        self.assertNotIn(0, tickets)
+        self.assertNotIn(-1, tickets)
+
+        # A removal in the middle splits the range
+        tickets.remove(5_000_000)
+        self.assertEqual(tickets.range_count, 2)
+        self.assertNotIn(5_000_000, tickets)
+
+        with self.assertRaises(ValueError):
+            TicketRanges([(5, 1)])
+        with self.assertRaises(ValueError):
+            TicketRanges([(0, 2 ** 64)])
+        for malformed in ([[1]], [[1, 2, 3]], ['19'], [{'first': 1}], '19'):
+            with self.assertRaises(ValueError):
+                parse_ticket_ranges({'ranges': malformed})
+        with self.assertRaises(ValueError):
+            parse_ticket_ranges(['19'])
+        with self.assertRaises(ValueError):
+            TicketRanges.from_sorted([3, 2])
+
+    def test_digest_and_shards(self):
+        tickets = TicketRanges([(10, 5000), (7000, 7003)], [1, 6000, 9000])
+        expanded = list(tickets)
+        self.assertEqual(tickets.digest(), ticket_set_digest(expanded))
+        shards = list(tickets.shards(700))
+        self.assertTrue(all(len(shard) <= 700 for shard in shards))
+        self.assertEqual([t for shard in shards for t in shard], expanded)
+
+    def test_same_winner_as_expanded_list(self):
+        tickets = TicketRanges([(5, 40000), (100000, 100100)], [3, 99999999])
+        expanded = list(tickets)
+        winner, score, tie_breaker = find_winner(SEED, expanded)
+        self.assertEqual(find_winner_ranges(SEED, tickets, workers=1), (winner, score, tie_breaker))
+        self.assertEqual(find_winner_ranges(SEED, tickets, workers=2, chunk_size=5000, min_parallel=0),
+                         (winner, score, tie_breaker))
+
+        cache = ResultCache()
+        found, proof = pick_winner_ranges(SEED, tickets, cache=cache)
+        self.assertEqual(found, winner)
+        self.assertEqual(proof['ticket_ranges'], tickets.to_dict())
+        self.assertEqual(proof['winner_score'], str(score))
+        # The cache entry is shared with draws over the expanded list
+        self.assertEqual(pick_winner(SEED, expanded, include_scores=False, cache=cache)[0], winner)
+        self.assertEqual(cache.get_stats()['memory_hits'], 1)
+
+    def test_store_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with TicketStore(os.path.join(tmp, 'tickets.u64')) as store:
+                store.replace_sorted(TicketRanges([(100, 50000)], [7, 60000]))
+                store.add(50001)
+                tickets = TicketRanges.from_sorted(store)
+        self.assertEqual(tickets.to_dict(), {'ranges': [[100, 50001]], 'tickets': [7, 60000]})
+
+if __name__ == '__main__':
+    unittest.main()
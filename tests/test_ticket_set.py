@@ -0,0 +1,47 @@
+"""
+Unit tests for the canonical ticket set
+"""
+import unittest
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ticket_set import REJECT, DuplicateTicketError, TicketSet
+from lottery_core import find_winner, pick_winner, ticket_set_digest
+from result_cache import ResultCache
+
+SEED = 'cd' * 32
+
+class TestTicketSet(unittest.TestCase):
+    def test_duplicates_merged_in_order(self):
+        tickets = TicketSet([5, '3', 5, '003', 7])
+        self.assertEqual(tickets.to_list(), [5, 3, 7])
+        self.assertEqual(tickets.normalized, ['5', '3', '7'])
+        self.assertEqual(tickets.duplicates, 2)
+        self.assertIs(TicketSet.of(tickets), tickets)
+
+        with self.assertRaises(DuplicateTicketError):
+            TicketSet([1, 2, 1], duplicates=REJECT)
+        self.assertEqual(len(TicketSet([1, 2], duplicates=REJECT)), 2)
+
+    def test_invalid_tickets(self):
+        for bad in (-1, 2 ** 64, 'abc', True, None):
+            with self.assertRaises(ValueError):
+                TicketSet([1, bad])
+        with self.assertRaises(ValueError):
+            TicketSet([1], duplicates='keep')
+
+    def test_fingerprint_and_proof(self):
+        tickets = TicketSet(range(1, 200))
+        self.assertEqual(tickets.fingerprint(), ticket_set_digest(range(1, 200)))
+        self.assertEqual(TicketSet().fingerprint(), ticket_set_digest([]))
+
+        cache = ResultCache()
+        for include_scores in (True, False):
+            winner, _, proof = pick_winner(SEED, list(range(1, 200)) + [5], include_scores, cache=cache)
+            self.assertEqual(winner, find_winner(SEED, range(1, 200))[0])
+            self.assertEqual(proof['ticket_set'], tickets.fingerprint())
+            self.assertEqual(len(proof['tickets']), 199)
+
+if __name__ == '__main__':
+    unittest.main()
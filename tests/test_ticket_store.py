@@ -0,0 +1,117 @@
+"""
+Unit tests for the ticket store
+"""
+import unittest
+import json
+import multiprocessing
+import tempfile
+import threading
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ticket_store import TicketSnapshot, TicketStore, import_json, write_snapshot, BASE_HEADER
+from ticket_log import HEADER, RECORD
+
+def _add_range(path, start, count):
+    with TicketStore(path) as store:
+        for t in range(start, start + count):
+            store.add(t)
+
+class TestTicketStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'tickets.u64')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_add_remove_contains(self):
+        with TicketStore(self.path) as store:
+            self.assertTrue(store.add(5))
+            self.assertTrue(store.add(1))
+            self.assertFalse(store.add(5))
+            self.assertIn(5, store)
+            self.assertTrue(store.remove(5))
+            self.assertFalse(store.remove(5))
+            self.assertNotIn(5, store)
+            self.assertEqual(store.to_list(), [1])
+            with self.assertRaises(ValueError):
+                store.add(-1)
+
+    def test_log_replay_and_compaction(self):
+        with TicketStore(self.path, compact_threshold=4) as store:
+            for t in (9, 3, 7, 1, 5):
+                store.add(t)
+            store.remove(3)
+        # 4 adds triggered one compaction; the rest is still in the log
+        with TicketStore(self.path) as store:
+            self.assertEqual(store.to_list(), [1, 5, 7, 9])
+            self.assertEqual(len(store), 4)
+            store.compact()
+            self.assertEqual(os.path.getsize(self.path), BASE_HEADER.size + 4 * 8)
+            self.assertEqual(os.path.getsize(self.path + '.wal'), HEADER.size)
+            self.assertIn(7, store)
+
+    def test_torn_log_tail_is_truncated(self):
+        with TicketStore(self.path) as store:
+            store.add(1)
+            store.add(2)
+        with open(self.path + '.wal', 'ab') as f:
+            f.write(b'+\x03\x00')
+        with TicketStore(self.path) as store:
+            self.assertEqual(store.to_list(), [1, 2])
+            store.add(3)
+        self.assertEqual(os.path.getsize(self.path + '.wal'), HEADER.size + 3 * RECORD.size)
+        with TicketStore(self.path) as store:
+            self.assertEqual(store.to_list(), [1, 2, 3])
+
+    def test_stale_log_is_discarded(self):
+        with TicketStore(self.path) as store:
+            store.add(1)
+            store.add(2)
+            with open(self.path + '.wal', 'rb') as f:
+                old_log = f.read()
+            store.replace([7])
+        # Simulate a crash between writing the new base and resetting the log
+        with open(self.path + '.wal', 'wb') as f:
+            f.write(old_log)
+        with TicketStore(self.path) as store:
+            self.assertEqual(store.to_list(), [7])
+
+    def test_concurrent_writers(self):
+        threads = [threading.Thread(target=_add_range, args=(self.path, n * 100, 50)) for n in range(2)]
+        procs = [multiprocessing.Process(target=_add_range, args=(self.path, n * 100, 50)) for n in range(2, 4)]
+        for w in threads + procs:
+            w.start()
+        for w in threads + procs:
+            w.join()
+        expected = [n * 100 + i for n in range(4) for i in range(50)]
+        with TicketStore(self.path) as store:
+            self.assertEqual(store.to_list(), expected)
+
+    def test_import_json(self):
+        json_path = os.path.join(self.tmp.name, 'tickets.json')
+        with open(json_path, 'w') as f:
+            json.dump({'tickets': [30, 10, 20, 10]}, f)
+        self.assertEqual(import_json(json_path, self.path), 3)
+        with TicketStore(self.path) as store:
+            self.assertEqual(store.to_list(), [10, 20, 30])
+
+    def test_snapshot_is_read_only(self):
+        with TicketStore(self.path) as store:
+            store.replace([5, 1, 3])
+            store.add(4)
+            snapshot_path = os.path.join(self.tmp.name, 'tickets.snap')
+            self.assertEqual(write_snapshot(snapshot_path, store), 4)
+        with TicketSnapshot(snapshot_path) as snapshot:
+            self.assertEqual(snapshot.to_list(), [1, 3, 4, 5])
+            self.assertEqual(len(snapshot), 4)
+            self.assertIn(4, snapshot)
+            self.assertNotIn(2, snapshot)
+            with self.assertRaises(PermissionError):
+                snapshot.add(2)
+        self.assertFalse(os.path.exists(snapshot_path + '.wal'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,277 @@
+"""
+Ticket Log - Write-ahead log for ticket mutations
+Checksummed append-only records, cross-process file locking and group commit
+"""
+import os
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: locking is per process only
+    fcntl = None
+
+# File header: magic, version, epoch (changes on every compaction)
+HEADER = struct.Struct('<4sHxxQ')
+MAGIC = b'TLOG'
+VERSION = 1
+
+# Record: operation, little-endian uint64 ticket, CRC32 of the first two fields
+RECORD = struct.Struct('<cQI')
+RECORD_BODY = struct.Struct('<cQ')
+
+def _pack(op: bytes, ticket: int) -> bytes:
+    body = RECORD_BODY.pack(op, ticket)
+    return body + struct.pack('<I', zlib.crc32(body))
+
+def new_epoch() -> int:
+    """Random non-zero epoch (0 marks a missing or torn header)"""
+    return int.from_bytes(os.urandom(8), 'little') or 1
+
+class TicketLog:
+    """
+    Append-only log of (operation, ticket) records shared by all workers
+
+    - Writers hold an exclusive ``flock`` on the log while they append, so
+      concurrent processes never interleave or lose records
+    - Each record carries a CRC32; recovery truncates a torn tail left by a
+      crash mid-write instead of silently dropping the whole file
+    - ``sync()`` implements group commit: the first waiting thread fsyncs
+      on behalf of every record written so far, later threads piggyback on
+      that fsync instead of issuing their own
+    """
+
+    def __init__(self, path: str, commit_delay: float = 0.0, fsync: bool = True):
+        self.path = path
+        self.commit_delay = commit_delay
+        self.fsync_enabled = fsync
+        self.epoch = 0
+        self.stats = {'appends': 0, 'fsyncs': 0}
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+
+        # Group commit state (per process)
+        self._commit_cond = threading.Condition()
+        self._written_seq = 0
+        self._synced_seq = 0
+        self._syncing = False
+
+        with self.exclusive():
+            self._recover()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd >= 0:
+                os.close(self._fd)
+                self._fd = -1
+
+    # ------------------------------------------------------------------
+    # Locking
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _locked(self, mode: int) -> Iterator[None]:
+        with self._lock:
+            outer = self._lock_depth == 0
+            if outer and fcntl is not None:
+                fcntl.flock(self._fd, mode)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if outer and fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def exclusive(self):
+        """Exclusive lock across threads and processes (re-entrant within a thread)"""
+        return self._locked(fcntl.LOCK_EX if fcntl else 0)
+
+    def shared(self):
+        """Shared lock for readers; nested inside exclusive() it keeps the exclusive lock"""
+        return self._locked(fcntl.LOCK_SH if fcntl else 0)
+
+    # ------------------------------------------------------------------
+    # Reading and recovery
+    # ------------------------------------------------------------------
+
+    def size(self) -> int:
+        return os.fstat(self._fd).st_size
+
+    def read_epoch(self) -> int:
+        """Epoch currently on disk (changes when another worker compacts)"""
+        data = os.pread(self._fd, HEADER.size, 0)
+        if len(data) < HEADER.size:
+            return 0
+        magic, version, epoch = HEADER.unpack(data)
+        return epoch if magic == MAGIC and version == VERSION else 0
+
+    def read(self, offset: int) -> Tuple[List[Tuple[bytes, int]], int]:
+        """
+        Read valid records starting at offset
+
+        Returns:
+            Tuple: (list of (op, ticket), offset just past the last valid record)
+        """
+        offset = max(offset, HEADER.size)
+        size = self.size()
+        if size <= offset:
+            return [], offset
+
+        data = os.pread(self._fd, size - offset, offset)
+        records = []
+        pos = 0
+        while pos + RECORD.size <= len(data):
+            op, ticket, crc = RECORD.unpack_from(data, pos)
+            if zlib.crc32(data[pos:pos + RECORD_BODY.size]) != crc:
+                break
+            records.append((op, ticket))
+            pos += RECORD.size
+        return records, offset + pos
+
+    def _recover(self) -> None:
+        """Validate the header and truncate a torn tail (caller holds the exclusive lock)"""
+        epoch = self.read_epoch()
+        if epoch == 0:
+            self._write_header()
+            return
+        self.epoch = epoch
+        _, valid_end = self.read(HEADER.size)
+        self.repair(valid_end)
+
+    def repair(self, valid_end: int) -> None:
+        """Drop bytes past the last valid record (caller holds the exclusive lock)"""
+        if self.size() > valid_end:
+            os.ftruncate(self._fd, valid_end)
+            os.fsync(self._fd)
+
+    def _write_header(self, epoch: Optional[int] = None) -> None:
+        self.epoch = epoch or new_epoch()
+        os.ftruncate(self._fd, 0)
+        os.write(self._fd, HEADER.pack(MAGIC, VERSION, self.epoch))
+        os.fsync(self._fd)
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def append(self, records: List[Tuple[bytes, int]]) -> int:
+        """
+        Append records (caller holds the exclusive lock)
+
+        The data reaches the OS page cache immediately; call ``sync()`` with
+        the returned sequence number to wait until it is on disk.
+
+        Returns:
+            int: Write sequence number for ``sync()``
+        """
+        os.write(self._fd, b''.join(_pack(op, ticket) for op, ticket in records))
+        self.stats['appends'] += len(records)
+        with self._commit_cond:
+            self._written_seq += 1
+            return self._written_seq
+
+    def reset(self, epoch: Optional[int] = None) -> None:
+        """
+        Empty the log and start a new epoch (caller holds the exclusive lock)
+
+        Used after compaction has folded every record into the base file.
+        """
+        self._write_header(epoch)
+        with self._commit_cond:
+            self._synced_seq = self._written_seq
+            self._commit_cond.notify_all()
+
+    def sync(self, seq: int) -> None:
+        """
+        Wait until write ``seq`` is durable, fsyncing as the group leader if needed
+        """
+        if not self.fsync_enabled:
+            return
+
+        with self._commit_cond:
+            while self._synced_seq < seq:
+                if self._syncing:
+                    self._commit_cond.wait()
+                    continue
+                self._syncing = True
+                break
+            else:
+                return
+
+        try:
+            if self.commit_delay:
+                # Give concurrent writers a chance to join this commit
+                time.sleep(self.commit_delay)
+            with self._commit_cond:
+                target = self._written_seq
+            os.fsync(self._fd)
+            self.stats['fsyncs'] += 1
+            with self._commit_cond:
+                if self._synced_seq < target:
+                    self._synced_seq = target
+        finally:
+            with self._commit_cond:
+                self._syncing = False
+                self._commit_cond.notify_all()
+
+def benchmark(path: str, writers: int = 8, ops: int = 500, commit_delay: float = 0.0) -> dict:
+    """
+    Measure ticket insert throughput with concurrent writer threads
+
+    Args:
+        path: Base path of a scratch ticket store
+        writers: Number of concurrent writer threads
+        ops: Inserts per writer
+        commit_delay: Group commit delay in seconds
+
+    Returns:
+        dict: ops/sec and fsync statistics
+    """
+    from ticket_store import TicketStore
+
+    store = TicketStore(path, compact_threshold=writers * ops + 1, commit_delay=commit_delay)
+    barrier = threading.Barrier(writers)
+
+    def writer(n: int) -> None:
+        barrier.wait()
+        for i in range(ops):
+            store.add(n * ops + i)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    stats = dict(store.log.stats)
+    store.close()
+    return {
+        'writers': writers,
+        'ops': writers * ops,
+        'seconds': round(elapsed, 4),
+        'ops_per_sec': round(writers * ops / elapsed, 1),
+        'fsyncs': stats['fsyncs'],
+        'records_per_fsync': round(stats['appends'] / max(stats['fsyncs'], 1), 2),
+    }
+
+if __name__ == "__main__":
+    # Throughput benchmark: python ticket_log.py [writers] [ops_per_writer] [commit_delay_ms]
+    import sys
+    import tempfile
+
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    ops = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    delay = float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.0
+
+    for n in sorted({1, writers}):
+        with tempfile.TemporaryDirectory() as tmp:
+            print(benchmark(os.path.join(tmp, 'tickets.u64'), n, ops, delay))
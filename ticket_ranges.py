@@ -0,0 +1,302 @@
+"""
+Ticket Ranges - Range-encoded ticket sets
+Sorted disjoint intervals plus a sparse remainder; iterated lazily, never expanded
+"""
+import hashlib
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple, Union
+
+from ticket_store import validate_ticket
+
+# Runs shorter than this stay in the sparse remainder (from_sorted)
+MIN_RUN = 16
+
+# Tickets per block when hashing or converting runs to strings
+_BLOCK = 65536
+
+class TicketRanges:
+    """
+    Set of uint64 tickets stored as intervals plus sparse tickets
+
+    - ``_starts``/``_ends``: inclusive bounds of sorted, disjoint intervals
+    - ``_sparse``: sorted tickets outside every interval
+
+    Memory is 16 bytes per interval and 8 per sparse ticket, whatever the
+    number of tickets, so 1..10,000,000 costs 16 bytes. Membership is a
+    binary search over the bounds and the sparse array (O(log k)); add and
+    remove find their place the same way and then shift the arrays
+    (memmove, no Python-level loop). Iteration is ascending, the same
+    order as TicketStore, so the ticket-set digest of a range set equals
+    that of the expanded list.
+    """
+
+    def __init__(self, ranges: Iterable[Sequence[Union[str, int]]] = (), tickets: Iterable[Union[str, int]] = ()):
+        """
+        Args:
+            ranges: (first, last) pairs (lists or tuples), inclusive; may overlap
+            tickets: Individual tickets; may repeat or fall inside ranges
+
+        Raises:
+            ValueError: If a pair is not a 2-item list or tuple, or a bound is not a uint64
+        """
+        bounds = []
+        for pair in ranges:
+            # Any other indexable would slip through, e.g. the string "19" as 1..9
+            if not isinstance(pair, (list, tuple)) or len(pair) != 2:
+                raise ValueError(f"Invalid ticket range {pair!r}: expected [first, last]")
+            first, last = validate_ticket(pair[0]), validate_ticket(pair[1])
+            if first > last:
+                raise ValueError(f"Invalid ticket range: {first}-{last}")
+            bounds.append((first, last))
+        bounds.sort()
+
+        self._starts = array('Q')
+        self._ends = array('Q')
+        for first, last in bounds:
+            # Merge overlapping and touching ranges
+            if self._ends and first <= self._ends[-1] + 1:
+                if last > self._ends[-1]:
+                    self._ends[-1] = last
+            else:
+                self._starts.append(first)
+                self._ends.append(last)
+
+        self._sparse = array('Q', sorted({t for t in map(validate_ticket, tickets) if not self._in_ranges(t)}))
+        self._count = len(self._sparse) + sum(e - s + 1 for s, e in zip(self._starts, self._ends))
+
+    @classmethod
+    def from_sorted(cls, tickets: Iterable[int], min_run: int = MIN_RUN) -> 'TicketRanges':
+        """
+        Encode ascending unique tickets (e.g. a TicketStore) in one pass
+
+        Runs of at least ``min_run`` consecutive tickets become intervals,
+        the rest goes to the sparse remainder. Memory is that of the result.
+
+        Raises:
+            ValueError: If the tickets are not strictly ascending
+        """
+        result = cls()
+        starts, ends, sparse = result._starts, result._ends, result._sparse
+        first = last = None
+        for ticket in tickets:
+            if last is not None and ticket == last + 1:
+                last = ticket
+                continue
+            if last is not None and ticket <= last:
+                raise ValueError(f"Tickets are not ascending: {ticket} after {last}")
+            if first is not None:
+                result._flush_run(first, last, min_run)
+            first = last = validate_ticket(ticket)
+        if first is not None:
+            result._flush_run(first, last, min_run)
+        result._count = len(sparse) + sum(e - s + 1 for s, e in zip(starts, ends))
+        return result
+
+    def _flush_run(self, first: int, last: int, min_run: int) -> None:
+        if last - first + 1 >= min_run:
+            self._starts.append(first)
+            self._ends.append(last)
+        else:
+            self._sparse.extend(range(first, last + 1))
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'TicketRanges':
+        """Decode {"ranges": [[first, last], ...], "tickets": [...]} (see to_dict)"""
+        if not isinstance(data, dict):
+            raise ValueError("ticket_ranges must be an object")
+        for key in ('ranges', 'tickets'):
+            if not isinstance(data.get(key) or [], list):
+                raise ValueError(f"ticket_ranges.{key} must be a list")
+        return cls(data.get('ranges') or (), data.get('tickets') or ())
+
+    def to_dict(self) -> Dict[str, List]:
+        """JSON form: inclusive ranges and sparse tickets"""
+        return {
+            'ranges': [[s, e] for s, e in zip(self._starts, self._ends)],
+            'tickets': self._sparse.tolist()
+        }
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _in_ranges(self, ticket: int) -> bool:
+        i = bisect_right(self._starts, ticket) - 1
+        return i >= 0 and ticket <= self._ends[i]
+
+    def _sparse_index(self, ticket: int) -> int:
+        """Index of the ticket in the sparse array, or -1"""
+        i = bisect_left(self._sparse, ticket)
+        return i if i < len(self._sparse) and self._sparse[i] == ticket else -1
+
+    def __contains__(self, ticket) -> bool:
+        try:
+            ticket = validate_ticket(ticket)
+        except (TypeError, ValueError):
+            return False
+        return self._in_ranges(ticket) or self._sparse_index(ticket) >= 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def count(self) -> int:
+        """Number of tickets (len() fails above sys.maxsize, e.g. for the whole uint64 range)"""
+        return self._count
+
+    @property
+    def range_count(self) -> int:
+        return len(self._starts)
+
+    @property
+    def sparse_count(self) -> int:
+        return len(self._sparse)
+
+    @property
+    def nbytes(self) -> int:
+        return (len(self._starts) + len(self._ends) + len(self._sparse)) * 8
+
+    def __repr__(self) -> str:
+        return f'<TicketRanges {self._count} tickets: {len(self._starts)} ranges + {len(self._sparse)} sparse>'
+
+    # ------------------------------------------------------------------
+    # Iteration
+    # ------------------------------------------------------------------
+
+    def runs(self) -> Iterator[Union[range, array]]:
+        """Ascending runs of tickets: ranges and slices of the sparse array"""
+        sparse = self._sparse
+        j = 0
+        for start, end in zip(self._starts, self._ends):
+            k = bisect_left(sparse, start, j)
+            if k > j:
+                yield sparse[j:k]
+            yield range(start, end + 1)
+            j = k
+        if j < len(sparse):
+            yield sparse[j:]
+
+    def __iter__(self) -> Iterator[int]:
+        """Tickets in ascending order"""
+        return chain.from_iterable(self.runs())
+
+    def iter_normalized(self) -> Iterator[str]:
+        """Tickets as normalised strings (normalize_ticket_number), ascending"""
+        return chain.from_iterable(map(str, run) for run in self.runs())
+
+    def digest(self) -> Dict[str, Any]:
+        """
+        Ticket-set digest, equal to lottery_core.ticket_set_digest of the
+        expanded ascending list, computed in blocks without expanding it
+        """
+        h = hashlib.sha256()
+        for run in self.runs():
+            for offset in range(0, len(run), _BLOCK):
+                block = run[offset:offset + _BLOCK]
+                h.update(('\n'.join(map(str, block)) + '\n').encode())
+        return {'count': self._count, 'digest': h.hexdigest()}
+
+    def shards(self, size: int) -> Iterator['TicketRanges']:
+        """Consecutive pieces of at most ``size`` tickets (for process pools)"""
+        size = max(1, size)
+        piece = TicketRanges()
+        for run in self.runs():
+            while len(run):
+                take = run[:size - piece._count]
+                if isinstance(take, range):
+                    piece._starts.append(take.start)
+                    piece._ends.append(take.stop - 1)
+                else:
+                    piece._sparse.extend(take)
+                piece._count += len(take)
+                run = run[len(take):]
+                if piece._count == size:
+                    yield piece
+                    piece = TicketRanges()
+        if piece._count:
+            yield piece
+
+    # ------------------------------------------------------------------
+    # Mutations
+    # ------------------------------------------------------------------
+
+    def add(self, ticket) -> bool:
+        """
+        Add a ticket; it extends a neighbouring range or joins the sparse set
+
+        Returns:
+            bool: False if the ticket is already present
+        """
+        ticket = validate_ticket(ticket)
+        if ticket in self:
+            return False
+        starts, ends = self._starts, self._ends
+        i = bisect_right(starts, ticket)
+        # i - 1 ends before the ticket, i starts after it
+        joins_left = i > 0 and ends[i - 1] == ticket - 1
+        joins_right = i < len(starts) and starts[i] == ticket + 1
+        if joins_left and joins_right:
+            ends[i - 1] = ends[i]
+            del starts[i]
+            del ends[i]
+        elif joins_left:
+            ends[i - 1] = ticket
+        elif joins_right:
+            starts[i] = ticket
+        else:
+            self._sparse.insert(bisect_left(self._sparse, ticket), ticket)
+        self._count += 1
+        return True
+
+    def remove(self, ticket) -> bool:
+        """
+        Remove a ticket (a ticket inside a range splits it)
+
+        Returns:
+            bool: False if the ticket is not present
+        """
+        try:
+            ticket = validate_ticket(ticket)
+        except (TypeError, ValueError):
+            return False
+        j = self._sparse_index(ticket)
+        if j >= 0:
+            del self._sparse[j]
+            self._count -= 1
+            return True
+
+        starts, ends = self._starts, self._ends
+        i = bisect_right(starts, ticket) - 1
+        if i < 0 or ticket > ends[i]:
+            return False
+        start, end = starts[i], ends[i]
+        if start == end:
+            del starts[i]
+            del ends[i]
+        elif ticket == start:
+            starts[i] = ticket + 1
+        elif ticket == end:
+            ends[i] = ticket - 1
+        else:
+            ends[i] = ticket - 1
+            starts.insert(i + 1, ticket + 1)
+            ends.insert(i + 1, end)
+        self._count -= 1
+        return True
+
+def parse_ticket_ranges(value: Union[Dict[str, Any], List[Tuple[int, int]]]) -> TicketRanges:
+    """
+    Ticket ranges from a request body: {"ranges": [...], "tickets": [...]}
+    or a bare list of [first, last] pairs
+
+    Raises:
+        ValueError: On malformed input or tickets outside uint64
+    """
+    try:
+        if isinstance(value, list):
+            return TicketRanges(value)
+        return TicketRanges.from_dict(value)
+    except (TypeError, IndexError) as e:
+        raise ValueError(f"Invalid ticket_ranges: {e}")
@@ -0,0 +1,124 @@
+"""
+Ticket Set - Canonical ticket list shared by the draw engine and the API
+Validated and deduplicated once, array-backed, with cached encodings and a fingerprint
+"""
+import hashlib
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+from ticket_store import validate_ticket
+
+MERGE = 'merge'
+REJECT = 'reject'
+
+class DuplicateTicketError(ValueError):
+    """A ticket occurs more than once and duplicates are rejected"""
+
+def _validate(ticket) -> int:
+    try:
+        return validate_ticket(ticket)
+    except TypeError:
+        raise ValueError(f"Invalid ticket number: {ticket!r}")
+
+class TicketSet:
+    """
+    Ordered, duplicate-free list of uint64 tickets
+
+    Every ticket is validated (validate_ticket) and canonicalised exactly
+    once, when the set is built; the set keeps input order, since proofs
+    and Merkle trees commit to it. Duplicates are merged (first occurrence
+    wins, counted in ``duplicates``) or rejected, in O(n).
+
+    Storage is an array('Q'), 8 bytes per ticket. The forms the engine
+    needs are built on first use and cached:
+
+    - ``normalized``: decimal strings (what proofs list)
+    - ``encoded``: the same as bytes (what scoring hashes)
+    - ``fingerprint()``: {'count', 'digest'}, SHA256 over the encoded
+      tickets each followed by b'\\n' - the same value as
+      lottery_core.ticket_set_digest of the list, used as the result-cache
+      key and as the ticket_set commitment in proofs
+
+    A TicketSet is treated as immutable; build a new one to change it.
+    """
+
+    def __init__(self, tickets: Iterable[Union[str, int]] = (), duplicates: str = MERGE):
+        if duplicates not in (MERGE, REJECT):
+            raise ValueError(f'duplicates must be "{MERGE}" or "{REJECT}"')
+        if not isinstance(tickets, (list, tuple, array)):
+            tickets = list(tickets)
+        try:
+            # Fast path for plain ints: array() range-checks them in C
+            if bool in set(map(type, tickets)):
+                raise TypeError
+            values = array('Q', tickets)
+        except (TypeError, OverflowError):
+            values = array('Q', map(_validate, tickets))
+
+        merged = len(values) - len(set(values))
+        if merged:
+            if duplicates == REJECT:
+                seen = set()
+                for number in values:
+                    if number in seen:
+                        raise DuplicateTicketError(f"Duplicate ticket: {number}")
+                    seen.add(number)
+            # dict keeps the first occurrence of each ticket, in order
+            values = array('Q', dict.fromkeys(values))
+        self.values = values
+        self.duplicates = merged
+        self._normalized: Optional[List[str]] = None
+        self._encoded: Optional[List[bytes]] = None
+        self._fingerprint: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def of(cls, tickets: Iterable[Union[str, int]]) -> 'TicketSet':
+        """The argument itself if it already is a TicketSet, else a new merged set"""
+        if isinstance(tickets, TicketSet):
+            return tickets
+        return cls(tickets)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.values)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, TicketSet):
+            return NotImplemented
+        return self.values == other.values
+
+    def __repr__(self) -> str:
+        return f'<TicketSet {len(self.values)} tickets>'
+
+    @property
+    def normalized(self) -> List[str]:
+        """Tickets as decimal strings (normalize_ticket_number), in order"""
+        if self._normalized is None:
+            self._normalized = list(map(str, self.values))
+        return self._normalized
+
+    @property
+    def encoded(self) -> List[bytes]:
+        """Tickets as ASCII bytes, the input of the score hash"""
+        if self._encoded is None:
+            self._encoded = list(map(str.encode, self.normalized))
+        return self._encoded
+
+    def fingerprint(self) -> Dict[str, Any]:
+        """Ticket count and SHA256 of the canonical list (see class docstring)"""
+        if self._fingerprint is None:
+            h = hashlib.sha256()
+            if self.values:
+                h.update(b'\n'.join(self.encoded) + b'\n')
+            self._fingerprint = {'count': len(self.values), 'digest': h.hexdigest()}
+        return dict(self._fingerprint)
+
+    def to_list(self) -> List[int]:
+        return self.values.tolist()
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the array (cached encodings not included)"""
+        return self.values.itemsize * len(self.values)
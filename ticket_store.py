@@ -0,0 +1,431 @@
+"""
+Ticket Store - Compact on-disk ticket storage
+Sorted uint64 base file (memory-mapped) plus a write-ahead log of changes
+"""
+import bisect
+import heapq
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from ticket_log import TicketLog, new_epoch
+
+MAX_TICKET = 2 ** 64 - 1
+
+# Base file header: magic, version, epoch of the log that continues this base
+BASE_HEADER = struct.Struct('<4sHxxQ')
+BASE_MAGIC = b'TBAS'
+BASE_VERSION = 1
+
+# Log operations
+OP_ADD = b'+'
+OP_REMOVE = b'-'
+
+# Compact when the log holds this many records (or 1/8 of the base, if larger)
+COMPACT_THRESHOLD = 4096
+
+def validate_ticket(ticket) -> int:
+    """
+    Convert a ticket number to int and check it fits in uint64
+
+    Raises:
+        ValueError: If the ticket is not an integer in [0, 2^64)
+    """
+    if isinstance(ticket, bool):
+        raise ValueError(f"Invalid ticket number: {ticket!r}")
+    number = int(ticket)
+    if number < 0 or number > MAX_TICKET:
+        raise ValueError(f"Ticket number out of range: {number}")
+    return number
+
+class TicketStore:
+    """
+    Sorted set of uint64 tickets backed by two files:
+
+    - ``<path>``: 16-byte header followed by a sorted unique little-endian
+      uint64 array, memory-mapped, membership is a binary search over the
+      mapping (O(log n), zero-copy)
+    - ``<path>.wal``: write-ahead log of add/remove records since the last
+      compaction (see ticket_log.TicketLog), replayed into two small
+      in-memory sets on open
+
+    Mutations append one record under an exclusive file lock and wait for
+    a group commit, so several worker processes can share one store. Each
+    worker catches up with records appended by the others before it reads.
+    The base file is rewritten by ``compact()`` once the log grows past
+    the threshold. Base and log share an epoch: a log whose epoch does not
+    match the base (a crash between writing the base and resetting the
+    log) is stale and is discarded rather than replayed.
+    """
+
+    def __init__(self, path: str, compact_threshold: int = COMPACT_THRESHOLD,
+                 commit_delay: float = 0.0, fsync: bool = True):
+        self.path = path
+        self.log_path = path + '.wal'
+        self.compact_threshold = compact_threshold
+        self._mmap: Optional[mmap.mmap] = None
+        self._base = array('Q')
+        self._added: set = set()
+        self._removed: set = set()
+        self._log_records = 0
+        self._log_offset = 0
+        self._epoch = None
+        self._base_epoch: Optional[int] = None
+        self._stale_log = False
+        self.log = TicketLog(self.log_path, commit_delay=commit_delay, fsync=fsync)
+        with self.log.shared():
+            self._refresh()
+
+    # ------------------------------------------------------------------
+    # Opening and closing
+    # ------------------------------------------------------------------
+
+    def _map_base(self) -> None:
+        """
+        Map the base file (or load it, on big-endian hosts)
+
+        The previous mapping is not closed here: iterators handed out
+        earlier may still read it, it is freed once they are done.
+        """
+        self._mmap, self._base, self._base_epoch = _open_base(self.path)
+
+    def _unmap_base(self) -> None:
+        if isinstance(self._base, memoryview):
+            self._base.release()
+        self._base = array('Q')
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def _refresh(self, repair: bool = False) -> None:
+        """
+        Catch up with the log (caller holds a log lock)
+
+        A changed epoch means another worker compacted the store: the base
+        is remapped and the log replayed from the start.
+        """
+        epoch = self.log.read_epoch()
+        if epoch != self._epoch:
+            self._map_base()
+            self._added = set()
+            self._removed = set()
+            self._log_records = 0
+            self._log_offset = 0
+            self._epoch = epoch
+            self._stale_log = self._base_epoch is not None and self._base_epoch != epoch
+
+        if self._stale_log:
+            if not repair:
+                return
+            self.log.reset(self._base_epoch)
+            self._epoch = self._base_epoch
+            self._stale_log = False
+
+        if self.log.size() == self._log_offset:
+            return
+        records, self._log_offset = self.log.read(self._log_offset)
+        for op, ticket in records:
+            self._apply(op, ticket)
+        self._log_records += len(records)
+        if repair:
+            self.log.repair(self._log_offset)
+
+    def close(self) -> None:
+        with self.log.exclusive():
+            self._unmap_base()
+        self.log.close()
+
+    def __enter__(self) -> 'TicketStore':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _in_base(self, ticket: int) -> bool:
+        base = self._base
+        i = bisect.bisect_left(base, ticket)
+        return i < len(base) and base[i] == ticket
+
+    def _contains(self, ticket: int) -> bool:
+        if ticket in self._added:
+            return True
+        if ticket in self._removed:
+            return False
+        return self._in_base(ticket)
+
+    def __contains__(self, ticket) -> bool:
+        try:
+            ticket = validate_ticket(ticket)
+        except (TypeError, ValueError):
+            return False
+        with self.log.shared():
+            self._refresh()
+            return self._contains(ticket)
+
+    def __len__(self) -> int:
+        with self.log.shared():
+            self._refresh()
+            return len(self._base) + len(self._added) - len(self._removed)
+
+    def __iter__(self) -> Iterator[int]:
+        """Iterate tickets in ascending order (snapshot of the current state)"""
+        with self.log.shared():
+            self._refresh()
+            return self._snapshot()
+
+    def _snapshot(self) -> Iterator[int]:
+        base = self._base
+        removed = frozenset(self._removed)
+        added = sorted(self._added)
+        if removed:
+            base = (t for t in base if t not in removed)
+        return heapq.merge(base, added)
+
+    def to_list(self) -> List[int]:
+        return list(self)
+
+    # ------------------------------------------------------------------
+    # Mutations
+    # ------------------------------------------------------------------
+
+    def _apply(self, op: bytes, ticket: int) -> None:
+        if op == OP_ADD:
+            if ticket in self._removed:
+                self._removed.discard(ticket)
+            elif not self._in_base(ticket):
+                self._added.add(ticket)
+        elif op == OP_REMOVE:
+            if ticket in self._added:
+                self._added.discard(ticket)
+            elif self._in_base(ticket):
+                self._removed.add(ticket)
+        else:
+            raise ValueError(f"Unknown log operation: {op!r}")
+
+    def _mutate(self, op: bytes, ticket, present: bool) -> bool:
+        ticket = validate_ticket(ticket)
+        with self.log.exclusive():
+            self._refresh(repair=True)
+            if self._contains(ticket) != present:
+                return False
+            seq = self.log.append([(op, ticket)])
+            self._log_offset = self.log.size()
+            self._apply(op, ticket)
+            self._log_records += 1
+            if self._log_records >= max(self.compact_threshold, len(self._base) // 8):
+                self._rewrite(self._snapshot())
+        # Durability wait happens outside the lock so other writers can join the commit
+        self.log.sync(seq)
+        return True
+
+    def add(self, ticket) -> bool:
+        """
+        Add a ticket
+
+        Returns:
+            bool: False if the ticket already exists
+        """
+        return self._mutate(OP_ADD, ticket, present=False)
+
+    def remove(self, ticket) -> bool:
+        """
+        Remove a ticket
+
+        Returns:
+            bool: False if the ticket does not exist
+        """
+        return self._mutate(OP_REMOVE, ticket, present=True)
+
+    def replace(self, tickets: Iterable) -> None:
+        """Replace the whole ticket set"""
+        values = sorted({validate_ticket(t) for t in tickets})
+        with self.log.exclusive():
+            self._refresh(repair=True)
+            self._rewrite(values)
+
+    def replace_sorted(self, tickets: Iterable[int]) -> None:
+        """
+        Replace the whole ticket set with tickets that are already ascending,
+        unique and valid (e.g. a ticket_ranges.TicketRanges); they are
+        streamed into the base file without being collected in memory
+        """
+        with self.log.exclusive():
+            self._refresh(repair=True)
+            self._rewrite(tickets)
+
+    def compact(self) -> None:
+        """Merge the log into a new base file"""
+        with self.log.exclusive():
+            self._refresh(repair=True)
+            self._rewrite(self._snapshot())
+
+    def _rewrite(self, tickets: Iterable[int]) -> None:
+        """Write a new base file and empty the log (caller holds the exclusive lock)"""
+        epoch = new_epoch()
+        tmp_path = self.path + '.tmp'
+        _write_sorted(tmp_path, tickets, epoch)
+        os.replace(tmp_path, self.path)
+        # A crash here leaves a log with the old epoch, which is discarded on open
+        self.log.reset(epoch)
+        self._refresh()
+
+def _open_base(path: str) -> Tuple[Optional[mmap.mmap], Sequence[int], Optional[int]]:
+    """
+    Open a base file read-only
+
+    Returns:
+        Tuple: (mapping or None, ascending tickets, epoch); a missing file
+        is an empty base with epoch None
+    """
+    if not os.path.exists(path):
+        return None, array('Q'), None
+    size = os.path.getsize(path)
+    if size < BASE_HEADER.size or (size - BASE_HEADER.size) % 8:
+        raise ValueError(f"Corrupted ticket store (bad size): {path}")
+
+    with open(path, 'rb') as f:
+        magic, version, epoch = BASE_HEADER.unpack(f.read(BASE_HEADER.size))
+        if magic != BASE_MAGIC or version != BASE_VERSION:
+            raise ValueError(f"Not a ticket store file: {path}")
+        if sys.byteorder == 'big':
+            base = array('Q')
+            base.frombytes(f.read())
+            base.byteswap()
+            return None, base, epoch
+        if size == BASE_HEADER.size:
+            return None, array('Q'), epoch
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return mapping, memoryview(mapping)[BASE_HEADER.size:].cast('Q'), epoch
+
+class TicketSnapshot:
+    """
+    Read-only ticket set from a prebuilt base file, without a log
+
+    For read-only deployments (e.g. serverless functions): opening maps
+    the file and reads nothing else - no write-ahead log is created or
+    replayed and no lock is taken, so the first lookup costs one page
+    fault rather than a parse of the whole set. The file has the base
+    file format, built by write_snapshot() (python snapshot.py tickets).
+    Mutations raise PermissionError.
+    """
+
+    def __init__(self, path: str):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Ticket snapshot not found: {path}")
+        self.path = path
+        self._mmap, self._base, self.epoch = _open_base(path)
+
+    def close(self) -> None:
+        if isinstance(self._base, memoryview):
+            self._base.release()
+        self._base = array('Q')
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self) -> 'TicketSnapshot':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __contains__(self, ticket) -> bool:
+        try:
+            ticket = validate_ticket(ticket)
+        except (TypeError, ValueError):
+            return False
+        base = self._base
+        i = bisect.bisect_left(base, ticket)
+        return i < len(base) and base[i] == ticket
+
+    def __len__(self) -> int:
+        return len(self._base)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._base)
+
+    def to_list(self) -> List[int]:
+        return self._base.tolist()
+
+    def _read_only(self, *args) -> None:
+        raise PermissionError(f"Ticket snapshot is read-only: {self.path}")
+
+    add = remove = replace = replace_sorted = compact = _read_only
+
+def write_snapshot(path: str, tickets: Iterable[int]) -> int:
+    """
+    Write a ticket snapshot (see TicketSnapshot) atomically
+
+    Args:
+        path: Snapshot file
+        tickets: Ascending, unique, valid tickets (e.g. a TicketStore)
+
+    Returns:
+        int: Number of tickets written
+    """
+    count = 0
+
+    def counted() -> Iterator[int]:
+        nonlocal count
+        for count, ticket in enumerate(tickets, 1):
+            yield ticket
+
+    _write_sorted(path + '.tmp', counted(), new_epoch())
+    os.replace(path + '.tmp', path)
+    return count
+
+def _write_sorted(path: str, tickets: Iterable[int], epoch: int) -> None:
+    """Write a base file of ascending tickets and fsync it"""
+    with open(path, 'wb') as f:
+        f.write(BASE_HEADER.pack(BASE_MAGIC, BASE_VERSION, epoch))
+        block = array('Q')
+        for ticket in tickets:
+            block.append(ticket)
+            if len(block) >= 65536:
+                _write_block(f, block)
+                block = array('Q')
+        _write_block(f, block)
+        f.flush()
+        os.fsync(f.fileno())
+
+def _write_block(f, block: array) -> None:
+    if sys.byteorder == 'big':
+        block.byteswap()
+    block.tofile(f)
+
+def import_json(json_path: str, store_path: str) -> int:
+    """
+    One-time import of a legacy tickets.json file into a ticket store
+
+    Args:
+        json_path: Path to {"tickets": [...]} JSON file
+        store_path: Base path of the ticket store to create
+
+    Returns:
+        int: Number of tickets imported
+    """
+    with open(json_path, 'r') as f:
+        data = json.load(f)
+
+    tickets = sorted({validate_ticket(t) for t in data.get('tickets', [])})
+    _write_sorted(store_path + '.tmp', tickets, new_epoch())
+    os.replace(store_path + '.tmp', store_path)
+    # Start with an empty log
+    if os.path.exists(store_path + '.wal'):
+        os.remove(store_path + '.wal')
+    return len(tickets)
+
+if __name__ == "__main__":
+    # Import tickets.json: python ticket_store.py [tickets.json] [tickets.u64]
+    src = sys.argv[1] if len(sys.argv) > 1 else 'tickets.json'
+    dst = sys.argv[2] if len(sys.argv) > 2 else 'tickets.u64'
+    count = import_json(src, dst)
+    print(f"Imported {count} tickets from {src} into {dst}")
@@ -0,0 +1,146 @@
+"""
+Ticket Stream - Read ticket sets from files without loading them into memory
+Supports newline-delimited text, NDJSON and binary uint64 files
+"""
+import json
+import sys
+from array import array
+from typing import Iterator, Optional, Union
+
+# Records read per block from binary files
+UINT64_BLOCK = 65536
+
+FORMAT_BY_EXTENSION = {
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+    '.bin': 'uint64',
+    '.u64': 'uint64',
+    '.txt': 'lines',
+    '.csv': 'lines',
+}
+
+def iter_lines(path: str) -> Iterator[str]:
+    """
+    Iterate tickets from a text file with one ticket per line
+
+    Args:
+        path: File path
+
+    Yields:
+        str: Ticket number as written in the file (blank lines are skipped)
+    """
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+def iter_ndjson(path: str) -> Iterator[Union[str, int]]:
+    """
+    Iterate tickets from an NDJSON file
+
+    Each line is either a JSON number/string or an object with a "ticket" key.
+
+    Args:
+        path: File path
+
+    Yields:
+        Ticket number
+    """
+    with open(path, 'r') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            value = json.loads(line)
+            if isinstance(value, dict):
+                value = value.get('ticket')
+            if not isinstance(value, (int, str)) or isinstance(value, bool):
+                raise ValueError(f"Invalid ticket on line {line_no}: {line[:64]}")
+            yield value
+
+def iter_uint64(path: str) -> Iterator[int]:
+    """
+    Iterate tickets from a binary file of little-endian uint64 values
+
+    Args:
+        path: File path
+
+    Yields:
+        int: Ticket number
+    """
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(UINT64_BLOCK * 8)
+            if not block:
+                return
+            if len(block) % 8:
+                raise ValueError(f"Truncated uint64 ticket file: {path}")
+            values = array('Q')
+            values.frombytes(block)
+            if sys.byteorder == 'big':
+                values.byteswap()
+            yield from values
+
+def write_uint64(path: str, tickets) -> int:
+    """
+    Write tickets to a binary little-endian uint64 file
+
+    Args:
+        path: File path
+        tickets: Iterable of non-negative integers
+
+    Returns:
+        int: Number of tickets written
+    """
+    count = 0
+    with open(path, 'wb') as f:
+        values = array('Q')
+        for ticket in tickets:
+            values.append(int(ticket))
+            if len(values) >= UINT64_BLOCK:
+                count += _write_block(f, values)
+                values = array('Q')
+        count += _write_block(f, values)
+    return count
+
+def _write_block(f, values: array) -> int:
+    if sys.byteorder == 'big':
+        values.byteswap()
+    values.tofile(f)
+    return len(values)
+
+def open_ticket_stream(path: str, fmt: Optional[str] = None) -> Iterator[Union[str, int]]:
+    """
+    Open a ticket file as a lazy iterator
+
+    Args:
+        path: File path
+        fmt: 'lines', 'ndjson' or 'uint64' (detected from the extension if None)
+
+    Returns:
+        Iterator over ticket numbers
+    """
+    if fmt is None:
+        dot = path.rfind('.')
+        fmt = FORMAT_BY_EXTENSION.get(path[dot:].lower(), 'lines') if dot >= 0 else 'lines'
+
+    readers = {
+        'lines': iter_lines,
+        'ndjson': iter_ndjson,
+        'uint64': iter_uint64,
+    }
+    if fmt not in readers:
+        raise ValueError(f"Unknown ticket file format: {fmt}")
+    return readers[fmt](path)
+
+if __name__ == "__main__":
+    # Draw over a ticket file: python ticket_stream.py <tickets_file> <block_hash> [<block_hash> ...]
+    from lottery_core import get_lottery_result_stream
+
+    if len(sys.argv) < 3:
+        print("Usage: python ticket_stream.py <tickets_file> <block_hash> [<block_hash> ...]")
+        sys.exit(1)
+
+    result = get_lottery_result_stream(sys.argv[2:], open_ticket_stream(sys.argv[1]))
+    print(json.dumps(result, indent=2))
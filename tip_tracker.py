@@ -0,0 +1,117 @@
+"""
+Tip Tracker - Cached Bitcoin tip height with request coalescing
+Serves reads from memory, refreshes on a schedule, one upstream call at a time
+"""
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+class TipTracker:
+    """
+    Latest block height cached in memory
+
+    - ``get()`` returns the cached height while it is younger than the
+      staleness bound, otherwise refreshes it
+    - Concurrent refreshes are coalesced: one caller fetches upstream,
+      the others wait for that result instead of issuing their own call
+    - ``start()`` runs a background poller so reads rarely miss
+    - If a refresh fails, the last known height is returned
+    """
+
+    def __init__(self, fetch: Callable[[], Optional[int]], max_age: float = 30.0):
+        self._fetch = fetch
+        self.max_age = max_age
+        self._height: Optional[int] = None
+        self._updated: Optional[float] = None
+        self._cond = threading.Condition()
+        self._inflight = False
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.stats: Dict[str, int] = {
+            'hits': 0,
+            'fetches': 0,
+            'coalesced': 0,
+            'errors': 0,
+        }
+
+    def age(self) -> Optional[float]:
+        """Seconds since the cached height was fetched (None if never)"""
+        updated = self._updated
+        return None if updated is None else time.monotonic() - updated
+
+    def get(self, max_age: Optional[float] = None) -> Optional[int]:
+        """
+        Get the tip height, refreshing it if older than max_age seconds
+
+        Args:
+            max_age: Staleness bound (default: self.max_age)
+
+        Returns:
+            int: Block height or None if it has never been fetched successfully
+        """
+        max_age = self.max_age if max_age is None else max_age
+        with self._cond:
+            age = self.age()
+            if self._height is not None and age <= max_age:
+                self.stats['hits'] += 1
+                return self._height
+        return self.refresh()
+
+    def refresh(self) -> Optional[int]:
+        """Fetch the tip now, or wait for a fetch that is already in flight"""
+        with self._cond:
+            if self._inflight:
+                self.stats['coalesced'] += 1
+                while self._inflight:
+                    self._cond.wait()
+                return self._height
+            self._inflight = True
+
+        height = None
+        try:
+            height = self._fetch()
+        finally:
+            with self._cond:
+                self.stats['fetches'] += 1
+                if height is not None:
+                    self._height = height
+                    self._updated = time.monotonic()
+                else:
+                    self.stats['errors'] += 1
+                self._inflight = False
+                self._cond.notify_all()
+        return self._height
+
+    def start(self, interval: float) -> None:
+        """Start the background poller (no-op if already running)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._poll, args=(interval,), name='tip-tracker', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _poll(self, interval: float) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Tip tracker refresh failed: {e}")
+            self._stop.wait(interval)
+
+    def status(self) -> Dict[str, object]:
+        """Cached height, its age and counters, for monitoring"""
+        with self._cond:
+            age = self.age()
+            return {
+                'height': self._height,
+                'age_seconds': None if age is None else round(age, 3),
+                'max_age_seconds': self.max_age,
+                'polling': self._thread is not None and self._thread.is_alive(),
+                **self.stats,
+            }